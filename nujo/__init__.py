@@ -1,4 +1,5 @@
-from nujo.autodiff import Function, Tensor, no_diff
+from nujo.autodiff import (Function, Tensor, default_dtype, get_default_dtype,
+                           lazy, no_diff, set_default_dtype)
 from nujo.flow import Flow
 from nujo.init import *
 from nujo.math import *
@@ -7,6 +8,10 @@ __all__ = [
     'Function',
     'Tensor',
     'no_diff',
+    'lazy',
+    'get_default_dtype',
+    'set_default_dtype',
+    'default_dtype',
     'Flow',
 ]
 
@@ -1,11 +1,18 @@
+from collections import OrderedDict, namedtuple
+from threading import RLock
+from typing import Any, Hashable, Optional
+from weakref import KeyedRef, ref
+
 __all__ = [
     'cached_property',
+    'CacheInfo',
+    'WeakLRUCache',
 ]
 
 
 class cached_property:
-    ''' A property that is only computed once per instance and then replaces itself
-    with an ordinary attribute.
+    ''' A property that is only computed once per instance and then replaces
+    itself with an ordinary attribute.
 
     Deleting the attribute resets the property.
 
@@ -26,3 +33,108 @@ class cached_property:
         else:
             value = cache[key] = self.func(obj)
             return value
+
+
+# ====================================================================================================
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+''' Statistics of a `WeakLRUCache`
+'''
+
+
+class WeakLRUCache:
+    ''' A cache that holds its values by weak reference
+
+    An entry is dropped as soon as its value is garbage collected, so the
+    cache never keeps anything alive on its own. Optionally, the number of
+    entries can be bounded, in which case the least recently used entries
+    are evicted first. The cache can be shared between threads.
+
+    Parameters:
+    -----------
+     - maxsize : int (optional), the maximum number of entries;
+       if None, the cache is unbounded
+
+    '''
+    def __init__(self, maxsize: Optional[int] = None):
+        self._data: 'OrderedDict[Hashable, KeyedRef]' = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        def remove(wr: KeyedRef, selfref=ref(self)) -> None:
+            cache = selfref()
+            if cache is None:
+                return
+
+            with cache._lock:
+                # Do not drop a newer entry stored under the same key
+                if cache._data.get(wr.key) is wr:
+                    del cache._data[wr.key]
+
+        self._remove = remove
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: Optional[int]) -> None:
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ''' Returns the value for `key` (marking it as most recently used)
+        or `default` if there is no such value.
+
+        '''
+
+        with self._lock:
+            wr = self._data.get(key)
+            value = wr() if wr is not None else None
+
+            if value is None:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = KeyedRef(value, self._remove, key)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        wr = self._data.get(key)
+        return wr is not None and wr() is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        ''' Removes all entries and resets the statistics
+        '''
+
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self._maxsize, len(self._data))
+
+    def _evict(self) -> None:
+        if self._maxsize is None:
+            return
+
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,42 @@
+''' Profiling hooks
+
+The forward and backward passes of the functions (`Function.__call__`,
+`Tensor.backward`, `Tape.forward` / `Tape.backward`) and the flows
+(`Flow.__call__`) check `get_profiler()` before each call: if a profiler
+is active, the call is timed and recorded by it, otherwise the only cost
+is this check. See `nujo.utils.Profiler`.
+
+'''
+
+from contextvars import ContextVar
+from typing import Any
+
+__all__ = [
+    'get_profiler',
+]
+
+_PROFILER: 'ContextVar[Any]' = ContextVar('PROFILER', default=None)
+''' The active profiler (see `nujo.utils.Profiler`), None if profiling is
+disabled.
+
+It is a context variable, thus every thread (and asyncio task) has its own
+value: a profiler only records the calls of the thread (context) it was
+entered in. Read it using `get_profiler()` (or `_profiling.PROFILER`).
+
+'''
+
+
+def get_profiler() -> Any:
+    ''' Returns the active profiler of the current context, None if
+    profiling is disabled
+    '''
+
+    return _PROFILER.get()
+
+
+def __getattr__(name: str):
+    # `_profiling.PROFILER` returns the profiler of the current context
+    if name == 'PROFILER':
+        return _PROFILER.get()
+
+    raise AttributeError(f'module {__name__} has no attribute {name}')
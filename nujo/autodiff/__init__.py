@@ -1,12 +1,27 @@
 ''' nujo's core Reverse-mode Automatic Differentiation module
 '''
 
+from nujo.autodiff.census import Census, census
 from nujo.autodiff.function import Function
-from nujo.autodiff.modes import no_diff
+from nujo.autodiff.functional import hvp, jvp, vjp
+from nujo.autodiff.modes import (default_dtype, get_default_dtype, lazy,
+                                 no_diff, set_default_dtype)
+from nujo.autodiff.tape import Tape, capture
 from nujo.autodiff.tensor import Tensor
 
 __all__ = [
     'Function',
     'no_diff',
+    'lazy',
+    'get_default_dtype',
+    'set_default_dtype',
+    'default_dtype',
+    'Tape',
+    'capture',
+    'vjp',
+    'jvp',
+    'hvp',
+    'census',
+    'Census',
     'Tensor',
 ]
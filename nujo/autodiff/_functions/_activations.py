@@ -1,8 +1,12 @@
 from math import e
 from numbers import Number
-from typing import List, Union
+from typing import List, Optional, Union
 
-from numpy import exp, max, maximum, ndarray, ones, sum, zeros
+from numpy import add, divide, exp, greater, less, log, logical_not, max
+from numpy import maximum, multiply, ndarray, negative, ones, power, square
+from numpy import subtract, sum, where, zeros
+
+from nujo.autodiff._functions._aggregate import _InnerSum
 
 from nujo.autodiff.function import Function
 from nujo.autodiff.tensor import Tensor
@@ -24,6 +28,8 @@ __all__ = [
 
 
 class _BinaryStep(Function):
+    __slots__ = ('threshold', )
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  threshold=0.5):
@@ -39,11 +45,21 @@ class _BinaryStep(Function):
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         return accum_grad * zeros(self.children[0].shape)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        pass  # The gradient is zero
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return zeros(self.children[0].shape)
+
 
 # ====================================================================================================
 
 
 class _Sigmoid(Function):
+    __slots__ = ('_output', )
+    _saved_arrays = ('_output', )
+
     def __init__(self, input: Union[Tensor, ndarray, List[Number], Number]):
         super(_Sigmoid, self).__init__(input)
         self._output: ndarray = None  # Used to compute the derivative
@@ -52,14 +68,38 @@ class _Sigmoid(Function):
         self._output = 1 / (1 + exp(-self.children[0].value))
         return self._output
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        negative(self.children[0].value, out=out)
+        exp(out, out=out)
+        add(out, 1, out=out)
+
+        self._output = divide(1, out, out=out)
+        return self._output
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * self._output * (1 - self._output)
+        output = self._output_for(accum_grad)
+        return accum_grad * output * (1 - output)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self._output.shape, out.dtype)
+
+        subtract(1, self._output, out=grad)
+        multiply(grad, self._output, out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] * self._output * (1 - self._output)
 
 
 # ====================================================================================================
 
 
 class _TanH(Function):
+    __slots__ = ('_output', )
+    _saved_arrays = ('_output', )
+
     def __init__(self, input: Union[Tensor, ndarray, List[Number], Number]):
         super(_TanH, self).__init__(input)
         self._output: ndarray = None  # Used to compute the derivative
@@ -74,29 +114,70 @@ class _TanH(Function):
         self._output = (2 / (1 + exp(-2 * self.children[0].value))) - 1
         return self._output
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        multiply(self.children[0].value, -2, out=out)
+        exp(out, out=out)
+        add(out, 1, out=out)
+        divide(2, out, out=out)
+
+        self._output = subtract(out, 1, out=out)
+        return self._output
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * (1 - self._output**2)
+        return accum_grad * (1 - self._output_for(accum_grad)**2)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self._output.shape, out.dtype)
+
+        square(self._output, out=grad)
+        subtract(1, grad, out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] * (1 - self._output**2)
 
 
 # ====================================================================================================
 
 
 class _ReLU(Function):
+    __slots__ = ()
+
     def __init__(self, input: Union[Tensor, ndarray, List[Number], Number]):
         super(_ReLU, self).__init__(input)
 
     def forward(self) -> ndarray:
         return self.children[0].value * (self.children[0].value > 0)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return maximum(self.children[0].value, 0, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         return accum_grad * ones(
             self.children[0].shape) * (self.children[0].value > 0)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if accum_grad.shape != out.shape:
+            return super(_ReLU, self).backward_into(idx, accum_grad, out)
+
+        mask = self._buffer('mask', out.shape, bool)
+        greater(self.children[0].value, 0, out=mask)
+
+        add(out, accum_grad, out=out, where=mask)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] * (self.children[0].value > 0)
+
 
 # ====================================================================================================
 
 
 class _LeakyReLU(Function):
+    __slots__ = ('eps', )
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  eps=0.1):
@@ -108,11 +189,35 @@ class _LeakyReLU(Function):
         return maximum(self.eps * self.children[0].value,
                        self.children[0].value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        multiply(self.children[0].value, self.eps, out=out)
+        return maximum(out, self.children[0].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         dinput = ones(self.children[0].shape)
         dinput[self.children[0].value < 0] = self.eps
         return accum_grad * dinput
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if accum_grad.shape != out.shape:
+            return super(_LeakyReLU, self).backward_into(idx, accum_grad, out)
+
+        mask = self._buffer('mask', out.shape, bool)
+        grad = self._buffer('grad', out.shape, out.dtype)
+
+        # Negative inputs
+        less(self.children[0].value, 0, out=mask)
+        multiply(accum_grad, self.eps, out=grad)
+        add(out, grad, out=out, where=mask)
+
+        # Non-negative inputs
+        logical_not(mask, out=mask)
+        add(out, accum_grad, out=out, where=mask)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] * where(self.children[0].value < 0, self.eps, 1)
+
 
 # ====================================================================================================
 
@@ -120,6 +225,10 @@ class _LeakyReLU(Function):
 class _Swish(Function):
     ''' More info here: https://arxiv.org/abs/1710.05941
     '''
+
+    __slots__ = ('beta', '_sigmoid', '_output')
+    _saved_arrays = ('_sigmoid', '_output')
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  beta=1):
@@ -127,17 +236,39 @@ class _Swish(Function):
         super(_Swish, self).__init__(input)
         self.beta = beta
 
-        # Reuse the sigmoid activation function
-        self._sigmoid = _Sigmoid(beta * input.value)
-        self._output: ndarray = None  # Used to compute the derivative
+        # Used to compute the derivative
+        self._sigmoid: ndarray = None
+        self._output: ndarray = None
 
     def forward(self) -> ndarray:
-        self._output = self.children[0].value * self._sigmoid.forward()
+        # The sigmoid of the current input: the function may be evaluated
+        # again (e.g. reused from the function cache or deferred, see
+        # `modes.lazy`) after the input changed
+        input = self.children[0].value
+        self._sigmoid = 1 / (1 + exp(-self.beta * input))
+
+        self._output = input * self._sigmoid
         return self._output
 
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * (self._output + self._sigmoid._output *
-                             (1 - self._output))
+        # d(x * s(bx)) / dx = s(bx) + bx * s(bx) * (1 - s(bx))
+        #                   = b * output + s(bx) * (1 - b * output)
+        output = self._output_for(accum_grad)
+
+        if isinstance(accum_grad, Tensor):
+            sigmoid = _Sigmoid(self.children[0] * self.beta)()
+        else:
+            sigmoid = self._sigmoid
+
+        return accum_grad * (self.beta * output + sigmoid *
+                             (1 - self.beta * output))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        # d(x * s(bx)) = (s(bx) + bx * s(bx) * (1 - s(bx))) dx
+        input, sigmoid = self.children[0].value, self._sigmoid
+
+        return tangents[0] * sigmoid * (1 + self.beta * input *
+                                        (1 - sigmoid))
 
 
 # ====================================================================================================
@@ -148,6 +279,10 @@ class _Softmax(Function):
     https://aimatters.wordpress.com/2019/06/17/the-softmax-function-derivative/
 
     '''
+
+    __slots__ = ('dim', 'base', '_output')
+    _saved_arrays = ('_output', )
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  dim=0,
@@ -174,8 +309,46 @@ class _Softmax(Function):
         self._output = exps / sums
         return self._output
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        input = self.children[0].value
+
+        subtract(input, max(input, axis=self.dim, keepdims=True), out=out)
+        power(self.base, out, out=out)
+        divide(out, sum(out, axis=self.dim, keepdims=True), out=out)
+
+        self._output = out
+        return self._output
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * self._output * (1 - self._output)
+        # The Jacobian is ln(base) * (diag(output) - output output^T)
+        # along `dim`, so the gradient is
+        # ln(base) * output * (accum_grad - sum(accum_grad * output))
+        output = self._output_for(accum_grad)
+
+        if isinstance(accum_grad, Tensor):
+            inner = _InnerSum(accum_grad * output, dim=self.dim,
+                              keepdim=True)()
+        else:
+            inner = sum(accum_grad * output, axis=self.dim, keepdims=True)
+
+        return (accum_grad - inner) * output * log(self.base)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self._output.shape, out.dtype)
+
+        multiply(accum_grad, self._output, out=grad)
+        inner = sum(grad, axis=self.dim, keepdims=True)
+
+        subtract(accum_grad, inner, out=grad)
+        multiply(grad, self._output, out=grad)
+        multiply(grad, log(self.base), out=grad)
+
+        self._accumulate(out, grad)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        inner = sum(tangents[0] * self._output, axis=self.dim, keepdims=True)
+        return (tangents[0] - inner) * self._output * log(self.base)
 
 
 # ====================================================================================================
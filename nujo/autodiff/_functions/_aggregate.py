@@ -1,7 +1,7 @@
 from numbers import Number
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
-from numpy import ndarray, ones, prod, sum
+from numpy import add, expand_dims, ndarray, ones, prod, sum
 
 from nujo.autodiff.function import Function
 from nujo.autodiff.tensor import Tensor
@@ -14,37 +14,82 @@ __all__ = [
 # ====================================================================================================
 
 
-class _InnerSum(Function):
+class _Reduction(Function):
+    ''' Base class of the reductions of the input along `dim` (all of its
+    dimensions if None), keeping the reduced dimensions if `keepdim`
+    '''
+
+    __slots__ = ('dim', 'keepdim')
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  dim: Optional[int] = None,
                  keepdim=False):
 
-        super(_InnerSum, self).__init__(input)
+        super(_Reduction, self).__init__(input)
         self.dim = dim
         self.keepdim = keepdim
 
+    @property
+    def _keepdim_shape(self) -> Tuple[int, ...]:
+        ''' Shape of the output, if the reduced dimensions were kept
+        '''
+
+        shape = self.children[0].shape
+        dims = self.dim if isinstance(self.dim, tuple) else (self.dim, )
+        dims = [dim % len(shape) for dim in dims]
+
+        return tuple(1 if i in dims else size for i, size in enumerate(shape))
+
+
+# ====================================================================================================
+
+
+class _InnerSum(_Reduction):
+    __slots__ = ()
+
     def forward(self) -> ndarray:
         return sum(self.children[0].value,
                    axis=self.dim,
                    keepdims=self.keepdim)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return sum(self.children[0].value,
+                   axis=self.dim,
+                   keepdims=self.keepdim,
+                   out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        # Restore the summed dimensions, so `accum_grad` can be broadcast
+        if self.dim is not None and not self.keepdim:
+            accum_grad = accum_grad.reshape(*self._keepdim_shape)
+
         return accum_grad * ones(self.children[0].shape)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if self.dim is not None and not self.keepdim:
+            accum_grad = accum_grad.reshape(*self._keepdim_shape)
+
+        add(out, accum_grad, out=out)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return sum(tangents[0], axis=self.dim, keepdims=self.keepdim)
+
 
 # ====================================================================================================
 
 
-class _InnerProd(Function):
+class _InnerProd(_Reduction):
+    __slots__ = ('_output', )
+    _saved_arrays = ('_output', )
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  dim: Optional[int] = None,
                  keepdim=False):
 
-        super(_InnerProd, self).__init__(input)
-        self.dim = dim
-        self.keepdim = keepdim
+        super(_InnerProd, self).__init__(input, dim, keepdim)
 
         self._output: ndarray = None  # Used to compute the derivative
 
@@ -55,8 +100,35 @@ class _InnerProd(Function):
 
         return self._output
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        self._output = prod(self.children[0].value,
+                            axis=self.dim,
+                            keepdims=self.keepdim,
+                            out=out)
+
+        return self._output
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * self._output / self.children[0].value
+        # d(prod(x)) / dx = prod(x) / x
+        output = self._output_for(accum_grad)
+
+        # Restore the multiplied dimensions, so the output and `accum_grad`
+        # can be broadcast
+        if self.dim is not None and not self.keepdim:
+            accum_grad = accum_grad.reshape(*self._keepdim_shape)
+            output = output.reshape(*self._keepdim_shape)
+
+        return accum_grad * output / self._input_for(0, accum_grad)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        # d(prod(x)) = sum(prod(x) / x * dx)
+        output = self._output
+        if self.dim is not None and not self.keepdim:
+            output = expand_dims(output, self.dim)
+
+        return sum(output / self.children[0].value * tangents[0],
+                   axis=self.dim,
+                   keepdims=self.keepdim)
 
 
 # ====================================================================================================
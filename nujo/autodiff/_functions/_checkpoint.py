@@ -0,0 +1,111 @@
+from typing import Callable, Dict, List
+
+from numpy import ndarray, zeros
+
+from nujo.autodiff._utils import _topological_order
+from nujo.autodiff.function import Function
+from nujo.autodiff.modes import no_diff
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    '_Checkpoint',
+]
+
+# ====================================================================================================
+
+
+class _Checkpoint(Function):
+    ''' Activation checkpointing of a computation
+
+    The forward pass runs `fn` without building a computation graph,
+    so none of its intermediate tensors (and the arrays their functions
+    save for the backward pass) are kept alive. The backward pass runs
+    `fn` again, this time building its graph, and backpropagates through
+    it - trading compute for memory.
+
+    Higher-order derivatives are not recorded through a checkpoint.
+
+    Parameters:
+    -----------
+     - children : varargs, the inputs of `fn` followed by the parameters
+       it uses (the tensors to compute gradients for)
+     - fn : callable, the computation; called with the first
+       `num_inputs` children
+     - num_inputs : int, the number of inputs of `fn`
+
+    '''
+
+    __slots__ = ('fn', 'num_inputs', '_grads')
+
+    def __init__(self, *children: Tensor, fn: Callable[..., Tensor],
+                 num_inputs: int):
+
+        super(_Checkpoint, self).__init__(*children)
+
+        self.fn = fn
+        self.num_inputs = num_inputs
+
+        # Gradients of the children computed by the last recomputation,
+        # each removed when it is handed to the backward pass
+        self._grads: Dict[int, ndarray] = {}
+
+    def forward(self) -> ndarray:
+        with no_diff():
+            return self.fn(*self.children[:self.num_inputs]).value
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if idx not in self._grads:
+            self._recompute(getattr(accum_grad, 'value', accum_grad))
+
+        return self._grads.pop(idx)
+
+    def _recompute(self, accum_grad: ndarray) -> None:
+        ''' Runs `fn` again building its computation graph, backpropagates
+        `accum_grad` through it and saves the gradients of the children.
+        '''
+
+        # Fresh inputs, so that the recomputed graph is separate
+        inputs = [
+            Tensor(input.value, diff=input.diff, name=input.name)
+            for input in self.children[:self.num_inputs]
+        ]
+
+        # The parameters are shared with the recomputed graph, their
+        # accumulated gradients are set aside while it is differentiated
+        params = self.children[self.num_inputs:]
+        stashed_grads = [param._grad for param in params]
+
+        try:
+            for param in params:
+                param._grad = None
+
+            output = self.fn(*inputs)
+            ordering = _topological_order(output)
+            graph = {node.id for node in ordering}
+
+            output.zero_grad(propagate=False)
+            output._grad._value += accum_grad
+
+            for node in reversed(ordering[:-1]):
+                node.compute_grad(_graph=graph)
+
+            # Tensors not used by `fn` have zero gradients
+            tensors: List[Tensor] = inputs + params
+            self._grads = {
+                idx: tensor._grad._value if tensor._grad is not None else
+                zeros(tensor.shape, tensor.value.dtype)
+                for idx, tensor in enumerate(tensors) if tensor.diff
+            }
+
+            # Release the recomputed activations and their gradients right
+            # away, instead of when the garbage collector frees the graph
+            for node in ordering:
+                if node.creator is not None:
+                    node._value = node._grad = None
+
+        finally:
+            for param, grad in zip(params, stashed_grads):
+                param._grad = grad
+
+
+# ====================================================================================================
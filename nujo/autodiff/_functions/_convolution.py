@@ -0,0 +1,226 @@
+from numbers import Number
+from typing import List, Optional, Tuple, Union
+
+from numpy import conj, matmul, ndarray, zeros
+from numpy.fft import irfft2, rfft2
+
+from nujo.autodiff._functions._transform import _Col2im, _Im2col
+from nujo.autodiff._utils import _sum_tangents
+from nujo.autodiff.function import Function
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    '_Conv2dFFT',
+]
+
+# ====================================================================================================
+
+
+class _Conv2dFFT(Function):
+    ''' 2D convolution (cross-correlation) computed in the frequency domain
+
+    The images and the (dilated) kernels are transformed with a real FFT
+    of the size of the images; the correlation of each pair of input and
+    output channels is then a product of the transforms, summed over the
+    input channels by a batched matrix multiplication per frequency. The
+    cost does not grow with the size of the kernels (unlike im2col, which
+    copies the images `kernel_height * kernel_width` times), so it pays
+    off for large kernels.
+
+    The circular correlation equals the linear one on the valid region
+    (the kernels never wrap around the images there), which is then
+    subsampled by the stride.
+
+    Parameters:
+    -----------
+     - input : image shaped array, shape: (batch_size, channels, height, width)
+     - kernels : array of shape (out_channels, channels, kernel_height,
+       kernel_width)
+     - stride : tuple of 2 integers, stride of the convolution
+     - dilation : tuple of 2 integers, spacing between kernel elements
+
+    '''
+
+    __slots__ = ('stride', 'dilation', '_input_fft', '_kernels_fft')
+    _saved_arrays = ('_input_fft', '_kernels_fft')
+
+    def __init__(self, input: Union[Tensor, ndarray, List[Number], Number],
+                 kernels: Union[Tensor, ndarray, List[Number], Number],
+                 stride: Tuple[int, int], dilation: Tuple[int, int]):
+
+        super(_Conv2dFFT, self).__init__(input, kernels)
+
+        assert len(self.children[0].shape) == 4
+        assert len(self.children[1].shape) == 4
+        assert self.children[0].shape[1] == self.children[1].shape[1]
+
+        self.stride = stride
+        self.dilation = dilation
+
+        # Transforms of the inputs, saved for the backward pass
+        self._input_fft: ndarray = None
+        self._kernels_fft: ndarray = None
+
+    def forward(self) -> ndarray:
+        images, kernels = self.children[0].value, self.children[1].value
+
+        self._input_fft = rfft2(images)
+        self._kernels_fft = self._kernels_transform(kernels)
+
+        return self._correlate(self._input_fft, self._kernels_fft,
+                               images.dtype)
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):
+            return self._recorded_backward(idx, accum_grad)
+
+        height, width = self.children[0].shape[2:]
+
+        # The gradient of every position of the stride 1 correlation
+        grad_fft = rfft2(self._upsample(accum_grad))
+
+        if idx == 0:
+            # Full convolution of the gradient with the kernels,
+            # summed over the output channels
+            return irfft2(
+                _channel_matmul(grad_fft, self._kernels_fft),
+                s=(height, width)).astype(accum_grad.dtype, copy=False)
+
+        # Correlation of the images with the gradient, summed over the batch
+        kernels_grad = irfft2(
+            _batch_matmul(conj(grad_fft), self._input_fft),
+            s=(height, width))
+
+        return kernels_grad[(..., *self._kernel_slices)]\
+            .astype(accum_grad.dtype)
+
+    def _recorded_backward(self, idx: int, accum_grad: Tensor) -> Tensor:
+        ''' Records the computation of the gradient (so that it can be
+        differentiated again, e.g. for Hessian-vector products)
+
+        The transforms are not recorded: the gradient is computed with the
+        im2col formulation of the convolution instead, whose transformations
+        (`_Im2col` and `_Col2im`) are the backward passes of each other.
+
+        '''
+
+        images, kernels = self.children
+        out_channels, _, *kernel_size = kernels.shape
+
+        # The gradient of the column form of the output (see `Conv2d`)
+        grad_col = accum_grad.transpose(1, 2, 3, 0).reshape(out_channels, -1)
+
+        if idx == 0:
+            kernels_col = self._input_for(1, accum_grad)\
+                .reshape(out_channels, -1)
+
+            return _Col2im(kernels_col.transpose(1, 0) @ grad_col,
+                           images.shape, tuple(kernel_size), self.stride,
+                           self.dilation)()
+
+        images_col = _Im2col(self._input_for(0, accum_grad),
+                             tuple(kernel_size), self.stride, self.dilation)()
+
+        return (grad_col @ images_col.transpose(1, 0)).reshape(*kernels.shape)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        dtype = self.children[0].value.dtype
+        tangent_input, tangent_kernels = tangents
+
+        # The convolution is bilinear
+        return _sum_tangents(
+            self._correlate(rfft2(tangent_input), self._kernels_fft, dtype)
+            if tangent_input is not None else None,
+            self._correlate(self._input_fft,
+                            self._kernels_transform(tangent_kernels), dtype)
+            if tangent_kernels is not None else None)
+
+    def _correlate(self, input_fft: ndarray, kernels_fft: ndarray,
+                   dtype) -> ndarray:
+        ''' Returns the strided correlation of the transformed images and
+        kernels, of shape (batch_size, out_channels, out_height, out_width)
+        '''
+
+        # Sum over the input channels of the products of the transforms
+        output = irfft2(_channel_matmul(input_fft, conj(kernels_fft),
+                                        transpose=True),
+                        s=self.children[0].shape[2:])
+
+        return output[(..., *self._output_slices)].astype(dtype)
+
+    def _kernels_transform(self, kernels: ndarray) -> ndarray:
+        ''' Returns the transform of the dilated `kernels`, zero-padded to
+        the size of the images
+        '''
+
+        dilated = zeros((*kernels.shape[:2], *self.children[0].shape[2:]),
+                        kernels.dtype)
+        dilated[(..., *self._kernel_slices)] = kernels
+
+        return rfft2(dilated)
+
+    def _upsample(self, grad: ndarray) -> ndarray:
+        ''' Places the gradient of the strided output on the grid of the
+        stride 1 correlation (of the size of the images)
+        '''
+
+        upsampled = zeros((*grad.shape[:2], *self.children[0].shape[2:]),
+                          grad.dtype)
+        upsampled[(..., *self._output_slices)] = grad
+
+        return upsampled
+
+    @property
+    def _kernel_slices(self) -> Tuple[slice, slice]:
+        ''' The positions of the elements of the dilated kernels
+        '''
+
+        return tuple(
+            slice(0, (size - 1) * (dilation + 1) + 1, dilation + 1)
+            for size, dilation in zip(self.children[1].shape[2:],
+                                      self.dilation))
+
+    @property
+    def _output_slices(self) -> Tuple[slice, slice]:
+        ''' The positions of the strided output in the stride 1 correlation
+        '''
+
+        return tuple(
+            slice(0, size - (kernel_size - 1) * (dilation + 1), stride)
+            for size, kernel_size, stride, dilation in zip(
+                self.children[0].shape[2:], self.children[1].shape[2:],
+                self.stride, self.dilation))
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _channel_matmul(a: ndarray, b: ndarray, transpose=False) -> ndarray:
+    ''' Sums the products of the transforms over the shared channels
+
+    With `transpose`, `a` is (batch, channels, ...) and `b` is
+    (out_channels, channels, ...), and the result is (batch, out_channels,
+    ...); otherwise `a` is (batch, out_channels, ...), `b` is
+    (out_channels, channels, ...) and the result is (batch, channels, ...).
+
+    '''
+
+    # Move the frequencies to the front, to multiply matrices per frequency
+    a = a.transpose(2, 3, 0, 1)
+    b = b.transpose(2, 3, 1, 0) if transpose else b.transpose(2, 3, 0, 1)
+
+    return matmul(a, b).transpose(2, 3, 0, 1)
+
+
+def _batch_matmul(a: ndarray, b: ndarray) -> ndarray:
+    ''' Sums the products of the transforms over the batch: `a` is (batch,
+    out_channels, ...), `b` is (batch, channels, ...) and the result is
+    (out_channels, channels, ...)
+    '''
+
+    return matmul(a.transpose(2, 3, 1, 0),
+                  b.transpose(2, 3, 0, 1)).transpose(2, 3, 0, 1)
+
+
+# ====================================================================================================
@@ -1,8 +1,10 @@
 from numbers import Number
-from typing import List, Union
+from typing import List, Optional, Union
 
-from numpy import log, ndarray, ones
+from numpy import add, broadcast_shapes, divide, log, matmul, multiply
+from numpy import ndarray, negative, power, square, subtract
 
+from nujo.autodiff._utils import _sum_tangents, _unbroadcast
 from nujo.autodiff.function import Function
 from nujo.autodiff.tensor import Tensor
 
@@ -20,79 +22,128 @@ __all__ = [
 
 
 class _Addition(Function):
+    ''' Elementwise addition, with NumPy broadcasting such as:
+
+        [[1, 2, 3]] + [[1], = [[2, 3, 4],
+                       [2],    [3, 4, 5],
+                       [3]]    [4, 5, 6]]
+
+    The gradients are summed over the broadcast axes (see `_unbroadcast`).
+
+    '''
+
+    __slots__ = ()
+
     def __init__(self, input_a: Union[Tensor, ndarray, List[Number], Number],
                  input_b: Union[Tensor, ndarray, List[Number], Number]):
 
         super(_Addition, self).__init__(input_a, input_b)
 
-        # The following assert will not allow numpy's
-        # vector broadcasts such as:
-        #
-        #   [[1, 2, 3]] + [[1], = [[2, 3, 4],
-        #                  [2],    [3, 4, 5],
-        #                  [3]]    [4, 5, 6]]
-        #
-        # In future versions of nujo this may be supported.
-
-        assert (self.children[0].value.shape == self.children[1].value.shape or
-                self.children[0].value.shape != self.children[1].value.T.shape)
-
     def forward(self) -> ndarray:
         return self.children[0].value + self.children[1].value
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return add(self.children[0].value, self.children[1].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * ones(self.children[idx].shape)
+        return _unbroadcast(accum_grad, self.children[idx].shape)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        self._accumulate(out, accum_grad)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return _sum_tangents(*tangents)
 
 
 # ====================================================================================================
 
 
 class _Negation(Function):
+    __slots__ = ()
+
     def __init__(self, input: Union[Tensor, ndarray, List[Number], Number]):
         super(_Negation, self).__init__(input)
 
     def forward(self) -> ndarray:
         return -self.children[0].value
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return negative(self.children[0].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * -ones(self.children[0].shape)
+        return -_unbroadcast(accum_grad, self.children[0].shape)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if accum_grad.shape == out.shape:
+            subtract(out, accum_grad, out=out)
+        else:
+            grad = self._buffer('grad', accum_grad.shape, out.dtype)
+            self._accumulate(out, negative(accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return -tangents[0]
 
 
 # ====================================================================================================
 
 
 class _Multiplication(Function):
+    ''' Elementwise multiplication, with NumPy broadcasting such as:
+
+        [[1, 2, 3]] * [[1], = [[1, 2, 3],
+                       [2],    [2, 4, 6],
+                       [3]]    [3, 6, 9]]
+
+    The gradients are summed over the broadcast axes (see `_unbroadcast`).
+
+    '''
+
+    __slots__ = ()
+
     def __init__(self, input_a: Union[Tensor, ndarray, List[Number], Number],
                  input_b: Union[Tensor, ndarray, List[Number], Number]):
 
         super(_Multiplication, self).__init__(input_a, input_b)
 
-        # The following assert will not allow numpy's
-        # vector broadcasts such as:
-        #
-        #   [[1, 2, 3]] * [[1], = [[1, 2, 3],
-        #                  [2],    [2, 4, 6],
-        #                  [3]]    [3, 6, 6]]
-        #
-        # In future versions of nujo this may be supported.
-
-        assert (self.children[0].value.shape == self.children[1].value.shape or
-                self.children[0].value.shape != self.children[1].value.T.shape)
-
     def forward(self) -> ndarray:
         return self.children[0].value * self.children[1].value
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return multiply(self.children[0].value,
+                        self.children[1].value,
+                        out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        if idx == 0:
-            return accum_grad * self.children[1].value
-        else:
-            return accum_grad * self.children[0].value
+        grad = accum_grad * self._input_for(1 - idx, accum_grad)
+        return _unbroadcast(grad, self.children[idx].shape)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        other = self.children[1 - idx].value
+
+        grad = self._buffer(f'grad{idx}',
+                            broadcast_shapes(accum_grad.shape, other.shape),
+                            out.dtype)
+
+        self._accumulate(out, multiply(accum_grad, other, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        input_a, input_b = self.children[0].value, self.children[1].value
+        tangent_a, tangent_b = tangents
+
+        return _sum_tangents(
+            tangent_a * input_b if tangent_a is not None else None,
+            input_a * tangent_b if tangent_b is not None else None)
 
 
 # ====================================================================================================
 
 
 class _Reciprocal(Function):
+    __slots__ = ('eps', )
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  eps=1e-18):
@@ -103,14 +154,40 @@ class _Reciprocal(Function):
     def forward(self) -> ndarray:
         return 1 / (self.children[0].value + self.eps)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        add(self.children[0].value, self.eps, out=out)
+        return divide(1, out, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        return accum_grad * -1 / ((self.children[0].value + self.eps)**2)
+        input = self._input_for(0, accum_grad)
+
+        return _unbroadcast(accum_grad * -1 / ((input + self.eps)**2),
+                            self.children[0].shape)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        input = self.children[0].value
+
+        grad = self._buffer('grad',
+                            broadcast_shapes(accum_grad.shape, input.shape),
+                            out.dtype)
+
+        add(input, self.eps, out=grad)
+        square(grad, out=grad)
+        divide(accum_grad, grad, out=grad)
+
+        self._accumulate(out, negative(grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return -tangents[0] / (self.children[0].value + self.eps)**2
 
 
 # ====================================================================================================
 
 
 class _Power(Function):
+    __slots__ = ()
+
     def __init__(self, input_a: Union[Tensor, ndarray, List[Number], Number],
                  input_b: Union[Tensor, ndarray, List[Number], Number]):
 
@@ -119,20 +196,56 @@ class _Power(Function):
     def forward(self) -> ndarray:
         return self.children[0].value**self.children[1].value
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return power(self.children[0].value, self.children[1].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         # TODO: FIX wrong partial - the second
 
         if idx == 0:
-            return accum_grad * self.children[1].value *\
-                    self.children[0].value**(self.children[1].value - 1)
+            base = self._input_for(0, accum_grad)
+            exponent = self._input_for(1, accum_grad)
+
+            return _unbroadcast(accum_grad * exponent * base**(exponent - 1),
+                                self.children[0].shape)
         else:
             return type(accum_grad)(1)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if idx != 0:
+            return super(_Power, self).backward_into(idx, accum_grad, out)
+
+        base, exponent = self.children[0].value, self.children[1].value
+
+        grad = self._buffer(
+            'grad',
+            broadcast_shapes(accum_grad.shape, base.shape, exponent.shape),
+            out.dtype)
+
+        subtract(exponent, 1, out=grad)
+        power(base, grad, out=grad)
+        multiply(grad, exponent, out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        base, exponent = self.children[0].value, self.children[1].value
+        tangent_base, tangent_exponent = tangents
+
+        return _sum_tangents(
+            tangent_base * exponent * base**(exponent - 1)
+            if tangent_base is not None else None,
+            tangent_exponent * base**exponent * log(base)
+            if tangent_exponent is not None else None)
+
 
 # ====================================================================================================
 
 
 class _Logarithm(Function):
+    __slots__ = ()
+
     def __init__(self, input_a: Union[Tensor, ndarray, List[Number], Number],
                  input_b: Union[Tensor, ndarray, List[Number], Number]):
 
@@ -145,20 +258,55 @@ class _Logarithm(Function):
     def forward(self) -> ndarray:
         return log(self.children[0].value) / log(self.children[1].value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        log(self.children[0].value, out=out)
+        return divide(out, log(self.children[1].value), out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         # TODO: FIX wrong partial - the second
 
         if idx == 0:
-            return accum_grad /\
-                    (self.children[0].value * log(self.children[1].value))
+            return _unbroadcast(
+                accum_grad / (self._input_for(0, accum_grad) *
+                              log(self.children[1].value)),
+                self.children[0].shape)
         else:
             return type(accum_grad)(1)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if idx != 0:
+            return super(_Logarithm, self).backward_into(idx, accum_grad, out)
+
+        input, base = self.children[0].value, self.children[1].value
+
+        grad = self._buffer(
+            'grad', broadcast_shapes(accum_grad.shape, input.shape,
+                                     base.shape), out.dtype)
+
+        log(base, out=grad)
+        multiply(grad, input, out=grad)
+
+        self._accumulate(out, divide(accum_grad, grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        input, base = self.children[0].value, self.children[1].value
+        tangent_input, tangent_base = tangents
+
+        # d(log_b(x)) = dx / (x ln(b)) - db ln(x) / (b ln(b)^2)
+        return _sum_tangents(
+            tangent_input / (input * log(base))
+            if tangent_input is not None else None,
+            -tangent_base * log(input) / (base * log(base)**2)
+            if tangent_base is not None else None)
+
 
 # ====================================================================================================
 
 
 class _MatrixMul(Function):
+    __slots__ = ()
+
     def __init__(self, input_a: Union[Tensor, ndarray, List[Number], Number],
                  input_b: Union[Tensor, ndarray, List[Number], Number]):
 
@@ -171,11 +319,39 @@ class _MatrixMul(Function):
     def forward(self) -> ndarray:
         return self.children[0].value @ self.children[1].value
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return matmul(self.children[0].value, self.children[1].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         if idx == 0:
-            return accum_grad @ self.children[1].value.T
+            return accum_grad @ self._input_for(1, accum_grad).T
         else:
-            return (accum_grad.T @ self.children[0].value).T
+            return (accum_grad.T @ self._input_for(0, accum_grad)).T
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        input_a, input_b = self.children[0].value, self.children[1].value
+
+        # Only matrices are multiplied in-place
+        if not accum_grad.ndim == input_a.ndim == input_b.ndim == 2:
+            return super(_MatrixMul, self).backward_into(idx, accum_grad, out)
+
+        grad = self._buffer(f'grad{idx}', out.shape, out.dtype)
+
+        if idx == 0:
+            matmul(accum_grad, input_b.T, out=grad)
+        else:
+            matmul(input_a.T, accum_grad, out=grad)
+
+        add(out, grad, out=out)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        input_a, input_b = self.children[0].value, self.children[1].value
+        tangent_a, tangent_b = tangents
+
+        return _sum_tangents(
+            tangent_a @ input_b if tangent_a is not None else None,
+            input_a @ tangent_b if tangent_b is not None else None)
 
 
 # ====================================================================================================
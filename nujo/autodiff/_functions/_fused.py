@@ -0,0 +1,385 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from numpy import add, cos, divide, dtype, empty, exp, greater, less, log
+from numpy import maximum, multiply, ndarray, negative, power, sin, square
+from numpy import subtract, tan, tanh, zeros
+
+from nujo.autodiff._functions._activations import (_LeakyReLU, _ReLU,
+                                                   _Sigmoid, _TanH)
+from nujo.autodiff._functions._elementary import (_Addition, _Multiplication,
+                                                  _Negation, _Power,
+                                                  _Reciprocal)
+from nujo.autodiff._functions._trigonometric import _Cos, _Sin, _Tan
+from nujo.autodiff.function import Function
+from nujo.autodiff.modes import no_diff
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    '_FusedElementwise',
+    '_is_elementwise',
+]
+
+# ====================================================================================================
+# Elementwise kernels
+#  - `forward(function, args, out)` writes the output of `function`
+#    computed from the arrays `args` into `out`
+#  - `vjp(function, idx, args, output, accum_grad, grad)` returns the
+#    gradient w.r.t. `args[idx]`, broadcast to the shape of the output;
+#    `grad` is a scratch buffer of that shape
+# ====================================================================================================
+
+
+def _addition_forward(function, args, out):
+    add(args[0], args[1], out=out)
+
+
+def _addition_vjp(function, idx, args, output, accum_grad, grad):
+    return accum_grad
+
+
+def _negation_forward(function, args, out):
+    negative(args[0], out=out)
+
+
+def _negation_vjp(function, idx, args, output, accum_grad, grad):
+    return negative(accum_grad, out=grad)
+
+
+def _multiplication_forward(function, args, out):
+    multiply(args[0], args[1], out=out)
+
+
+def _multiplication_vjp(function, idx, args, output, accum_grad, grad):
+    return multiply(accum_grad, args[1 - idx], out=grad)
+
+
+def _reciprocal_forward(function, args, out):
+    add(args[0], function.eps, out=out)
+    divide(1, out, out=out)
+
+
+def _reciprocal_vjp(function, idx, args, output, accum_grad, grad):
+    # d(1 / x) = -1 / x^2 = -output^2
+    square(output, out=grad)
+    multiply(grad, accum_grad, out=grad)
+    return negative(grad, out=grad)
+
+
+def _power_forward(function, args, out):
+    power(args[0], args[1], out=out)
+
+
+def _power_vjp(function, idx, args, output, accum_grad, grad):
+    base, exponent = args
+
+    if idx == 0:
+        subtract(exponent, 1, out=grad)
+        power(base, grad, out=grad)
+        multiply(grad, exponent, out=grad)
+    else:
+        log(base, out=grad)
+        multiply(grad, output, out=grad)
+
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _sigmoid_forward(function, args, out):
+    negative(args[0], out=out)
+    exp(out, out=out)
+    add(out, 1, out=out)
+    divide(1, out, out=out)
+
+
+def _sigmoid_vjp(function, idx, args, output, accum_grad, grad):
+    subtract(1, output, out=grad)
+    multiply(grad, output, out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _tanh_forward(function, args, out):
+    tanh(args[0], out=out)
+
+
+def _tanh_vjp(function, idx, args, output, accum_grad, grad):
+    square(output, out=grad)
+    subtract(1, grad, out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _relu_forward(function, args, out):
+    maximum(args[0], 0, out=out)
+
+
+def _relu_vjp(function, idx, args, output, accum_grad, grad):
+    greater(args[0], 0, out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _leaky_relu_forward(function, args, out):
+    multiply(args[0], function.eps, out=out)
+    maximum(out, args[0], out=out)
+
+
+def _leaky_relu_vjp(function, idx, args, output, accum_grad, grad):
+    # 1 for non-negative inputs, eps for negative ones
+    less(args[0], 0, out=grad)
+    multiply(grad, function.eps - 1, out=grad)
+    add(grad, 1, out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _sin_forward(function, args, out):
+    sin(args[0], out=out)
+
+
+def _sin_vjp(function, idx, args, output, accum_grad, grad):
+    cos(args[0], out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _cos_forward(function, args, out):
+    cos(args[0], out=out)
+
+
+def _cos_vjp(function, idx, args, output, accum_grad, grad):
+    sin(args[0], out=grad)
+    negative(grad, out=grad)
+    return multiply(grad, accum_grad, out=grad)
+
+
+def _tan_forward(function, args, out):
+    tan(args[0], out=out)
+
+
+def _tan_vjp(function, idx, args, output, accum_grad, grad):
+    cos(args[0], out=grad)
+    square(grad, out=grad)
+    return divide(accum_grad, grad, out=grad)
+
+
+_KERNELS: Dict[type, Tuple[Callable, Callable]] = {
+    _Addition: (_addition_forward, _addition_vjp),
+    _Negation: (_negation_forward, _negation_vjp),
+    _Multiplication: (_multiplication_forward, _multiplication_vjp),
+    _Reciprocal: (_reciprocal_forward, _reciprocal_vjp),
+    _Power: (_power_forward, _power_vjp),
+    _Sigmoid: (_sigmoid_forward, _sigmoid_vjp),
+    _TanH: (_tanh_forward, _tanh_vjp),
+    _ReLU: (_relu_forward, _relu_vjp),
+    _LeakyReLU: (_leaky_relu_forward, _leaky_relu_vjp),
+    _Sin: (_sin_forward, _sin_vjp),
+    _Cos: (_cos_forward, _cos_vjp),
+    _Tan: (_tan_forward, _tan_vjp),
+}
+
+# ====================================================================================================
+
+
+def _is_elementwise(tensor: Tensor) -> bool:
+    ''' Whether `tensor` is the output of an elementwise function
+    that can be fused (see `_FusedElementwise`)
+    '''
+
+    return tensor.creator is not None and \
+        type(tensor.creator) in _KERNELS and \
+        tensor.creator._output_placeholder is tensor
+
+
+# ====================================================================================================
+
+
+class _FusedElementwise(Function):
+    ''' A chain of elementwise functions evaluated as a single function
+
+    The outputs of the fused functions, except for the last one, are
+    written into scratch buffers reused by every call, instead of a new
+    array (and a new tensor in the computation graph) per function. The
+    backward pass goes through the chain at once, when the gradient of the
+    first input is requested, and keeps the gradients of all the inputs
+    until the next forward pass.
+
+    Parameters:
+    -----------
+     - children : varargs, the inputs of the chain
+     - functions : list of Functions, the fused functions in topological
+       order; the output of the last one is the output of the chain
+     - args : list of tuples of ints, the inputs of each function as
+       slots, where slot `i < len(children)` is the i-th child and slot
+       `len(children) + j` is the output of the j-th function
+     - shapes : list of tuples of ints, the output shape of each function
+     - dtypes : list of dtypes, the output dtype of each function
+
+    '''
+
+    __slots__ = ('functions', 'args', 'shapes', 'dtypes', '_values',
+                 '_grads')
+
+    def __init__(self, *children: Tensor, functions: Sequence[Function],
+                 args: Sequence[Tuple[int, ...]],
+                 shapes: Sequence[Tuple[int, ...]], dtypes: Sequence[dtype]):
+
+        super(_FusedElementwise, self).__init__(*children)
+
+        self.functions = list(functions)
+        self.args = list(args)
+        self.shapes = list(shapes)
+        self.dtypes = list(dtypes)
+
+        # Values of all slots, saved by the forward pass
+        self._values: Optional[List[ndarray]] = None
+
+        # Contributions to the gradients of the children,
+        # computed once per forward pass
+        self._grads: Optional[List[List[ndarray]]] = None
+
+    @classmethod
+    def from_tensors(cls, tensors: Sequence[Tensor]) -> '_FusedElementwise':
+        ''' Fuses the functions which created `tensors`
+
+        Parameters:
+        -----------
+         - tensors : list of Tensors, outputs of elementwise functions in
+           topological order; all but the last are only used by the next
+           functions of the chain
+
+        Returns:
+        --------
+         - function : _FusedElementwise, computing the last tensor
+
+        '''
+
+        fused = {tensor.id for tensor in tensors}
+
+        slots: Dict[int, int] = {}
+        children: List[Tensor] = []
+        for tensor in tensors:
+            for child in tensor.creator.children:
+                if child.id not in fused and child.id not in slots:
+                    slots[child.id] = len(children)
+                    children.append(child)
+
+        for j, tensor in enumerate(tensors):
+            slots[tensor.id] = len(children) + j
+
+        # Not a part of the computation graph: the fused tensors keep
+        # their creators and the children are not linked to its output
+        with no_diff():
+            return cls(*children,
+                       functions=[tensor.creator for tensor in tensors],
+                       args=[
+                           tuple(slots[child.id]
+                                 for child in tensor.creator.children)
+                           for tensor in tensors
+                       ],
+                       shapes=[tensor.shape for tensor in tensors],
+                       dtypes=[tensor.value.dtype for tensor in tensors])
+
+    def forward(self) -> ndarray:
+        # Only the output of the chain is a new array
+        return self.forward_into(empty(self.shapes[-1], self.dtypes[-1]))
+
+    def forward_into(self, out: ndarray) -> ndarray:
+        values = [child.value for child in self.children]
+        last = len(self.functions) - 1
+
+        for j, function in enumerate(self.functions):
+            forward, _ = _KERNELS[type(function)]
+
+            if j < last:
+                out_j = self._buffer(f'value{j}', self.shapes[j],
+                                     self.dtypes[j])
+            else:
+                out_j = out
+
+            forward(function, [values[slot] for slot in self.args[j]], out_j)
+            values.append(out_j)
+
+        self._values = values
+        self._grads = None
+
+        return values[-1]
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        accum_grad = getattr(accum_grad, 'value', accum_grad)
+
+        grad = zeros(self.children[idx].shape, self.dtypes[-1])
+        self.backward_into(idx, accum_grad, grad)
+
+        return grad
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        if self._grads is None:
+            self._backpropagate(accum_grad)
+
+        for grad in self._grads[idx]:
+            self._accumulate(out, grad)
+
+    def _backpropagate(self, accum_grad: ndarray) -> None:
+        ''' Backpropagates `accum_grad` through the chain, saving the
+        contributions to the gradients of the differentiable children.
+
+        The gradient of an output used once in the chain is the array its
+        contribution was computed into (each function input has a scratch
+        buffer of its own), so only the outputs used more than once are
+        accumulated into buffers.
+
+        '''
+
+        num_children = len(self.children)
+        num_slots = num_children + len(self.functions)
+
+        # Only the slots depending on a differentiable child need gradients
+        needs_grad = [child.diff for child in self.children]
+        for args in self.args:
+            needs_grad.append(any(needs_grad[slot] for slot in args))
+
+        uses = [0] * num_slots
+        for args in self.args:
+            for slot in args:
+                uses[slot] += 1
+
+        grads: List[Optional[ndarray]] = [None] * num_slots
+        grads[-1] = accum_grad
+
+        contributions: List[List[ndarray]] = [[] for _ in self.children]
+
+        for j in reversed(range(len(self.functions))):
+            slot = num_children + j
+            if not needs_grad[slot]:
+                continue
+
+            function, args = self.functions[j], self.args[j]
+            _, vjp = _KERNELS[type(function)]
+
+            arg_values = [self._values[arg] for arg in args]
+
+            for k, arg in enumerate(args):
+                if not needs_grad[arg]:
+                    continue
+
+                grad = vjp(
+                    function, k, arg_values, self._values[slot], grads[slot],
+                    self._buffer(f'vjp{j}_{k}', self.shapes[j],
+                                 self.dtypes[-1]))
+
+                if arg < num_children:
+                    contributions[arg].append(grad)
+                    continue
+
+                shape = self.shapes[arg - num_children]
+                if uses[arg] == 1 and grad.shape == shape:
+                    grads[arg] = grad
+                    continue
+
+                if grads[arg] is None:
+                    grads[arg] = self._buffer(f'grad{arg}', shape,
+                                              self.dtypes[-1])
+                    grads[arg].fill(0)
+
+                self._accumulate(grads[arg], grad)
+
+        self._grads = contributions
+
+
+# ====================================================================================================
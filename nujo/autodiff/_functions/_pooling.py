@@ -0,0 +1,343 @@
+from numbers import Number
+from typing import Callable, List, Optional, Tuple, Union
+
+from numpy import (add, arange, copyto, empty, equal, full, greater,
+                   maximum, min_scalar_type, moveaxis, multiply, ndarray,
+                   subtract, zeros)
+from numpy.lib.stride_tricks import as_strided
+
+from nujo.autodiff._functions._transform import _Col2im
+from nujo.autodiff.function import Function
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    '_MaxPool2d',
+    '_AvgPool2d',
+]
+
+# ====================================================================================================
+
+
+class _Pool2d(Function):
+    ''' Base class of the 2D pooling functions
+
+    The local regions of the input (the windows of the pooling) are read
+    from a strided view of it, without copying the data.
+
+    Parameters:
+    -----------
+     - input : image shaped array, shape: (batch_size, channels, height, width)
+       or (batch_size, height, width, channels) with the 'NHWC' layout
+     - kernel_size : tuple of 2 integers, size of the windows
+     - stride : tuple of 2 integers, stride of the windows
+     - dilation : tuple of 2 integers, spacing between window elements
+     - layout : str, 'NCHW' (channels first, the default) or 'NHWC'
+       (channels last), the layout of the input and the output
+
+    '''
+
+    __slots__ = ('kernel_size', 'stride', 'dilation', 'layout')
+
+    def __init__(self,
+                 input: Union[Tensor, ndarray, List[Number], Number],
+                 kernel_size: Tuple[int, int],
+                 stride: Tuple[int, int],
+                 dilation: Tuple[int, int],
+                 layout='NCHW'):
+
+        super(_Pool2d, self).__init__(input)
+
+        # Shape of `input` should be: (batch_size, channels, height, width)
+        # or (batch_size, height, width, channels)
+        assert len(self.children[0].shape) == 4
+        assert layout in ('NCHW', 'NHWC')
+
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.dilation = dilation
+        self.layout = layout
+
+    def _windows(self, images: ndarray) -> ndarray:
+        ''' Returns a read-only strided view of the windows of `images`, of
+        shape (batch_size, channels, out_height, out_width, kernel_height,
+        kernel_width), or (batch_size, out_height, out_width, channels,
+        kernel_height, kernel_width) with the channels-last layout
+        '''
+
+        window_strides = (images.strides[self._rows_axis] *
+                          (self.dilation[0] + 1),
+                          images.strides[self._rows_axis + 1] *
+                          (self.dilation[1] + 1))
+
+        if self.layout == 'NHWC':
+            batch_step, row_step, col_step, channel_step = images.strides
+            batch_size, _, _, channels = images.shape
+
+            return as_strided(
+                images,
+                shape=(batch_size, *self._output_shape(images.shape),
+                       channels, *self.kernel_size),
+                strides=(batch_step, row_step * self.stride[0],
+                         col_step * self.stride[1], channel_step,
+                         *window_strides),
+                writeable=False)
+
+        batch_step, channel_step, row_step, col_step = images.strides
+
+        return as_strided(
+            images,
+            shape=(*images.shape[:2], *self._output_shape(images.shape),
+                   *self.kernel_size),
+            strides=(batch_step, channel_step, row_step * self.stride[0],
+                     col_step * self.stride[1], *window_strides),
+            writeable=False)
+
+    def _add_to_windows(self, images: ndarray,
+                        window_grad: Callable[[int, int], ndarray]) -> None:
+        ''' Adds `window_grad(row, col)`, the gradient of the element
+        (row, col) of every window, to the elements of `images` it was read
+        from, summing the overlapping windows
+
+        The elements of a window offset come from a strided slice of the
+        images with no overlaps, so they are added with one in-place
+        addition per offset.
+
+        '''
+
+        out_height, out_width = self._output_shape(images.shape)
+        stride_height, stride_width = self.stride
+
+        for row in range(self.kernel_size[0]):
+            top = row * (self.dilation[0] + 1)
+            rows = slice(top, top + stride_height * (out_height - 1) + 1,
+                         stride_height)
+
+            for col in range(self.kernel_size[1]):
+                left = col * (self.dilation[1] + 1)
+                cols = slice(left, left + stride_width * (out_width - 1) + 1,
+                             stride_width)
+
+                region = images[(slice(None), ) * self._rows_axis +
+                                (rows, cols)]
+                add(region, window_grad(row, col), out=region)
+
+    def _recorded_grad(self, accum_grad: Tensor, weights: ndarray) -> Tensor:
+        ''' Records the computation of the gradient of the input (so that
+        it can be differentiated again, e.g. for Hessian-vector products)
+
+        The gradient of each window element, `accum_grad` times its
+        weight, is laid out as the column form of the windows (see
+        `_Im2col`) and added to the images by `_Col2im`.
+
+        Parameters:
+        -----------
+         - accum_grad : Tensor, the gradient of the output
+         - weights : array of shape (kernel_height * kernel_width, *output
+           shape), or broadcastable to it, the derivative of each window
+           output w.r.t. the element at each window offset
+
+        Returns:
+        --------
+         - grad : Tensor, the gradient of the input
+
+        '''
+
+        n_offsets = self.kernel_size[0] * self.kernel_size[1]
+        weights = weights.astype(accum_grad.value.dtype, copy=False)
+
+        if self.layout == 'NHWC':
+            batch_size, out_height, out_width, channels = accum_grad.shape
+
+            # Rows of (kernel_height, kernel_width, channels) features
+            columns = (accum_grad.reshape(batch_size, out_height, out_width,
+                                          1, channels) *
+                       moveaxis(weights, 0, 3)).reshape(-1,
+                                                        n_offsets * channels)
+        else:
+            batch_size, channels, out_height, out_width = accum_grad.shape
+
+            # Columns of (channels, kernel_height, kernel_width) features,
+            # ordered by (out_row, out_col, batch)
+            columns = (accum_grad.transpose(1, 2, 3, 0).reshape(
+                channels, 1, out_height, out_width, batch_size) *
+                       weights.transpose(2, 0, 3, 4, 1)).reshape(
+                           channels * n_offsets, -1)
+
+        return _Col2im(columns, self.children[0].shape, self.kernel_size,
+                       self.stride, self.dilation, self.layout)()
+
+    def _output_shape(self, shape: Tuple[int, ...]) -> Tuple[int, int]:
+        return tuple(
+            (size - (kernel_size - 1) * (dilation + 1) - 1) // stride + 1
+            for size, kernel_size, stride, dilation in zip(
+                shape[self._rows_axis:self._rows_axis + 2],
+                self.kernel_size, self.stride, self.dilation))
+
+    @property
+    def _rows_axis(self) -> int:
+        ''' The axis of the rows of the images (followed by the columns)
+        '''
+
+        return 1 if self.layout == 'NHWC' else 2
+
+
+# ====================================================================================================
+
+
+class _MaxPool2d(_Pool2d):
+    ''' 2D max pooling
+
+    The maximum is taken with one elementwise comparison per window offset
+    (on the strided view of the windows), recording the offset of the
+    maximum of each window, so that the backward pass only routes the
+    gradient to it.
+
+    '''
+
+    __slots__ = ('_argmax', )
+    _saved_arrays = ('_argmax', )
+
+    def __init__(self,
+                 input: Union[Tensor, ndarray, List[Number], Number],
+                 kernel_size: Tuple[int, int],
+                 stride: Tuple[int, int],
+                 dilation: Tuple[int, int],
+                 layout='NCHW'):
+
+        super(_MaxPool2d, self).__init__(input, kernel_size, stride,
+                                         dilation, layout)
+
+        # Offset of the maximum in each window (row * kernel_width + col)
+        self._argmax: ndarray = None
+
+    def forward(self) -> ndarray:
+        windows = self._windows(self.children[0].value)
+        return self.forward_into(empty(windows.shape[:4], windows.dtype))
+
+    def forward_into(self, out: ndarray) -> ndarray:
+        windows = self._windows(self.children[0].value)
+        n_offsets = self.kernel_size[0] * self.kernel_size[1]
+
+        self._argmax = zeros(out.shape, min_scalar_type(n_offsets - 1))
+        mask = self._buffer('mask', out.shape, bool)
+        update = self._buffer('update', out.shape, self._argmax.dtype)
+
+        copyto(out, windows[..., 0, 0])
+        for offset in range(1, n_offsets):
+            window = windows[(..., *divmod(offset, self.kernel_size[1]))]
+
+            # The first maximum is kept on ties
+            greater(window, out, out=mask)
+            maximum(out, window, out=out)
+
+            # argmax = offset where the mask is set, with arithmetic on the
+            # unsigned offsets (faster than masked assignments)
+            subtract(offset, self._argmax, out=update)
+            multiply(update, mask, out=update)
+            add(self._argmax, update, out=self._argmax)
+
+        return out
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):
+            # Only the maximum of each window gets its gradient
+            n_offsets = self.kernel_size[0] * self.kernel_size[1]
+            return self._recorded_grad(
+                accum_grad,
+                equal(arange(n_offsets).reshape(-1, 1, 1, 1, 1),
+                      self._argmax))
+
+        images = zeros(self.children[0].shape, accum_grad.dtype)
+        self.backward_into(idx, accum_grad, images)
+
+        return images
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        mask = self._buffer('mask', self._argmax.shape, bool)
+        window_grad = self._buffer('window_grad', accum_grad.shape,
+                                   accum_grad.dtype)
+
+        def max_grad(row: int, col: int) -> ndarray:
+            # The gradient of the windows whose maximum is at (row, col)
+            equal(self._argmax, row * self.kernel_size[1] + col, out=mask)
+            return multiply(accum_grad, mask, out=window_grad)
+
+        self._add_to_windows(out, max_grad)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        windows = self._windows(tangents[0])
+        tangent = empty(self._argmax.shape, tangents[0].dtype)
+
+        for offset in range(self.kernel_size[0] * self.kernel_size[1]):
+            copyto(tangent,
+                   windows[(..., *divmod(offset, self.kernel_size[1]))],
+                   where=self._argmax == offset)
+
+        return tangent
+
+
+# ====================================================================================================
+
+
+class _AvgPool2d(_Pool2d):
+    ''' 2D average pooling
+
+    The windows are summed with one elementwise addition per window offset
+    (on the strided view of the windows), which is faster than reducing
+    the two strided axes of the view.
+
+    '''
+
+    __slots__ = ()
+
+    def forward(self) -> ndarray:
+        windows = self._windows(self.children[0].value)
+        return self.forward_into(empty(windows.shape[:4], windows.dtype))
+
+    def forward_into(self, out: ndarray) -> ndarray:
+        return self._mean(self._windows(self.children[0].value), out)
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):
+            # Every element of a window gets the same share of its gradient
+            n_offsets = self.kernel_size[0] * self.kernel_size[1]
+            return self._recorded_grad(accum_grad,
+                                       full((n_offsets, 1, 1, 1, 1),
+                                            1 / n_offsets))
+
+        images = zeros(self.children[0].shape, accum_grad.dtype)
+        self.backward_into(idx, accum_grad, images)
+
+        return images
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        # Every element of a window gets the same share of its gradient
+        window_grad = self._buffer('window_grad', accum_grad.shape,
+                                   accum_grad.dtype)
+        multiply(accum_grad,
+                 1 / (self.kernel_size[0] * self.kernel_size[1]),
+                 out=window_grad)
+
+        self._add_to_windows(out, lambda row, col: window_grad)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        windows = self._windows(tangents[0])
+        return self._mean(windows, empty(windows.shape[:4], windows.dtype))
+
+    def _mean(self, windows: ndarray, out: ndarray) -> ndarray:
+        ''' Writes the mean of each of the `windows` into `out`
+        '''
+
+        copyto(out, windows[..., 0, 0])
+        for offset in range(1, self.kernel_size[0] * self.kernel_size[1]):
+            add(out,
+                windows[(..., *divmod(offset, self.kernel_size[1]))],
+                out=out)
+
+        return multiply(out, 1 / (self.kernel_size[0] * self.kernel_size[1]),
+                        out=out)
+
+
+# ====================================================================================================
@@ -1,7 +1,9 @@
+from abc import abstractmethod
 from numbers import Number
-from typing import List, Optional, Tuple, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
-from numpy import add, arange, ndarray, pad, repeat, tile, zeros
+from numpy import add, copyto, ndarray, pad, zeros
+from numpy.lib.stride_tricks import as_strided
 
 from nujo._cache import cached_property
 from nujo.autodiff.function import Function
@@ -11,13 +13,18 @@ __all__ = [
     '_Reshape',
     '_Transpose',
     '_ConstPad',
+    '_Crop',
     '_Im2col',
+    '_Col2im',
 ]
 
 # ====================================================================================================
 
 
 class _Reshape(Function):
+    __slots__ = ('shape', '_input_shape')
+    _returns_view = True
+
     def __init__(self, input: Union[Tensor, ndarray, List[Number], Number],
                  shape: Tuple[int, ...]):
 
@@ -32,19 +39,29 @@ class _Reshape(Function):
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         return accum_grad.reshape(*self._input_shape)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        out += accum_grad.reshape(*self._input_shape)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0].reshape(*self.shape)
+
 
 # ====================================================================================================
 
 
 class _Transpose(Function):
+    __slots__ = ('dims', '_detranspose_dims')
+    _returns_view = True
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  dims: Optional[Tuple[int, ...]] = None):
 
         super(_Transpose, self).__init__(input)
 
-        self.dims = dims if dims is not None else reversed(
-            range(len(self.children[0].shape)))
+        self.dims = dims if dims is not None else tuple(
+            reversed(range(len(self.children[0].shape))))
         self._detranspose_dims = sorted(range(len(self.dims)),
                                         key=lambda idx: self.dims[idx])
 
@@ -54,6 +71,13 @@ class _Transpose(Function):
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         return accum_grad.transpose(*self._detranspose_dims)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        out += accum_grad.transpose(*self._detranspose_dims)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0].transpose(*self.dims)
+
 
 # ====================================================================================================
 
@@ -72,6 +96,9 @@ class _ConstPad(Function):
      - value : float, the constant value to pad with (default: 0)
 
     '''
+
+    __slots__ = ('padding', 'value')
+
     def __init__(self,
                  input: Union[Tensor, ndarray, List[Number], Number],
                  padding: Tuple[Tuple[int, int], ...],
@@ -91,18 +118,262 @@ class _ConstPad(Function):
                    self.padding,
                    constant_values=self.value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        out.fill(self.value)
+        out[_unpadded(out.shape, self.padding)] = self.children[0].value
+
+        return out
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):
+            # Recorded, so that the gradient can be differentiated again
+            return _Crop(accum_grad, self.padding)()
+
+        return accum_grad[_unpadded(accum_grad.shape, self.padding)]
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        out += accum_grad[_unpadded(accum_grad.shape, self.padding)]
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        # The padding is constant
+        return pad(tangents[0], self.padding)
+
+
+# ====================================================================================================
+
+
+class _Crop(Function):
+    ''' Removes the padding of an array, the adjoint of `_ConstPad`
+
+    Parameters:
+    -----------
+     - input : array to crop
+     - padding : tuple of tuples of two ints specifying the number of
+     elements removed before and after for each dimension
+
+    '''
+
+    __slots__ = ('padding', )
+    _returns_view = True
+
+    def __init__(self, input: Union[Tensor, ndarray, List[Number], Number],
+                 padding: Tuple[Tuple[int, int], ...]):
+
+        super(_Crop, self).__init__(input)
+
+        assert len(self.children[0].shape) == len(padding)
+        self.padding = padding
+
+    def forward(self) -> ndarray:
+        input = self.children[0].value
+        return input[_unpadded(input.shape, self.padding)]
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
-        idxs = tuple(
-            slice(dim_pad[0], accum_grad.shape[i] - dim_pad[1])
-            for i, dim_pad in enumerate(self.padding))
+        if isinstance(accum_grad, Tensor):
+            return _ConstPad(accum_grad, self.padding)()
+
+        return pad(accum_grad, self.padding)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        out[_unpadded(out.shape, self.padding)] += accum_grad
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0][_unpadded(tangents[0].shape, self.padding)]
+
+
+# ====================================================================================================
+
+
+class _ImageColumns(Function):
+    ''' Base class of the transformations between images and their column
+    form (see `_Im2col`)
+
+    Parameters:
+    -----------
+     - input : the input of the transformation
+     - kernel_size : tuple of 2 integers, image filter height and width
+     - stride : tuple of 2 integers, stride of the convolution
+     - dilation : tuple of 2 integers, spacing between kernel elements
+     - layout : str, 'NCHW' (channels first, the default) or 'NHWC'
+       (channels last), the layout of the images
+
+    '''
+
+    # No `__slots__`, `cached_property` stores its values in `__dict__`
+
+    def __init__(
+        self,
+        input: Union[Tensor, ndarray, List[Number], Number],
+        kernel_size: Tuple[int, int],
+        stride: Tuple[int, int],
+        dilation: Tuple[int, int],
+        layout='NCHW',
+    ):
+
+        super(_ImageColumns, self).__init__(input)
+
+        assert layout in ('NCHW', 'NHWC')
+
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.dilation = dilation
+        self.layout = layout
+
+    def _to_columns(self, images: ndarray) -> ndarray:
+        ''' Reshapes the local regions of `images` into columns (rows with
+        the channels-last layout)
+        '''
+
+        # The only copy of the data
+        if self.layout == 'NHWC':
+            return self._windows(images).reshape(-1, self._n_features)
+
+        return self._windows(images).reshape(self._n_features, -1)
+
+    def _add_to_images(self, columns: ndarray, images: ndarray) -> None:
+        ''' Adds the columns to the local regions of `images` they were
+        gathered from (col2im), summing the overlapping regions
+
+        The columns of a kernel offset (kernel row and column) come from
+        a strided slice of the images with no overlaps, so they are added
+        with one in-place addition per kernel offset. The additions are
+        done in a batch-last scratch buffer, matching the layout of the
+        columns, which is then added to `images` at once. With the
+        channels-last layout, the rows match the layout of the images and
+        are added to them directly.
+
+        '''
+
+        if self.layout == 'NHWC':
+            batch_size, _, _, channels = images.shape
+            windows = columns.reshape(batch_size, *self._output_shape,
+                                      *self.kernel_size, channels)
+
+            for row, rows, col, cols in self._offset_slices():
+                region = images[:, rows, cols]
+                add(region, windows[:, :, :, row, col], out=region)
+
+            return
+
+        batch_size, channels, height, width = images.shape
+
+        windows = columns.reshape(channels, *self.kernel_size,
+                                  *self._output_shape, batch_size)
+
+        summed = self._buffer('images', (channels, height, width,
+                                         batch_size), images.dtype)
+        summed.fill(0)
+
+        for row, rows, col, cols in self._offset_slices():
+            region = summed[:, rows, cols]
+            add(region, windows[:, row, col], out=region)
+
+        add(images, summed.transpose(3, 0, 1, 2), out=images)
+
+    def _offset_slices(self) -> Iterator[Tuple[int, slice, int, slice]]:
+        ''' Yields each kernel offset (kernel row and column) and the slices
+        of the rows and columns of the images it covers
+        '''
+
+        out_height, out_width = self._output_shape
+        stride_height, stride_width = self.stride
+
+        for row in range(self.kernel_size[0]):
+            top = row * (self.dilation[0] + 1)
+            rows = slice(top, top + stride_height * (out_height - 1) + 1,
+                         stride_height)
+
+            for col in range(self.kernel_size[1]):
+                left = col * (self.dilation[1] + 1)
+                cols = slice(left, left + stride_width * (out_width - 1) + 1,
+                             stride_width)
+
+                yield row, rows, col, cols
+
+    def _windows(self, images: ndarray) -> ndarray:
+        ''' Returns a read-only strided view of the local regions of
+        `images`, of shape (channels, kernel_height, kernel_width,
+        out_height, out_width, batch_size), whose reshape to
+        (n_features, -1) is the column matrix; with the channels-last
+        layout, of shape (batch_size, out_height, out_width, kernel_height,
+        kernel_width, channels), whose reshape to (-1, n_features) is the
+        row matrix
+        '''
+
+        if self.layout == 'NHWC':
+            batch_size, _, _, channels = images.shape
+            batch_step, row_step, col_step, channel_step = images.strides
+
+            return as_strided(
+                images,
+                shape=(batch_size, *self._output_shape, *self.kernel_size,
+                       channels),
+                strides=(batch_step, row_step * self.stride[0],
+                         col_step * self.stride[1],
+                         row_step * (self.dilation[0] + 1),
+                         col_step * (self.dilation[1] + 1), channel_step),
+                writeable=False)
+
+        batch_size, channels = images.shape[:2]
+        batch_step, channel_step, row_step, col_step = images.strides
+
+        return as_strided(
+            images,
+            shape=(channels, *self.kernel_size, *self._output_shape,
+                   batch_size),
+            strides=(channel_step, row_step * (self.dilation[0] + 1),
+                     col_step * (self.dilation[1] + 1),
+                     row_step * self.stride[0], col_step * self.stride[1],
+                     batch_step),
+            writeable=False)
+
+    @cached_property
+    def _output_shape(self):
+        # Obtain needed information
+        height, width = self._spatial_shape
+        kernel_height, kernel_width = self.kernel_size
+        stride_height, stride_width = self.stride
+        dilation_height, dilation_width = self.dilation
+
+        # Calculate output shape
+        out_height = (height - dilation_height *
+                      (kernel_height - 1) - kernel_height) // stride_height + 1
+        out_width = (width - dilation_width *
+                     (kernel_width - 1) - kernel_width) // stride_width + 1
+
+        return out_height, out_width
+
+    @cached_property
+    def _n_features(self):
+        ''' number of features in the column form
+        '''
+
+        channels = self._image_shape[3 if self.layout == 'NHWC' else 1]
+        return self.kernel_size[0] * self.kernel_size[1] * channels
+
+    @property
+    def _spatial_shape(self) -> Tuple[int, int]:
+        ''' height and width of the images
+        '''
+
+        shape = self._image_shape
+        return shape[1:3] if self.layout == 'NHWC' else shape[2:]
+
+    @property
+    @abstractmethod
+    def _image_shape(self) -> Tuple[int, ...]:
+        ''' shape of the images
+        '''
 
-        return accum_grad[idxs]
+        pass
 
 
 # ====================================================================================================
 
 
-class _Im2col(Function):
+class _Im2col(_ImageColumns):
     ''' Image to column shape transformation
 
     The local regions in the input image are stretched out into columns.
@@ -116,126 +387,201 @@ class _Im2col(Function):
     [363 x 3025], where every column is a stretched out receptive field
     and there are 55*55 = 3025 of them in total.
 
+    The columns are gathered from a strided view of the local regions of
+    the input (no index arrays), with a single contiguous copy.
+
+    With the channels-last layout, the input is (batch_size, height,
+    width, channels) and the local regions are stretched out into rows
+    instead, of (kernel_height, kernel_width, channels) features, ordered
+    by (batch, out_row, out_col): the product of this matrix and the
+    transposed kernels is then directly the channels-last output, and the
+    copies are reading contiguous runs of channels.
+
     Reference: CS231n Stanford
     (https://cs231n.github.io/convolutional-networks/)
 
     Parameters:
     -----------
      - input : image shaped array, shape: (batch_size, channels, height, width)
+       or (batch_size, height, width, channels) with the 'NHWC' layout
      - kernel_size : tuple of 2 integers, image filter height and width
      - stride : tuple of 2 integers, stride of the convolution
      - dilation : tuple of 2 integers, spacing between kernel elements
+     - layout : str, 'NCHW' (channels first, the default) or 'NHWC'
+       (channels last), the layout of the input
 
     '''
+
     def __init__(
         self,
         input: Union[Tensor, ndarray, List[Number], Number],
         kernel_size: Tuple[int, int],
         stride: Tuple[int, int],
         dilation: Tuple[int, int],
+        layout='NCHW',
     ):
 
-        super(_Im2col, self).__init__(input)
+        super(_Im2col, self).__init__(input, kernel_size, stride, dilation,
+                                      layout)
 
         # Shape of `input` should be: (batch_size, channels, height, width)
+        # or (batch_size, height, width, channels)
         assert len(self.children[0].shape) == 4
 
-        self.kernel_size = kernel_size
-        self.stride = stride
-        self.dilation = dilation
+        # Version and shape of the input the cached geometry of the strided
+        # views (`_output_shape` and `_n_features`) is valid for
+        self._input_version = -1
+        self._input_shape: Tuple[int, ...] = None
 
     def forward(self) -> ndarray:
         ''' Method which turns the image shaped input to column shape
         '''
 
-        images = self.children[0].value
-
-        # Reshape content into column shape
-        k, i, j = self._im2col_indices
-        return images[:, k, i, j]\
-            .transpose(1, 2, 0).reshape(self._n_features, -1)
+        self._validate_cache()
+        return self._to_columns(self.children[0].value)
 
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
         ''' Method which turns the column shaped input to image shape
         '''
 
-        # Create images placeholder
-        images = zeros(self.children[0].shape)
-
-        # Separate the image sections and the batch_size (shape[0])
-        separated_grad = accum_grad\
-            .reshape(self._n_features, -1, images.shape[0])\
-            .transpose(2, 0, 1)  # Move the batch_size at the beginning
+        if isinstance(accum_grad, Tensor):
+            # Recorded, so that the gradient can be differentiated again
+            return _Col2im(accum_grad, self.children[0].shape,
+                           self.kernel_size, self.stride, self.dilation,
+                           self.layout)()
 
-        # Fill in the placeholder
-        k, i, j = self._im2col_indices
-        add.at(images, (slice(None), k, i, j), separated_grad)
+        images = zeros(self.children[0].shape, accum_grad.dtype)
+        self._add_to_images(accum_grad, images)
 
         return images
 
-    @cached_property
-    def _im2col_indices(self) -> Tuple[ndarray, ndarray, ndarray]:
-        ''' Calculate the indices where the dot products are
-        to be applied between the weights and the image.
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        # Fill in the gradient buffer directly, see `backward`
+        self._add_to_images(accum_grad, out)
+
+    def forward_into(self, out: ndarray) -> ndarray:
+        self._validate_cache()
+
+        windows = self._windows(self.children[0].value)
+        copyto(out.reshape(windows.shape), windows)
+
+        return out
 
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return self._to_columns(tangents[0])
+
+    def _validate_cache(self) -> None:
+        ''' Resets the cached output shape and number of features, which
+        set the shape of the strided window view the columns are gathered
+        from (and the slices they are added back through), if the shape of
+        the input has changed; the shape is only compared when the version
+        of the input has changed.
         '''
 
-        # Obtain needed information
-        channels = self.children[0].shape[1]
-        kernel_height, kernel_width = self.kernel_size
-        stride_height, stride_width = self.stride
-        dilation_height, dilation_width = self.dilation
-        out_height, out_width = self._output_shape
+        input = self.children[0]
+        if input._version == self._input_version:
+            return
 
-        # Calculate sections' rows
-        step = dilation_height + 1
-        section_rows = repeat(arange(0, kernel_height * step, step),
-                              kernel_width)
-        section_rows = tile(section_rows, channels)
+        self._input_version = input._version
 
-        # Slide rows by stride
-        slide_rows = stride_width * repeat(arange(out_height), out_width)
-        section_rows = section_rows.reshape(-1, 1) + slide_rows.reshape(1, -1)
+        if input.shape != self._input_shape:
+            self._input_shape = input.shape
 
-        # Calculate sections' columns
-        step = dilation_width + 1
-        section_cols = tile(arange(0, kernel_width * step, step),
-                            kernel_height * channels)
+            for name in ('_output_shape', '_n_features'):
+                self.__dict__.pop(name, None)
 
-        # Slide cols by stride
-        slide_cols = stride_height * tile(arange(out_width), out_height)
-        section_cols = section_cols.reshape(-1, 1) + slide_cols.reshape(1, -1)
+    @property
+    def _image_shape(self) -> Tuple[int, ...]:
+        return self.children[0].shape
 
-        # Calculate sections' channels
-        section_channels = repeat(arange(channels),
-                                  kernel_height * kernel_width).reshape(-1, 1)
 
-        # Return indices
-        return section_channels, section_rows, section_cols
+# ====================================================================================================
 
-    @cached_property
-    def _output_shape(self):
-        # Obtain needed information
-        _, _, height, width = self.children[0].shape
-        kernel_height, kernel_width = self.kernel_size
-        stride_height, stride_width = self.stride
-        dilation_height, dilation_width = self.dilation
 
-        # Calculate output shape
-        out_height = (height - dilation_height *
-                      (kernel_height - 1) - kernel_height) // stride_height + 1
-        out_width = (width - dilation_width *
-                     (kernel_width - 1) - kernel_width) // stride_width + 1
+class _Col2im(_ImageColumns):
+    ''' Column to image shape transformation, the adjoint of `_Im2col`
 
-        return out_height, out_width
+    The columns are added to the local regions of the images they would
+    be gathered from by `_Im2col`, summing the overlapping regions. Used
+    by the recorded gradients of the im2col based functions (e.g. for
+    Hessian-vector products), each of the two being the backward pass of
+    the other.
 
-    @cached_property
-    def _n_features(self):
-        ''' number of features in the column form
-        '''
+    Parameters:
+    -----------
+     - input : column shaped array, the output of `_Im2col`
+     - image_shape : tuple of 4 integers, the shape of the images,
+       (batch_size, channels, height, width) or (batch_size, height, width,
+       channels) with the 'NHWC' layout
+     - kernel_size : tuple of 2 integers, image filter height and width
+     - stride : tuple of 2 integers, stride of the convolution
+     - dilation : tuple of 2 integers, spacing between kernel elements
+     - layout : str, 'NCHW' (channels first, the default) or 'NHWC'
+       (channels last), the layout of the images
+
+    '''
+    def __init__(
+        self,
+        input: Union[Tensor, ndarray, List[Number], Number],
+        image_shape: Tuple[int, int, int, int],
+        kernel_size: Tuple[int, int],
+        stride: Tuple[int, int],
+        dilation: Tuple[int, int],
+        layout='NCHW',
+    ):
+
+        super(_Col2im, self).__init__(input, kernel_size, stride, dilation,
+                                      layout)
+
+        assert len(image_shape) == 4
+        self.image_shape = tuple(image_shape)
+
+    def forward(self) -> ndarray:
+        columns = self.children[0].value
+        return self.forward_into(zeros(self.image_shape, columns.dtype))
+
+    def forward_into(self, out: ndarray) -> ndarray:
+        out.fill(0)
+        self._add_to_images(self.children[0].value, out)
+
+        return out
+
+    def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):
+            return _Im2col(accum_grad, self.kernel_size, self.stride,
+                           self.dilation, self.layout)()
+
+        return self._to_columns(accum_grad)
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        add(out, self._to_columns(accum_grad), out=out)
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        images = zeros(self.image_shape, tangents[0].dtype)
+        self._add_to_images(tangents[0], images)
+
+        return images
+
+    @property
+    def _image_shape(self) -> Tuple[int, ...]:
+        return self.image_shape
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _unpadded(shape: Tuple[int, ...],
+              padding: Tuple[Tuple[int, int], ...]) -> Tuple[slice, ...]:
+    ''' Returns the slices of the elements of a padded array of shape
+    `shape` which are not padding
+    '''
 
-        return self.kernel_size[0] * self.kernel_size[1] *\
-            self.children[0].shape[1]  # number of channels
+    return tuple(
+        slice(before, size - after)
+        for (before, after), size in zip(padding, shape))
 
 
 # ====================================================================================================
@@ -1,6 +1,9 @@
-from numpy import cos, ndarray, sin, tan
+from typing import List, Optional
+
+from numpy import cos, divide, multiply, ndarray, negative, sin, square, tan
 
 from nujo.autodiff.function import Function
+from nujo.autodiff.tensor import Tensor
 
 __all__ = [
     '_Sin',
@@ -12,33 +15,88 @@ __all__ = [
 
 
 class _Sin(Function):
+    __slots__ = ()
+
     def forward(self) -> ndarray:
         return sin(self.children[0].value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return sin(self.children[0].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):  # Recorded, see `_input_for`
+            return accum_grad * _Cos(self.children[0])()
+
         return accum_grad * cos(self.children[0].value)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self.children[0].shape, out.dtype)
+        cos(self.children[0].value, out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] * cos(self.children[0].value)
+
 
 # ====================================================================================================
 
 
 class _Cos(Function):
+    __slots__ = ()
+
     def forward(self) -> ndarray:
         return cos(self.children[0].value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return cos(self.children[0].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):  # Recorded, see `_input_for`
+            return accum_grad * -_Sin(self.children[0])()
+
         return accum_grad * -sin(self.children[0].value)
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self.children[0].shape, out.dtype)
+        negative(sin(self.children[0].value, out=grad), out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return -tangents[0] * sin(self.children[0].value)
+
 
 # ====================================================================================================
 
 
 class _Tan(Function):
+    __slots__ = ()
+
     def forward(self) -> ndarray:
         return tan(self.children[0].value)
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        return tan(self.children[0].value, out=out)
+
     def backward(self, idx: int, accum_grad: Function.T) -> Function.T:
+        if isinstance(accum_grad, Tensor):  # Recorded, see `_input_for`
+            return accum_grad * (1 / _Cos(self.children[0])())**2
+
         return accum_grad * (1 / cos(self.children[0].value))**2
 
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        grad = self._buffer('grad', self.children[0].shape, out.dtype)
+        divide(1, cos(self.children[0].value, out=grad), out=grad)
+        square(grad, out=grad)
+
+        self._accumulate(out, multiply(grad, accum_grad, out=grad))
+
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        return tangents[0] / cos(self.children[0].value)**2
+
 
 # ====================================================================================================
@@ -1,5 +1,5 @@
 from itertools import count
-from typing import Any
+from typing import Any, Callable, Optional, Union
 
 
 class _Node:
@@ -10,17 +10,40 @@ class _Node:
     Parameters:
     -----------
      - children : varargs, the children of the node
-     - name : string, representation of the node
+     - name : string, representation of the node; can also be None or a
+       callable with no arguments, in which case the name is generated
+       lazily (only when it is first accessed)
 
     '''
 
+    __slots__ = ('children', '_name', 'id', '__weakref__')
+
     _id_generator = count()
 
-    def __init__(self, *children: Any, name='Node'):
+    def __init__(self,
+                 *children: Any,
+                 name: Optional[Union[str, Callable[[], str]]] = 'Node'):
+
         self.children = list(children)
-        self.name = name
+        self._name = name
         self.id: int = next(_Node._id_generator)
 
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._name = self._generate_name()
+        elif not isinstance(self._name, str):
+            self._name = self._name()
+
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._name = name
+
+    def _generate_name(self) -> str:
+        return 'Node'
+
     def __eq__(self, other):
         return self.id == other.id
 
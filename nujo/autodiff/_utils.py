@@ -1,7 +1,169 @@
+from typing import Any, List, Tuple
+
+from numpy import broadcast_shapes, broadcast_to, ndarray, ones
+
 __all__ = [
     '_if_not_none',
+    '_sum_tangents',
+    '_topological_order',
+    '_unbroadcast',
+    '_broadcast_axes',
+    '_release_schedule',
 ]
 
 
 def _if_not_none(*args) -> list:
     return [arg for arg in args if arg is not None]
+
+
+def _sum_tangents(*terms: Any) -> Any:
+    ''' Sums the terms of a tangent rule (see `Function.tangent`), skipping
+    the terms of the children with a zero (None) tangent.
+    '''
+
+    terms = _if_not_none(*terms)
+
+    total = terms[0]
+    for term in terms[1:]:
+        total = total + term
+
+    return total
+
+
+def _topological_order(root: Any, pending_only=False) -> List[Any]:
+    ''' Returns the tensors in the computation graph of `root`, sorted
+    topologically - each tensor comes after the tensors it was computed
+    from (the children of its creator), and `root` comes last.
+
+    The graph is traversed iteratively (no recursion limit for deep graphs)
+    and every tensor is visited exactly once, using an id-based visited set.
+
+    If `pending_only` is True, only the tensors whose evaluation is
+    deferred (see `modes.lazy`) are traversed.
+
+    '''
+
+    iter_inputs = _iter_pending_inputs if pending_only else _iter_inputs
+
+    order: List[Any] = []
+    visited = {root.id}
+    stack = [(root, iter_inputs(root))]
+
+    while stack:
+        node, inputs = stack[-1]
+
+        for child in inputs:
+            if child.id not in visited:
+                visited.add(child.id)
+                stack.append((child, iter_inputs(child)))
+                break
+
+        else:  # All inputs of `node` are already ordered
+            stack.pop()
+            order.append(node)
+
+    return order
+
+
+def _iter_inputs(tensor: Any):
+    return iter(tensor.creator.children if tensor.creator else ())
+
+
+def _iter_pending_inputs(tensor: Any):
+    return (child for child in tensor.creator.children if child._pending)
+
+
+def _unbroadcast(grad: Any, shape: Tuple[int, ...]) -> Any:
+    ''' Reduces `grad` (Tensor or ndarray), the gradient of the output of a
+    broadcasting operation, to the gradient of an input of shape `shape`.
+
+    The gradient is summed over the axes along which the input was
+    broadcast: the leading axes the input does not have and the axes of
+    size 1 in the input. A gradient with fewer elements than the input
+    (e.g. a scalar seed) is broadcast up to `shape` instead.
+
+    '''
+
+    grad_shape = grad.shape
+    if grad_shape == shape:
+        return grad
+
+    is_array = isinstance(grad, ndarray)
+
+    full_shape = broadcast_shapes(grad_shape, shape)
+    if full_shape != grad_shape:
+        grad = broadcast_to(grad, full_shape) if is_array else\
+            grad * ones(full_shape)
+
+    if full_shape == shape:
+        return grad
+
+    axes = _broadcast_axes(full_shape, shape)
+
+    if is_array:
+        return grad.sum(axis=axes, keepdims=True).reshape(shape)
+
+    # Record the reduction in the computation graph
+    from nujo.autodiff._functions._aggregate import _InnerSum
+
+    if len(shape) == 0:
+        return _InnerSum(grad)()
+
+    return _InnerSum(grad, dim=axes, keepdim=True)().reshape(*shape)
+
+
+def _broadcast_axes(full_shape: Tuple[int, ...],
+                    shape: Tuple[int, ...]) -> Tuple[int, ...]:
+    ''' Returns the axes of `full_shape` along which an array of shape
+    `shape` is broadcast to `full_shape`.
+    '''
+
+    num_leading = len(full_shape) - len(shape)
+    return tuple(range(num_leading)) + tuple(
+        num_leading + i for i, dim in enumerate(shape)
+        if dim == 1 and full_shape[num_leading + i] != 1)
+
+
+def _release_schedule(ordering: List[Any]) -> List[List[Any]]:
+    ''' Plans the release of the buffers of a computation graph during its
+    backward pass.
+
+    `ordering` is the topological order of the graph (see
+    `_topological_order`), which the backward pass traverses in reverse.
+    For each position `i` in it, returns the nodes whose buffers are no
+    longer needed once the gradient of `ordering[i]` is computed:
+     - Functions, after the last call of their `backward` (for their last
+       differentiable child), their saved arrays can be released.
+     - Differentiable intermediate tensors (not leaves or the root), once
+       all the functions they are input to or created by are done, their
+       values can be released. Non-differentiable ones are constants of the
+       graph (they may be reused by the next forward pass) and are kept.
+
+    '''
+
+    position = {node.id: i for i, node in enumerate(ordering)}
+    schedule: List[List[Any]] = [[] for _ in ordering]
+
+    # Position after which the creator of each tensor is done
+    done_at = {}
+    for i, node in enumerate(ordering):
+        if node.creator is not None:
+            done_at[i] = min((position[child.id]
+                              for child in node.creator.children
+                              if child.diff),
+                             default=i)
+
+            schedule[done_at[i]].append(node.creator)
+
+    for i, node in enumerate(ordering[:-1]):
+        if node.creator is None or not node.diff:  # Leaf or constant
+            continue
+
+        release_at = min((done_at[position[poutput.id]]
+                          for poutput in node.parents_outputs
+                          if poutput.id in position),
+                         default=done_at[i])
+
+        schedule[min(release_at, done_at[i])].append(node)
+
+    return schedule
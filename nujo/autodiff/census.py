@@ -0,0 +1,317 @@
+''' Live computation graph census
+
+Counts the Functions and Tensors alive in the process and the ndarray bytes
+they hold, to find what keeps memory growing across training iterations
+(e.g. graphs kept alive by a reference, the function lookup cache, saved
+arrays of functions, outputs accumulating in `parents_outputs`).
+
+    >>> before = census()
+    >>> train_step()
+    >>> after = census()
+    >>> assert not after.diff(before), after.diff(before)
+
+'''
+
+import gc
+from collections import Counter, namedtuple
+from typing import Any, Dict, Iterator, List
+from weakref import ref
+
+from numpy import ndarray
+
+from nujo.autodiff.function import Function
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    'census',
+    'Census',
+    'CensusDiff',
+    'Holder',
+]
+
+# ====================================================================================================
+
+
+class Holder(namedtuple('Holder', ['id', 'type', 'nbytes', 'node'])):
+    ''' A Function or Tensor holding ndarrays
+
+     - id : int, the id of the node
+     - type : str, the type of the node ('Tensor' or the Function type)
+     - nbytes : int, the bytes of the arrays it holds (the whole arrays, for
+       views)
+     - node : weakref, a weak reference to the node
+
+    The names of the nodes may be generated lazily (see `_Node.name`), so
+    a holder only formats the name of its node when it is read.
+
+    '''
+
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        ''' The representation of the node (e.g. '<MatrixMul#12>'), or its
+        type and id if it was collected
+        '''
+
+        node = self.node()
+        return repr(node) if node is not None else f'<{self.type}#{self.id}>'
+
+
+# ====================================================================================================
+
+
+def census(collect=True) -> 'Census':
+    ''' Takes a snapshot of the live Functions and Tensors
+
+    Only weak references to the nodes are kept by the snapshot.
+
+    Parameters:
+    -----------
+     - collect : bool, whether to run the garbage collector first, so that
+       the unreachable graphs (freed by the collector, see
+       `Tensor.parents_outputs`) are not counted
+
+    Returns:
+    --------
+     - census : Census, the snapshot
+
+    '''
+
+    if collect:
+        gc.collect()
+
+    functions: Counter = Counter()
+    tensors: Counter = Counter()
+    holders: List[Holder] = []
+    arrays: Dict[int, int] = {}  # bytes of each array, by id
+    parent_outputs = dead_parent_outputs = 0
+
+    for obj in gc.get_objects():
+        # `type` instead of `isinstance`, which may look up `__class__`
+        # (e.g. lazily loaded or deprecated attributes of modules)
+        obj_type = type(obj)
+
+        if issubclass(obj_type, Tensor):
+            tensors[_creator_type(obj)] += 1
+
+            if obj._parents_outputs is not None:
+                parent_outputs += len(obj._parents_outputs)
+                dead_parent_outputs += sum(
+                    wr() is None for wr in obj._parents_outputs)
+
+        elif issubclass(obj_type, Function):
+            functions[obj_type.__name__.lstrip('_')] += 1
+
+        else:
+            continue
+
+        nbytes = 0
+        for array in _held_arrays(obj):
+            # Views are attributed the array they are a view of
+            while isinstance(array.base, ndarray):
+                array = array.base
+
+            arrays[id(array)] = array.nbytes
+            nbytes += array.nbytes
+
+        if nbytes:
+            holders.append(
+                Holder(obj.id, 'Tensor' if issubclass(obj_type, Tensor) else
+                       obj_type.__name__.lstrip('_'), nbytes, ref(obj)))
+
+    holders.sort(key=lambda holder: holder.nbytes, reverse=True)
+
+    return Census(functions=dict(functions),
+                  tensors=dict(tensors),
+                  nbytes=sum(arrays.values()),
+                  holders=holders,
+                  cache_size=Function.cache_info().currsize,
+                  parent_outputs=parent_outputs,
+                  dead_parent_outputs=dead_parent_outputs)
+
+
+# ====================================================================================================
+
+
+class Census:
+    ''' A snapshot of the live Functions and Tensors (see `census`)
+
+    Parameters:
+    -----------
+     - functions : dict, the number of live Functions by type
+     - tensors : dict, the number of live Tensors by the type of their
+       creator ('leaf' for the tensors without one)
+     - nbytes : int, the total bytes of the ndarrays held by them (the
+       values and the saved arrays and scratch buffers of the functions),
+       each array counted once
+     - holders : list of Holders, the nodes holding ndarrays, by bytes in
+       decreasing order
+     - cache_size : int, the number of entries of the function lookup cache
+     - parent_outputs : int, the number of references in the
+       `parents_outputs` of the tensors
+     - dead_parent_outputs : int, how many of them refer to collected
+       outputs (pruned when `parents_outputs` is accessed or an output is
+       added)
+
+    '''
+    def __init__(self, functions: Dict[str, int], tensors: Dict[str, int],
+                 nbytes: int, holders: List[Holder], cache_size: int,
+                 parent_outputs: int, dead_parent_outputs: int):
+
+        self.functions = functions
+        self.tensors = tensors
+        self.nbytes = nbytes
+        self.holders = holders
+        self.cache_size = cache_size
+        self.parent_outputs = parent_outputs
+        self.dead_parent_outputs = dead_parent_outputs
+
+    @property
+    def num_functions(self) -> int:
+        return sum(self.functions.values())
+
+    @property
+    def num_tensors(self) -> int:
+        return sum(self.tensors.values())
+
+    def largest(self, n=10) -> List[Holder]:
+        ''' Returns the `n` nodes holding the most bytes
+        '''
+
+        return self.holders[:n]
+
+    def diff(self, previous: 'Census') -> 'CensusDiff':
+        ''' Returns the changes since `previous`, an earlier snapshot
+        '''
+
+        return CensusDiff(
+            functions=_diff_counts(self.functions, previous.functions),
+            tensors=_diff_counts(self.tensors, previous.tensors),
+            nbytes=self.nbytes - previous.nbytes,
+            cache_size=self.cache_size - previous.cache_size,
+            parent_outputs=self.parent_outputs - previous.parent_outputs)
+
+    def __repr__(self):
+        lines = [
+            f'Census: {self.num_functions} functions, '
+            f'{self.num_tensors} tensors, {_format_bytes(self.nbytes)}, '
+            f'{self.cache_size} cached functions, '
+            f'{self.parent_outputs} parents outputs '
+            f'({self.dead_parent_outputs} dead)'
+        ]
+
+        lines += [f'  Function {name}: {count}'
+                  for name, count in _by_count(self.functions)]
+        lines += [f'  Tensor ({name}): {count}'
+                  for name, count in _by_count(self.tensors)]
+        lines += [f'  holder {holder.name}: {_format_bytes(holder.nbytes)}'
+                  for holder in self.largest(5)]
+
+        return '\n'.join(lines)
+
+
+# ====================================================================================================
+
+
+class CensusDiff:
+    ''' The changes between two snapshots (see `Census.diff`)
+
+    Evaluates to False if nothing changed, so that a training loop can
+    assert that the graph does not grow between iterations:
+
+        >>> assert not after.diff(before), after.diff(before)
+
+    Parameters:
+    -----------
+     - functions : dict, the change of the number of live Functions, for
+       the types whose number changed
+     - tensors : dict, the change of the number of live Tensors, for the
+       creator types whose number changed
+     - nbytes : int, the change of the total ndarray bytes
+     - cache_size : int, the change of the size of the function cache
+     - parent_outputs : int, the change of the number of references in
+       `parents_outputs`
+
+    '''
+    def __init__(self, functions: Dict[str, int], tensors: Dict[str, int],
+                 nbytes: int, cache_size: int, parent_outputs: int):
+
+        self.functions = functions
+        self.tensors = tensors
+        self.nbytes = nbytes
+        self.cache_size = cache_size
+        self.parent_outputs = parent_outputs
+
+    def __bool__(self):
+        return bool(self.functions or self.tensors or self.nbytes
+                    or self.cache_size or self.parent_outputs)
+
+    def __repr__(self):
+        lines = [
+            f'CensusDiff: {_format_bytes(self.nbytes, sign=True)}, '
+            f'{self.cache_size:+d} cached functions, '
+            f'{self.parent_outputs:+d} parents outputs'
+        ]
+
+        lines += [f'  Function {name}: {count:+d}'
+                  for name, count in _by_count(self.functions)]
+        lines += [f'  Tensor ({name}): {count:+d}'
+                  for name, count in _by_count(self.tensors)]
+
+        return '\n'.join(lines)
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _creator_type(tensor: Tensor) -> str:
+    if tensor.creator is None:
+        return 'leaf'
+
+    return type(tensor.creator).__name__.lstrip('_')
+
+
+def _held_arrays(node: Any) -> Iterator[ndarray]:
+    ''' Yields the ndarrays referenced by the attributes of `node`,
+    directly or in a list, tuple or dict (e.g. the scratch buffers)
+    '''
+
+    attributes = [
+        getattr(node, name, None) for cls in type(node).__mro__
+        for name in getattr(cls, '__slots__', ())
+    ]
+    attributes += getattr(node, '__dict__', {}).values()
+
+    for attribute in attributes:
+        if isinstance(attribute, ndarray):
+            yield attribute
+
+        elif isinstance(attribute, (list, tuple, dict)):
+            values = attribute.values() if isinstance(attribute, dict) \
+                else attribute
+
+            for value in values:
+                if isinstance(value, ndarray):
+                    yield value
+
+
+def _diff_counts(counts: Dict[str, int],
+                 previous: Dict[str, int]) -> Dict[str, int]:
+    return {
+        name: counts.get(name, 0) - previous.get(name, 0)
+        for name in {*counts, *previous}
+        if counts.get(name, 0) != previous.get(name, 0)
+    }
+
+
+def _by_count(counts: Dict[str, int]):
+    return sorted(counts.items(), key=lambda item: abs(item[1]), reverse=True)
+
+
+def _format_bytes(nbytes: int, sign=False) -> str:
+    return f'{nbytes / 2**20:{"+" if sign else ""}.2f} MiB'
+
+
+# ====================================================================================================
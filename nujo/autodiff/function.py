@@ -1,11 +1,15 @@
 from abc import abstractmethod
 from numbers import Number
-from typing import Any, Dict, Iterable, List, TypeVar, Union
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from typing import TypeVar, Union
 
-from numpy import ndarray
+from numpy import add, broadcast_shapes, broadcast_to, dtype, empty, ndarray
 
+import nujo._profiling as _profiling
 import nujo.autodiff.modes as modes
+from nujo._cache import CacheInfo, WeakLRUCache
 from nujo.autodiff._node import _Node
+from nujo.autodiff._utils import _broadcast_axes
 from nujo.autodiff.tensor import Tensor
 
 # ====================================================================================================
@@ -21,22 +25,26 @@ class _FunctionMeta(type):
         potentially, later reused.
 
         '''
-        obj = cls.__new__(cls, *children, **kwargs)
-
         # Only cache functions that are in the computation graph
-        if modes.DIFF_ENABLED:
-            key = _get_function_identifier(cls, children)
+        if modes.is_diff_enabled():
+            key = _get_function_identifier(cls, children, kwargs)
             cache = cls._func_children_lookup_cache
 
-            if key in cache:
-                return cache[key]
+            if key is not None:
+                func = cache.get(key)
+                if func is not None:
+                    return func
 
-            else:
-                cls.__init__(obj, *children, **kwargs)
+            obj = cls.__new__(cls, *children, **kwargs)
+            cls.__init__(obj, *children, **kwargs)
+
+            if key is not None:
                 cache[key] = obj
-                return obj
+
+            return obj
 
         # Otherwise - standard call
+        obj = cls.__new__(cls, *children, **kwargs)
         cls.__init__(obj, *children, **kwargs)
         return obj
 
@@ -62,14 +70,30 @@ class Function(_Node, metaclass=_FunctionMeta):
 
     '''
 
-    _func_children_lookup_cache: Dict[str, 'Function'] = {}
+    __slots__ = ('_output_placeholder', '_buffers', '_versions')
+
+    _func_children_lookup_cache = WeakLRUCache()
     ''' Cache used to lookup for functions that may have already been defined
     in the computation graph.
 
-     - key : hash(FuncType) + (children's identifiers);
+     - key : (FuncType, *children's identifiers, kwargs);
      use `_get_function_identifier` to obtain a key
      - value : the already defined function which can be reused
 
+    The functions are held by weak reference, so an entry is dropped as soon
+    as its function (and thus the children it holds) is garbage collected.
+
+    '''
+
+    _saved_arrays: Tuple[str, ...] = ()
+    ''' Names of the attributes holding the arrays saved by `forward` for
+    the backward pass; released after the backward pass (unless the graph
+    is retained, see `Tensor.backward`).
+    '''
+
+    _returns_view = False
+    ''' Whether the output of `forward` is a view of the value of a child
+    (e.g. a reshape), used by the memory planner of `Tape.plan`.
     '''
 
     T = TypeVar('T', Tensor, ndarray)
@@ -77,24 +101,62 @@ class Function(_Node, metaclass=_FunctionMeta):
     def __init__(self, *children: Union[Tensor, ndarray, List[Number],
                                         Number]):
 
-        super(Function, self).__init__(*_parse_inputs(children),
-                                       name=self.__class__.__name__)
+        # The names of the function and its output are generated lazily
+        super(Function, self).__init__(*_parse_inputs(children), name=None)
+
+        diff_enabled = modes.is_diff_enabled()
 
         # This output placeholder is reused when possible
         self._output_placeholder = Tensor(
             None,
-            diff=any(x.diff for x in self.children) and modes.DIFF_ENABLED,
-            creator=self if modes.DIFF_ENABLED else None,
-            name=self._generate_tensor_name())
+            diff=diff_enabled and any(x.diff for x in self.children),
+            creator=self if diff_enabled else None,
+            name=None)
 
-        if modes.DIFF_ENABLED:  # If graph building is enabled.
+        if diff_enabled:  # If graph building is enabled.
             # Allocate space for parent's output (output placeholder)
             for child in self.children:
-                child.parents_outputs.append(self._output_placeholder)
+                child._add_parent_output(self._output_placeholder)
+
+        # Scratch buffers reused by the backward pass, see `_buffer`
+        self._buffers: Optional[Dict[str, ndarray]] = None
+
+        # Versions of the output and the children at the last deferred
+        # evaluation, see `_defer`
+        self._versions: Optional[Tuple[int, ...]] = None
 
     def __repr__(self):
         return super(Function, self).__repr__() + f'#{self.id}'
 
+    @classmethod
+    def cache_info(cls) -> CacheInfo:
+        ''' Returns the hits, misses, evictions, maxsize and the number of
+        live entries of the function lookup cache.
+
+        '''
+
+        return cls._func_children_lookup_cache.info()
+
+    @classmethod
+    def cache_clear(cls) -> None:
+        ''' Clears the function lookup cache and its statistics
+        '''
+
+        cls._func_children_lookup_cache.clear()
+
+    @classmethod
+    def set_cache_maxsize(cls, maxsize: Optional[int]) -> None:
+        ''' Bounds the number of entries of the function lookup cache;
+        the least recently used entries are evicted first.
+        If `maxsize` is None, the cache is unbounded.
+
+        '''
+
+        cls._func_children_lookup_cache.maxsize = maxsize
+
+    def _generate_name(self) -> str:
+        return self.__class__.__name__
+
     def _generate_tensor_name(self) -> str:
         return 'Z' + self.__repr__()
 
@@ -108,6 +170,28 @@ class Function(_Node, metaclass=_FunctionMeta):
 
         pass
 
+    def forward_into(self, out: ndarray) -> ndarray:
+        ''' Computes the forward pass into `out`
+
+        Equivalent to `out[...] = self.forward()`, which is the default
+        implementation. Functions override it to compute the output with
+        `out=` kernels, so that no new array is allocated. `out` has the
+        shape and dtype of the output and does not overlap the values of
+        the children. Used by the memory planner of `Tape.plan`.
+
+        Parameters:
+        -----------
+        - out : ndarray, the array to write the output into
+
+        Returns:
+        --------
+        - out : ndarray, the output of the function
+
+        '''
+
+        out[...] = self.forward()
+        return out
+
     @abstractmethod
     def backward(self, idx: int, accum_grad: T) -> T:
         ''' Implement backward pass of the function here
@@ -141,13 +225,183 @@ class Function(_Node, metaclass=_FunctionMeta):
 
         pass
 
+    def tangent(self, tangents: List[Optional[ndarray]]) -> ndarray:
+        ''' Implement the tangent rule (forward-mode differentiation) of the
+        function here
+
+        Compute the tangent of the output of the function (its directional
+        derivative) from the tangents of the children, using their values
+        and the value of the output from the last forward pass.
+
+        Parameters:
+        -----------
+        - tangents : list of ndarrays, the tangent of each of the children
+         (of its shape); None for the children with a zero tangent (e.g.
+         constants), at least one is not None
+
+        Returns:
+        --------
+        - tangent : ndarray, the tangent of the output (broadcastable to
+         its shape)
+
+        '''
+
+        raise NotImplementedError(
+            f'{type(self).__name__} does not define a tangent rule')
+
+    def backward_into(self, idx: int, accum_grad: ndarray,
+                      out: ndarray) -> None:
+        ''' Accumulates the gradient of children[idx] into `out`
+
+        Equivalent to `out += self.backward(idx, accum_grad)`, which is
+        the default implementation. Functions override it to compute the
+        gradient with `out=` kernels in the persistent scratch buffers
+        returned by `_buffer`, so that after the first step the backward
+        pass does not allocate new arrays.
+
+        Used only when the gradient computations are not recorded in the
+        computation graph, hence `accum_grad` is always ndarray.
+
+        Parameters:
+        -----------
+        - idx : int, the index of the children for which to compute the
+         gradient w.r.t. output of the computation graph
+        - accum_grad : ndarray, the accumulated grad in the graph so far
+        - out : ndarray, the gradient buffer of `self.children[idx]`
+
+        '''
+
+        self._accumulate(out, self.backward(idx, accum_grad))
+
+    def _input_for(self, idx: int, accum_grad: T) -> T:
+        ''' Returns `children[idx]` as the type of `accum_grad`
+
+        When the gradient computations are recorded (`accum_grad` is a
+        Tensor), the child itself is used in them, so that the recorded
+        gradient is differentiable w.r.t. the child (second and higher-order
+        derivatives); otherwise, its value.
+
+        '''
+
+        child = self.children[idx]
+        return child if isinstance(accum_grad, Tensor) else child.value
+
+    def _output_for(self, accum_grad: T) -> T:
+        ''' Returns the output of the function as the type of `accum_grad`,
+        see `_input_for`.
+        '''
+
+        output = self._output_placeholder
+        return output if isinstance(accum_grad, Tensor) else output.value
+
+    def _release_saved_arrays(self) -> None:
+        ''' Releases the arrays saved for the backward pass
+        (see `_saved_arrays`); `forward` saves them again.
+        '''
+
+        for name in self._saved_arrays:
+            setattr(self, name, None)
+
+        self._versions = None  # The next deferred call evaluates again
+
+        # The output can not be differentiated again before the next
+        # forward pass
+        self._output_placeholder._released = True
+
+    def _buffer(self, name: str, shape: Tuple[int, ...],
+                dtype: dtype) -> ndarray:
+        ''' Returns the scratch buffer `name` of the function.
+
+        The buffer is allocated on the first call and reused afterwards;
+        it is reallocated only if its shape or dtype changes. Its content
+        is undefined, so it should be fully overwritten before use.
+
+        '''
+
+        if self._buffers is None:
+            self._buffers = {}
+
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[name] = empty(shape, dtype)
+
+        return buffer
+
+    def _accumulate(self, out: ndarray, grad: ndarray) -> None:
+        ''' In-place `out += grad`, where `grad` is summed over the axes
+        along which `out` was broadcast (see `_unbroadcast`).
+        '''
+
+        if grad.shape == out.shape:
+            add(out, grad, out=out)
+            return
+
+        full_shape = broadcast_shapes(grad.shape, out.shape)
+        if full_shape == out.shape:  # `grad` is broadcast to `out`
+            add(out, grad, out=out)
+            return
+
+        axes = _broadcast_axes(full_shape, out.shape)
+        reduced = self._buffer(
+            '_reduced',
+            tuple(1 if i in axes else dim
+                  for i, dim in enumerate(full_shape)), out.dtype)
+
+        add.reduce(broadcast_to(grad, full_shape),
+                   axis=axes,
+                   keepdims=True,
+                   out=reduced)
+        add(out, reduced.reshape(out.shape), out=out)
+
+    def _defer(self) -> None:
+        ''' Defers the forward pass until the value of the output is
+        needed (see `modes.lazy`)
+
+        The output is not evaluated again if it is up to date: none of the
+        children is deferred and neither the output nor the children
+        changed since its last deferred evaluation.
+
+        '''
+
+        output = self._output_placeholder
+
+        if self._versions is not None and output._value is not None and \
+                not any(child._pending for child in self.children) and \
+                self._versions == (output._version,
+                                   *(child._version
+                                     for child in self.children)):
+            return
+
+        output._pending = True
+
+    def _forward_output(self) -> None:
+        ''' Runs the forward pass, setting the value of the output
+        '''
+
+        profiler = _profiling.get_profiler()
+
+        if profiler is None:
+            self._output_placeholder.value = self.forward()
+        else:
+            self._output_placeholder.value = profiler._profile(
+                'forward', self.forward, self)
+
     def __call__(self) -> Tensor:
         ''' Executes cached forward pass
+
+        In lazy mode, the forward pass of the functions recorded in the
+        computation graph is deferred (see `modes.lazy`).
+
         '''
 
-        # Forward pass
-        self._output_placeholder.value = self.forward()
-        return self._output_placeholder
+        output = self._output_placeholder
+
+        if output.creator is not None and modes.is_lazy_enabled():
+            self._defer()
+        else:
+            self._forward_output()
+
+        return output
 
 
 # ====================================================================================================
@@ -158,26 +412,39 @@ def _parse_inputs(inputs: Iterable[Any]) -> List[Tensor]:
     '''
 
     return [
-        x if isinstance(x, _Node) else Tensor(x, name=str(x)) for x in inputs
+        x if isinstance(x, _Node) else Tensor(x, name=None) for x in inputs
     ]
 
 
 # ====================================================================================================
 
 
-def _get_function_identifier(func_type: type, inputs: Iterable[Any]) -> str:
-    ''' Returns a string identifier for the current function type and its inputs,
+def _get_function_identifier(func_type: type, inputs: Iterable[Any],
+                             kwargs: Dict[str, Any]) -> Optional[Tuple]:
+    ''' Returns an identifier for the current function type and its inputs,
     used for a key in the cache.
 
+    Tensors are identified by their id and other Python values by their type
+    and value. If an input can not be hashed (e.g. ndarray), None is returned
+    and the function is not cached.
+
     '''
 
-    key = str(hash(func_type))  # Inlcude the function type hash in the key
+    key: List[Hashable] = [func_type]  # Include the function type in the key
+
     # Include the inputs' (children's) identifiers in the key
-    key += ''.join(('T' + str(x.id) if isinstance(x, Tensor) else 'P' + str(x)
-                    for x in inputs))
+    for x in inputs:
+        key.append(x.id if isinstance(x, Tensor) else (type(x), x))
+
+    if kwargs:
+        key.append(tuple(sorted(kwargs.items())))
+
+    key = tuple(key)
 
-    # 'T' and 'P' signatures were added in order to avoid
-    # collisions between Tensor and Python values
+    try:
+        hash(key)
+    except TypeError:
+        return None
 
     return key
 
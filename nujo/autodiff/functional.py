@@ -0,0 +1,384 @@
+''' Functional differentiation API
+
+Vector-Jacobian, Jacobian-vector and Hessian-vector products of a function
+at given inputs, for batches of vectors.
+
+For vector-Jacobian and Hessian-vector products, the gradient computations
+are recorded once into a computation graph which takes the vector as an
+input (see `Function._input_for`). Then, for each vector of the batch, only
+the part of this graph which depends on the vector is evaluated again,
+instead of differentiating the function anew.
+
+Jacobian-vector products use forward mode instead: the tangents are pushed
+through the computation graph of the function (see `Function.tangent`).
+
+'''
+
+from numbers import Number
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+from typing import Tuple, Union
+
+from numpy import array, asarray, broadcast_to, ndarray, ones, stack, zeros
+
+import nujo.autodiff.modes as modes
+from nujo.autodiff._functions._aggregate import _InnerSum
+from nujo.autodiff._utils import _topological_order
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    'vjp',
+    'jvp',
+    'hvp',
+]
+
+_Inputs = Union[Tensor, ndarray, List[Number], Number, Sequence[Union[
+    Tensor, ndarray, List[Number], Number]]]
+_Vectors = Union[ndarray, List[ndarray]]
+
+# ====================================================================================================
+
+
+def vjp(fn: Callable[..., Tensor],
+        inputs: _Inputs,
+        vectors: ndarray,
+        batched=False) -> Tuple[Tensor, _Vectors]:
+    ''' Vector-Jacobian products of `fn` at `inputs`
+
+    Computes `v^T J` for each vector `v`, where `J` is the Jacobian of the
+    output of `fn` w.r.t. an input.
+
+    Parameters:
+    -----------
+     - fn : callable, takes the inputs as Tensors and returns a Tensor
+     - inputs : Tensor or value, or a list of them, the point at which
+       `fn` is differentiated
+     - vectors : ndarray, of the shape of the output of `fn`; if `batched`,
+       a batch of such vectors stacked along the first dimension
+     - batched : bool, whether `vectors` is a batch of vectors
+
+    Returns:
+    --------
+     - output : Tensor, the output of `fn`
+     - vjps : ndarray of the shape of the input (prefixed with the batch
+       dimension, if `batched`); a list of them (one per input), if
+       `inputs` is a list
+
+    '''
+
+    inputs, is_list = _prepare_inputs(inputs)
+    output = fn(*inputs)
+
+    cotangent = Tensor(zeros(output.shape), name='vjp.vector')
+    grads = _record_grads(output, inputs, cotangent)
+
+    vjps = _evaluate(grads, [input.shape for input in inputs], [cotangent],
+                     [vectors], batched)
+
+    return output, vjps if is_list else vjps[0]
+
+
+def jvp(fn: Callable[..., Tensor],
+        primals: _Inputs,
+        tangents: _Vectors,
+        batched=False) -> Tuple[Tensor, ndarray]:
+    ''' Jacobian-vector products of `fn` at `primals`
+
+    Computes `J v` for each tangent vector `v` by forward-mode
+    differentiation: `fn` is evaluated once, then for each vector the
+    tangents are pushed through its computation graph in topological order,
+    with the tangent rule of each function (see `Function.tangent`).
+
+    A pass costs about as much as evaluating `fn`, whatever the size of
+    its output, so forward mode is cheaper than reverse mode for functions
+    with fewer inputs than outputs.
+
+    Parameters:
+    -----------
+     - fn : callable, takes the primals as Tensors and returns a Tensor
+     - primals : Tensor or value, or a list of them, the point at which
+       `fn` is differentiated
+     - tangents : ndarray of the shape of the primal (prefixed with the
+       batch dimension, if `batched`); a list of them (one per primal), if
+       `primals` is a list
+     - batched : bool, whether `tangents` are batches of vectors
+
+    Returns:
+    --------
+     - output : Tensor, the output of `fn`
+     - jvps : ndarray, of the shape of the output of `fn` (prefixed with
+       the batch dimension, if `batched`)
+
+    '''
+
+    primals, is_list = _prepare_inputs(primals)
+    output = fn(*primals)
+
+    ordering = _topological_order(output)
+
+    tangents = tangents if is_list else [tangents]
+    jvps = [
+        _push_tangents(ordering, primals, batch)
+        for batch in _batches(tangents, batched)
+    ]
+
+    return output, stack(jvps) if batched else jvps[0]
+
+
+def hvp(fn: Callable[..., Tensor],
+        inputs: _Inputs,
+        vectors: _Vectors,
+        batched=False) -> Tuple[Tensor, _Vectors]:
+    ''' Hessian-vector products of `fn` at `inputs`
+
+    Computes `H v` for each vector `v`, where `H` is the Hessian of the
+    (scalar) output of `fn` w.r.t. the inputs, by double backward: `H v`
+    is the gradient of `grad^T v`. For more than one input, `H` is the
+    Hessian w.r.t. all of them and `v` is split into one vector per input.
+
+    Useful for second-order methods and for Hutchinson trace estimates
+    (the average of `v^T H v` over random vectors `v`).
+
+    Parameters:
+    -----------
+     - fn : callable, takes the inputs as Tensors and returns a scalar
+       Tensor (of size 1)
+     - inputs : Tensor or value, or a list of them, the point at which
+       `fn` is differentiated
+     - vectors : ndarray of the shape of the input (prefixed with the batch
+       dimension, if `batched`); a list of them (one per input), if
+       `inputs` is a list
+     - batched : bool, whether `vectors` are batches of vectors
+
+    Returns:
+    --------
+     - output : Tensor, the output of `fn`
+     - hvps : ndarray of the shape of the input (prefixed with the batch
+       dimension, if `batched`); a list of them (one per input), if
+       `inputs` is a list
+
+    '''
+
+    inputs, is_list = _prepare_inputs(inputs)
+    output = fn(*inputs)
+
+    if output.value.size != 1:
+        raise ValueError('The Hessian-vector product is defined for scalar '
+                         f'outputs, got an output of shape {output.shape}')
+
+    grads = _record_grads(output, inputs, Tensor(ones(output.shape)))
+
+    vector_inputs, inner = _inner_product(grads, inputs, 'hvp.vector')
+    hvps = _record_grads(inner, inputs, Tensor(1.)) \
+        if inner is not None else [None] * len(inputs)
+
+    vectors = vectors if is_list else [vectors]
+    hvps = _evaluate(hvps, [input.shape for input in inputs], vector_inputs,
+                     vectors, batched)
+
+    return output, hvps if is_list else hvps[0]
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _prepare_inputs(inputs: _Inputs) -> Tuple[List[Tensor], bool]:
+    ''' Returns new differentiable leaf tensors with the values of `inputs`
+    (so that the tensors of the caller are not modified) and whether
+    `inputs` is a list.
+    '''
+
+    if not modes.is_diff_enabled():
+        raise RuntimeError('Differentiation is disabled (`no_diff` block), '
+                           'the gradient computations cannot be recorded')
+
+    is_list = isinstance(inputs, (list, tuple))
+    inputs = inputs if is_list else [inputs]
+
+    return [
+        Tensor(getattr(input, 'value', input),
+               diff=True,
+               name=getattr(input, 'name', f'input[{i}]'))
+        for i, input in enumerate(inputs)
+    ], is_list
+
+
+def _record_grads(output: Tensor, inputs: List[Tensor],
+                  cotangent: Tensor) -> List[Optional[Tensor]]:
+    ''' Records the computation of the gradients of `output` w.r.t.
+    `inputs` in the computation graph, with `cotangent` as the gradient of
+    `output`.
+
+    Returns the gradient of each input (None, if the output does not
+    depend on it).
+
+    '''
+
+    ordering = _topological_order(output)
+
+    # Only the tensors depending on the inputs need gradients
+    depending = {input.id for input in inputs}
+    for node in ordering:
+        if node.creator is not None and any(
+                child.id in depending for child in node.creator.children):
+            depending.add(node.id)
+
+    grads = {output.id: cotangent}
+    for node in reversed(ordering[:-1]):
+        if node.id not in depending:
+            continue
+
+        grad = None
+        for poutput in node.parents_outputs:
+            if poutput.id not in grads:  # not in the graph of `output`
+                continue
+
+            # `node` may be passed to the same function more than once
+            for idx, child in enumerate(poutput.creator.children):
+                if child is node:
+                    contribution = poutput.creator.backward(
+                        idx, grads[poutput.id])
+
+                    grad = contribution if grad is None \
+                        else grad + contribution
+
+        if grad is not None:
+            grads[node.id] = grad
+
+    return [grads.get(input.id) for input in inputs]
+
+
+def _inner_product(
+        grads: List[Optional[Tensor]], inputs: List[Tensor],
+        name: str) -> Tuple[List[Tensor], Optional[Tensor]]:
+    ''' Returns new leaf tensors `vectors` (one per input) and the sum of
+    the inner products of `grads` and `vectors` (None, if all the
+    gradients are None).
+    '''
+
+    vectors = [
+        Tensor(zeros(input.shape), name=f'{name}[{i}]')
+        for i, input in enumerate(inputs)
+    ]
+
+    inner = None
+    for grad, vector in zip(grads, vectors):
+        if grad is not None:
+            product = _InnerSum(grad * vector)()
+            inner = product if inner is None else inner + product
+
+    return vectors, inner
+
+
+def _evaluate(roots: List[Optional[Tensor]], shapes: List[Tuple[int, ...]],
+              leaves: List[Tensor], vectors: List[ndarray],
+              batched: bool) -> List[ndarray]:
+    ''' Evaluates `roots` for each of the `vectors` assigned to `leaves`
+
+    Only the tensors in the graphs of `roots` which depend on `leaves`
+    are evaluated again. A None root evaluates to zeros of its shape.
+
+    '''
+
+    ordering = _evaluation_order([root for root in roots if root is not None],
+                                 leaves)
+
+    results: List[List[ndarray]] = [[] for _ in roots]
+    for batch in _batches(vectors, batched):
+        for leaf, vector in zip(leaves, batch):
+            prev_shape = leaf.shape
+            leaf.value = vector
+
+            if leaf.shape != prev_shape:
+                raise ValueError(f'Expected a vector of shape {prev_shape}, '
+                                 f'got {leaf.shape}')
+
+        for node in ordering:
+            node.value = node.creator.forward()
+
+        for result, root, shape in zip(results, roots, shapes):
+            result.append(
+                root.value.copy() if root is not None else zeros(shape))
+
+    return [stack(result) if batched else result[0] for result in results]
+
+
+def _batches(vectors: List[ndarray],
+             batched: bool) -> Iterator[Tuple[ndarray, ...]]:
+    ''' Iterates over the batches of `vectors` (one batch per input),
+    yielding a vector per input at a time.
+    '''
+
+    vectors = [vector if batched else [vector] for vector in vectors]
+    if len({len(batch) for batch in vectors}) > 1:
+        raise ValueError('The batches of vectors have different sizes')
+
+    return zip(*vectors)
+
+
+def _push_tangents(ordering: List[Tensor], primals: List[Tensor],
+                   tangents: Sequence[ndarray]) -> ndarray:
+    ''' Pushes `tangents`, the tangents of `primals`, forward through the
+    tensors of `ordering` (in topological order) and returns the tangent
+    of the last one.
+
+    Only the tensors depending on the primals get a tangent, the others
+    (constants) have a zero tangent.
+
+    '''
+
+    node_tangents: Dict[int, ndarray] = {}
+    for primal, tangent in zip(primals, tangents):
+        tangent = asarray(tangent)
+
+        if tangent.shape != primal.shape:
+            raise ValueError(f'Expected a vector of shape {primal.shape}, '
+                             f'got {tangent.shape}')
+
+        node_tangents[primal.id] = tangent
+
+    for node in ordering:
+        if node.creator is None or node.id in node_tangents:
+            continue
+
+        child_tangents = [
+            node_tangents.get(child.id) for child in node.creator.children
+        ]
+
+        if any(tangent is not None for tangent in child_tangents):
+            node_tangents[node.id] = broadcast_to(
+                node.creator.tangent(child_tangents), node.shape)
+
+    output = ordering[-1]
+    if output.id not in node_tangents:
+        return zeros(output.shape)
+
+    return array(node_tangents[output.id])
+
+
+def _evaluation_order(roots: List[Tensor],
+                      leaves: List[Tensor]) -> List[Tensor]:
+    ''' Returns the tensors in the graphs of `roots` which depend on
+    `leaves`, in topological order.
+    '''
+
+    depending = {leaf.id for leaf in leaves}
+    visited = set()
+    ordering = []
+
+    for root in roots:
+        for node in _topological_order(root):
+            if node.id in visited:
+                continue
+
+            visited.add(node.id)
+
+            if node.creator is not None and any(
+                    child.id in depending for child in node.creator.children):
+                depending.add(node.id)
+                ordering.append(node)
+
+    return ordering
+
+
+# ====================================================================================================
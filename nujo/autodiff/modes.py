@@ -1,9 +1,19 @@
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from numpy import dtype, float64
+
 __all__ = [
-    'DIFF_ENABLED',
+    'is_diff_enabled',
     'no_diff',
+    'is_lazy_enabled',
+    'lazy',
+    'get_default_dtype',
+    'set_default_dtype',
+    'default_dtype',
 ]
 
-DIFF_ENABLED = True
+_DIFF_ENABLED: 'ContextVar[bool]' = ContextVar('DIFF_ENABLED', default=True)
 ''' This variable controls whether nujo to compute gradients
 for the tensors in the computation graph:
     - True = differentiation enabled, compute gradients
@@ -14,20 +24,178 @@ Another way to see it is:
  - if DIFF_ENABLED is True, the computation graph is updated,
  otherwise it is not.
 
+It is a context variable, thus every thread (and asyncio task) has its own
+value and disabling differentiation in one of them does not affect the
+others. Read it using `is_diff_enabled()` (or `modes.DIFF_ENABLED`).
+
 '''
 
 
+def is_diff_enabled() -> bool:
+    ''' Returns whether differentiation is enabled in the current context
+    '''
+
+    return _DIFF_ENABLED.get()
+
+
+def __getattr__(name: str):
+    # `modes.DIFF_ENABLED` returns the value for the current context
+    if name == 'DIFF_ENABLED':
+        return _DIFF_ENABLED.get()
+
+    raise AttributeError(f'module {__name__} has no attribute {name}')
+
+
 class no_diff():
     ''' No Differentiation block
 
     Creates a block of code where no differentiation is done.
     a.k.a. No gradients are computed for whatever tensor.
 
+    The blocks can be nested; on exit, the mode that was active before
+    entering is restored. Only the current thread (context) is affected.
+
+    '''
+    def __init__(self):
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_DIFF_ENABLED.set(False))
+
+    def __exit__(self, type, value, traceback):
+        _DIFF_ENABLED.reset(self._tokens.pop())
+
+
+# ====================================================================================================
+# Lazy evaluation
+
+_LAZY_ENABLED: 'ContextVar[bool]' = ContextVar('LAZY_ENABLED', default=False)
+''' Whether the functions called in the current context defer their
+forward pass (see `lazy`)
+'''
+
+
+def is_lazy_enabled() -> bool:
+    ''' Returns whether lazy evaluation is enabled in the current context
+    '''
+
+    return _LAZY_ENABLED.get()
+
+
+class lazy():
+    ''' Lazy evaluation block
+
+    Creates a block of code where calling a function only records it in
+    the computation graph: its forward pass is deferred until the value of
+    its output is needed (e.g. by `Tensor.value`, `Tensor.shape` or
+    `Tensor.backward`). The deferred outputs are then evaluated at once,
+    each one exactly once, and the ones that are never needed are never
+    evaluated.
+
+    Identical subexpressions (the same function type applied to the same
+    tensors, e.g. `log(x)` written twice) share a single function through
+    the function lookup cache, so they are evaluated only once, and an
+    output whose inputs did not change since it was last evaluated is not
+    evaluated again.
+
+        >>> with nj.lazy():
+        ...     loss = loss_fn(net(x), y)  # nothing computed yet
+        ...     loss.backward()            # evaluates the loss, then
+        ...                                # backpropagates
+
+    The values are read when the deferred outputs are evaluated, not when
+    the functions are called. Functions that need the values or the shapes
+    of their inputs when created (e.g. the shape checks of the matrix
+    multiplication) evaluate their inputs at that point. Only the functions
+    recorded in the computation graph are deferred: in `no_diff` blocks the
+    functions are evaluated eagerly.
+
+    The blocks can be nested; only the current thread (context) is
+    affected.
+
+    '''
+    def __init__(self):
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_LAZY_ENABLED.set(True))
+
+    def __exit__(self, type, value, traceback):
+        _LAZY_ENABLED.reset(self._tokens.pop())
+
+
+# ====================================================================================================
+# Default dtype policy
+
+_DEFAULT_DTYPE = dtype(float64)
+''' The dtype of the floating point values of the tensors: every Tensor
+value (initializers, function outputs, optimizer states) and gradient
+buffer with a floating point dtype is stored in this dtype.
+
+Set it for the whole process using `set_default_dtype`, or for a block
+of code using the `default_dtype` context manager.
+
+'''
+
+_DTYPE_OVERRIDE: 'ContextVar[Optional[dtype]]' = ContextVar('DTYPE_OVERRIDE',
+                                                            default=None)
+''' The dtype set by the innermost `default_dtype` block of the current
+context (thread or asyncio task), if any
+'''
+
+
+def get_default_dtype() -> dtype:
+    ''' Returns the default floating point dtype in the current context
     '''
+
+    override = _DTYPE_OVERRIDE.get()
+    return override if override is not None else _DEFAULT_DTYPE
+
+
+def set_default_dtype(new_dtype: Any) -> None:
+    ''' Sets the default floating point dtype of the process
+
+    Parameters:
+    -----------
+     - new_dtype : a floating point dtype (e.g. `numpy.float32`, 'float32')
+
+    '''
+
+    global _DEFAULT_DTYPE
+    _DEFAULT_DTYPE = _parse_float_dtype(new_dtype)
+
+
+class default_dtype():
+    ''' Default dtype block
+
+    Creates a block of code where the default floating point dtype is
+    `new_dtype`. The blocks can be nested; only the current thread
+    (context) is affected.
+
+        >>> with nj.default_dtype('float32'):
+        ...     W = nj.randn(3, 3)  # float32
+
+    Parameters:
+    -----------
+     - new_dtype : a floating point dtype (e.g. `numpy.float32`, 'float32')
+
+    '''
+    def __init__(self, new_dtype: Any):
+        self.dtype = _parse_float_dtype(new_dtype)
+        self._tokens = []
+
     def __enter__(self):
-        global DIFF_ENABLED
-        DIFF_ENABLED = False
+        self._tokens.append(_DTYPE_OVERRIDE.set(self.dtype))
 
     def __exit__(self, type, value, traceback):
-        global DIFF_ENABLED
-        DIFF_ENABLED = True
+        _DTYPE_OVERRIDE.reset(self._tokens.pop())
+
+
+def _parse_float_dtype(new_dtype: Any) -> dtype:
+    new_dtype = dtype(new_dtype)
+
+    if new_dtype.kind != 'f':
+        raise TypeError('Only floating point dtypes can be the default, '
+                        f'got {new_dtype}')
+
+    return new_dtype
@@ -0,0 +1,419 @@
+''' Graph capture and replay
+
+A training step with fixed shapes builds the same computation graph over
+and over again. Capturing the step once into a flat `Tape` allows later
+steps to replay the recorded forward and backward computations with new
+input values, skipping all per-operation dispatch (function lookup, graph
+building, graph traversal).
+
+'''
+
+from numbers import Number
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from numpy import empty, ndarray, uint8
+
+import nujo._profiling as _profiling
+from nujo.autodiff._functions._fused import _FusedElementwise, _is_elementwise
+from nujo.autodiff._utils import _topological_order
+from nujo.autodiff.function import Function
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    'Tape',
+    'capture',
+]
+
+# ====================================================================================================
+
+
+class Tape:
+    ''' A flat record of a computation graph
+
+    The forward pass is stored as a list of (output tensor, function,
+    output buffer) triples in topological order, where the output buffer
+    is None unless the memory of the tape is planned (see `plan`), and the
+    backward pass as a list of (tensor, gradient contributions) pairs in
+    reverse topological order, where each contribution is a (function,
+    output of the function, index of the tensor in its children) triple.
+
+    Chains of elementwise functions can be fused into single functions
+    after capturing (see `fuse`), and the intermediate values of a
+    forward-only tape can share a small pool of buffers (see `plan`).
+
+    Replaying the tape assumes that the structure of the computation and the
+    shapes of the inputs are fixed. Only computations done by nujo functions
+    are recorded; other side effects (e.g. assigning to `Tensor.value`
+    inside the captured code) are not replayed.
+
+    Parameters:
+    -----------
+     - inputs : list of Tensors, the inputs whose values are replaced on
+       every replay
+     - output : Tensor, the output of the computation (e.g. the loss)
+
+    '''
+    def __init__(self, inputs: List[Tensor], output: Tensor):
+        self.inputs = list(inputs)
+        self.output = output
+
+        self._record(_topological_order(output), {})
+
+    def _record(self, ordering: List[Tensor],
+                fused: Dict[int, Tuple[Tensor, Function]]) -> None:
+        ''' Records the forward and backward passes of the graph
+
+        Parameters:
+        -----------
+         - ordering : list of Tensors, the topological order of the graph
+         - fused : dict, maps the id of each tensor computed by a fused
+           function (see `fuse`) to the output of the fused function and
+           the fused function itself
+
+        '''
+
+        graph = {node.id for node in ordering}
+
+        self._forward_tape: List[Tuple[Tensor, Function,
+                                       Optional[ndarray]]] = []
+        for node in ordering:
+            if node.creator is None:
+                continue
+
+            if node.id in fused:
+                # Only the output of a fused chain is computed
+                output, function = fused[node.id]
+                if node is output:
+                    self._forward_tape.append((node, function, None))
+
+            else:
+                self._forward_tape.append((node, node.creator, None))
+
+        # Buffers shared by the intermediate values, see `plan`
+        self._pool: Optional[List[ndarray]] = None
+
+        self._backward_tape: List[Tuple[Tensor, List[Tuple[
+            Function, Tensor, int]]]] = []
+
+        for node in reversed(ordering):
+            if not node.diff or node is self.output:
+                continue
+
+            # The gradients inside a fused chain are not materialized
+            if node.id in fused and fused[node.id][0] is not node:
+                continue
+
+            # (function, its output, index of `node` in its children)
+            contributions = []
+            for poutput in node.parents_outputs:
+                if poutput.id not in graph:
+                    continue
+
+                if poutput.id in fused:
+                    poutput, function = fused[poutput.id]
+
+                    # `node` may be input to more than one fused function
+                    if any(function is f for f, _, _ in contributions):
+                        continue
+
+                else:
+                    function = poutput.creator
+
+                contributions.extend(
+                    (function, poutput, idx)
+                    for idx, child in enumerate(function.children)
+                    if child is node)
+
+            self._backward_tape.append((node, contributions))
+
+            if node._grad is None:
+                node.zero_grad(propagate=False)
+
+        if self.output.diff and self.output._grad is None:
+            self.output.zero_grad(propagate=False)
+
+    def fuse(self) -> 'Tape':
+        ''' Fuses the chains of elementwise functions of the tape
+
+        Consecutive elementwise functions (e.g. `x - y`, recorded as a
+        negation and an addition, or an activation applied to the bias
+        addition of an affine layer) are merged into a single function,
+        which evaluates the chain into reusable scratch buffers and
+        backpropagates through it at once. A tensor is fused into a chain
+        only if it is used by the next function of the chain alone.
+
+        The values and the gradients of the tensors inside the fused chains
+        are not updated by later replays.
+
+        Returns:
+        --------
+         - tape : Tape, the same (fused) tape
+
+        '''
+
+        ordering = _topological_order(self.output)
+        graph = {node.id for node in ordering}
+        inputs = {input.id for input in self.inputs}
+
+        # The output of the chain each elementwise tensor is fused into
+        chain_outputs: Dict[int, Tensor] = {}
+        for node in reversed(ordering):
+            if not _is_elementwise(node):
+                continue
+
+            poutputs = [
+                poutput for poutput in node.parents_outputs
+                if poutput.id in graph
+            ]
+
+            if node is not self.output and node.id not in inputs and \
+                    len(poutputs) == 1 and poutputs[0].id in chain_outputs:
+                chain_outputs[node.id] = chain_outputs[poutputs[0].id]
+            else:
+                chain_outputs[node.id] = node
+
+        chains: Dict[int, List[Tensor]] = {}
+        for node in ordering:
+            if node.id in chain_outputs:
+                chains.setdefault(chain_outputs[node.id].id, []).append(node)
+
+        fused: Dict[int, Tuple[Tensor, Function]] = {}
+        for chain in chains.values():
+            if len(chain) < 2:
+                continue
+
+            function = _FusedElementwise.from_tensors(chain)
+            for node in chain:
+                fused[node.id] = (chain[-1], function)
+
+        self._record(ordering, fused)
+        return self
+
+    def plan(self) -> 'Tape':
+        ''' Plans the memory of the intermediate values of the tape
+
+        Runs a liveness analysis of the forward pass: the value of each
+        intermediate tensor is live from the function computing it until
+        the last function using it (or a view of it, e.g. a reshape).
+        The values are then assigned to a pool of shared buffers, a value
+        reusing the buffer of a value which is no longer live, so that
+        later replays write the intermediate values into the pool (see
+        `Function.forward_into`) instead of allocating new arrays. The
+        peak memory of a forward replay approaches the size of the widest
+        layer instead of the sum over all layers.
+
+        Backpropagation needs the intermediate values, which are now
+        overwritten by the replays, so a planned tape is forward-only
+        (e.g. inference). The output of the tape is still a new array on
+        every replay. Fusing the tape (see `fuse`) discards the plan.
+
+        Returns:
+        --------
+         - tape : Tape, the same (planned) tape
+
+        '''
+
+        # The storage of each value: its own, or the one it is a view of
+        storage: Dict[int, Optional[int]] = {}
+        last_use: Dict[int, int] = {}
+
+        for step, (node, function, _) in enumerate(self._forward_tape):
+            if function._returns_view:
+                storage[node.id] = storage.get(function.children[0].id)
+            else:
+                storage[node.id] = last_use[node.id] = step
+
+            for child in function.children:
+                if storage.get(child.id) is not None:
+                    last_use[storage[child.id]] = step
+
+        # The values the output is a view of are not overwritten either
+        excluded = storage.get(self.output.id)
+
+        # Greedy best-fit assignment of the values to the buffers, in the
+        # order they are computed; a buffer is allocated to a value before
+        # the values last used by its function are released, so that the
+        # output of a function never overlaps its inputs.
+        sizes: List[int] = []
+        free: List[int] = []
+        assigned: Dict[int, int] = {}
+        released: Dict[int, List[int]] = {}
+
+        for step, (node, function, _) in enumerate(self._forward_tape):
+            if storage[node.id] == step and step != excluded:
+                nbytes = node.value.nbytes
+                fitting = [idx for idx in free if sizes[idx] >= nbytes]
+
+                if fitting:  # The smallest free buffer that fits
+                    idx = min(fitting, key=lambda idx: sizes[idx])
+                elif free:  # Otherwise, the largest one is grown
+                    idx = max(free, key=lambda idx: sizes[idx])
+                    sizes[idx] = nbytes
+                else:
+                    idx = len(sizes)
+                    sizes.append(nbytes)
+
+                if idx in free:
+                    free.remove(idx)
+
+                assigned[step] = idx
+                released.setdefault(last_use[step], []).append(idx)
+
+            free.extend(released.pop(step, []))
+
+        self._pool = [empty(size, uint8) for size in sizes]
+
+        for step, (node, function, _) in enumerate(self._forward_tape):
+            out = None
+            if step in assigned:
+                value = node.value
+                out = self._pool[assigned[step]][:value.nbytes].view(
+                    value.dtype).reshape(value.shape)
+
+            self._forward_tape[step] = (node, function, out)
+
+        return self
+
+    @property
+    def pool_nbytes(self) -> int:
+        ''' The bytes of the buffers shared by the intermediate values
+        (0 if the memory of the tape is not planned, see `plan`)
+        '''
+
+        if self._pool is None:
+            return 0
+
+        return sum(buffer.nbytes for buffer in self._pool)
+
+    def __len__(self):
+        return len(self._forward_tape)
+
+    def forward(self, *values: Union[Tensor, ndarray, List[Number],
+                                     Number]) -> Tensor:
+        ''' Replays the forward pass with new values for the inputs
+
+        Parameters:
+        -----------
+         - values : varargs, new values for the inputs, in the order the
+           inputs were given; their shapes should not change
+
+        Returns:
+        --------
+         - output : Tensor, the output of the computation
+
+        '''
+
+        if len(values) != len(self.inputs):
+            raise ValueError(f'Expected {len(self.inputs)} input values, '
+                             f'got {len(values)}')
+
+        for input, value in zip(self.inputs, values):
+            prev_shape = input.shape
+            input.value = value
+
+            if input.shape != prev_shape:
+                raise ValueError('Input shape changed from '
+                                 f'{prev_shape} to {input.shape}; '
+                                 'capture a new tape for the new shape')
+
+        profiler = _profiling.get_profiler()
+
+        for node, function, out in self._forward_tape:
+            if profiler is None:
+                node.value = function.forward() if out is None else \
+                    function.forward_into(out)
+            else:
+                node.value = profiler._profile(
+                    'forward', function.forward if out is None else
+                    lambda: function.forward_into(out), function)
+
+        return self.output
+
+    def backward(self) -> None:
+        ''' Replays the backward pass
+
+        As with `Tensor.backward`, the gradients of the leaves (e.g. the
+        parameters) are accumulated and should be zeroed by the caller.
+
+        '''
+
+        if self._pool is not None:
+            raise RuntimeError('The memory of the tape is planned for '
+                               'forward replays only, the intermediate '
+                               'values are overwritten; capture a new tape '
+                               'to backpropagate')
+
+        if not self.output.diff:
+            return
+
+        self.output._grad._value.fill(1)
+        self.output._grad._version += 1
+
+        profiler = _profiling.get_profiler()
+
+        for node, contributions in self._backward_tape:
+            if node.creator is not None:  # Intermediate tensor
+                node._grad._value.fill(0)
+
+            for function, poutput, idx in contributions:
+                if profiler is None:
+                    function.backward_into(idx, poutput._grad._value,
+                                           node._grad._value)
+                else:
+                    profiler._profile(
+                        'backward',
+                        lambda: function.backward_into(
+                            idx, poutput._grad._value, node._grad._value),
+                        function)
+
+            node._grad._version += 1
+
+    def __call__(self, *values: Union[Tensor, ndarray, List[Number],
+                                      Number]) -> Tensor:
+        ''' Replays a whole forward/backward step
+        '''
+
+        output = self.forward(*values)
+        self.backward()
+
+        return output
+
+
+# ====================================================================================================
+
+
+def capture(fn: Callable[..., Tensor],
+            *inputs: Union[Tensor, ndarray, List[Number], Number]) -> Tape:
+    ''' Capture a computation into a Tape
+
+    Runs `fn` once on `inputs` (building the computation graph as usual)
+    and records the graph into a Tape, which can then be replayed with new
+    values for the inputs.
+
+    Example:
+        >>> step = capture(lambda x, y: loss_fn(net(x), y), x, y)
+        >>> for x_batch, y_batch in batches:
+        ...     loss = step(x_batch, y_batch)  # forward + backward
+        ...     optimizer.step()
+        ...     optimizer.zero_grad()
+
+    Parameters:
+    -----------
+     - fn : callable (e.g. Flow), the computation to capture
+     - inputs : varargs, example inputs of `fn`
+
+    Returns:
+    --------
+     - tape : Tape
+
+    '''
+
+    inputs = [
+        x if isinstance(x, Tensor) else Tensor(x, name=f'input[{i}]')
+        for i, x in enumerate(inputs)
+    ]
+
+    return Tape(inputs, fn(*inputs))
+
+
+# ====================================================================================================
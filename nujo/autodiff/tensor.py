@@ -1,11 +1,14 @@
 from numbers import Number
-from typing import List, Tuple, Union
+from typing import Callable, List, Optional, Set, Tuple, Union
+from weakref import ref
 
 from numpy import array, empty, ndarray
 
+import nujo._profiling as _profiling
 import nujo.autodiff.modes as modes
 from nujo.autodiff._node import _Node
-from nujo.autodiff._utils import _if_not_none
+from nujo.autodiff._utils import (_if_not_none, _release_schedule,
+                                  _topological_order)
 
 
 class Tensor(_Node):
@@ -23,17 +26,46 @@ class Tensor(_Node):
      - diff : boolean, whether to compute gradients for the tensor
      - creator : nujo function, that created this tensor;
        the only child of a tensor
-     - name : string, representation of the tensor
+     - name : string, representation of the tensor; can also be None or
+       a callable with no arguments, in which case the name is generated
+       lazily
 
     '''
+
+    __slots__ = (
+        '_value',
+        '_pending',
+        '_released',
+        'diff',
+        'creator',
+        '_parents_outputs',
+        '_grad',
+        '_version',
+        '_T',
+        '_T_version',
+    )
+
     def __init__(self,
                  value: Union['Tensor', ndarray, List[Number], Number],
                  diff=False,
                  creator=None,
-                 name='Tensor'):
+                 name: Optional[Union[str, Callable[[], str]]] = 'Tensor'):
 
         super(Tensor, self).__init__(*_if_not_none(creator), name=name)
 
+        # Version of the value, bumped on every change of the value (by the
+        # `value` setter, `__setitem__` and the in-place updates of the
+        # gradients); the caches derived from the value compare versions
+        # instead of the values themselves
+        self._version = 0
+
+        # Whether the value is deferred, see `modes.lazy`
+        self._pending = False
+
+        # Whether the value or the arrays saved by the creator were released
+        # by a backward pass (see `backward`), until the next forward pass
+        self._released = False
+
         self._value: ndarray = None
         self.value = value  # set value
 
@@ -42,52 +74,145 @@ class Tensor(_Node):
 
         # Outputs of the functions the current tensor is input to.
         # Used for backpropagation of the gradients.
-        self.parents_outputs: List['Tensor'] = []
+        # They are held by weak reference, so that a tensor does not keep
+        # alive the graphs built on top of it. Allocated on the first output.
+        self._parents_outputs: Optional[List['ref[Tensor]']] = None
 
         # Gradient of the current tensor
         self._grad: 'Tensor' = None
 
-        # Transposed tensor cache
+        # Transposed tensor cache, valid while `_version == _T_version`
         self._T: 'Tensor' = None
-        self._prev_value: ndarray = None
+        self._T_version = -1
 
     @property
     def value(self):
+        if self._pending:
+            self._evaluate()
+
+        elif self._value is None and self._released:
+            raise RuntimeError(
+                f'The value of {self!r} was released by a backward pass. '
+                'Pass `retain_graph=True` to `backward` to read the '
+                'intermediate values after it.')
+
         return self._value
 
     @value.setter
     def value(self, value: Union['Tensor', ndarray, List[Number], Number]):
         if isinstance(value, Tensor):
-            self._value = value.value
-        elif isinstance(value, ndarray):
-            self._value = value
-        else:
-            self._value = array(value)
+            value = value.value
+        elif not isinstance(value, ndarray):
+            value = array(value)
+
+        # Floating point values are stored in the default dtype
+        if value.dtype.kind == 'f':
+            default_dtype = modes.get_default_dtype()
+            if value.dtype != default_dtype:
+                value = value.astype(default_dtype)
+
+        self._value = value
+        self._pending = False
+        self._released = False
+        self._version += 1
 
     @value.deleter
     def value(self):
         del self._value
 
+    @property
+    def parents_outputs(self) -> List['Tensor']:
+        ''' Outputs of the functions the current tensor is input to
+        (only the ones that are still alive)
+        '''
+
+        if self._parents_outputs is None:
+            return []
+
+        outputs = [wr() for wr in self._parents_outputs]
+
+        # Prune the outputs that were garbage collected
+        if any(poutput is None for poutput in outputs):
+            self._parents_outputs = [
+                wr for wr, poutput in zip(self._parents_outputs, outputs)
+                if poutput is not None
+            ]
+            outputs = [poutput for poutput in outputs if poutput is not None]
+
+        return outputs
+
+    def _evaluate(self) -> None:
+        ''' Evaluates the deferred value of `self` and the deferred values
+        it depends on (see `modes.lazy`), each of them once
+        '''
+
+        for node in _topological_order(self, pending_only=True):
+            creator = node.creator
+            creator._forward_output()
+
+            # The versions the value is up to date with, see `Function._defer`
+            creator._versions = (node._version,
+                                 *(child._version
+                                   for child in creator.children))
+
+    def _add_parent_output(self, poutput: 'Tensor') -> None:
+        # Empty once all the outputs were collected and pruned
+        if not self._parents_outputs:
+            self._parents_outputs = [ref(poutput)]
+            return
+
+        last_output = self._parents_outputs[-1]()
+
+        # A tensor passed to the same function more than once
+        # is added to its output only once
+        if last_output is poutput:
+            return
+
+        # Prune the outputs that were garbage collected (e.g. the graphs of
+        # the previous iterations), as the gradient computation does, so
+        # that the list does not grow for the tensors never differentiated
+        if last_output is None:
+            self._parents_outputs = [
+                wr for wr in self._parents_outputs if wr() is not None
+            ]
+
+        self._parents_outputs.append(ref(poutput))
+
     @property
     def grad(self) -> 'Tensor':
         if self._grad is None:
-            self._grad = Tensor(empty(self._value.shape),
-                                name=f'grad[{self.name}]')
+            # Gradients are floating point, even for integer tensors
+            value = self.value
+            grad_dtype = value.dtype if value.dtype.kind == 'f'\
+                else modes.get_default_dtype()
+
+            self._grad = Tensor(empty(value.shape, grad_dtype),
+                                name=self._generate_grad_name)
 
         return self._grad
 
+    def _generate_name(self) -> str:
+        if self.creator is not None:
+            return self.creator._generate_tensor_name()
+
+        return str(self._value)
+
+    def _generate_grad_name(self) -> str:
+        return f'grad[{self.name}]'
+
     # Shape and shape manipulations
 
     @property
     def shape(self) -> Tuple[int, ...]:
-        return self._value.shape
+        return self.value.shape
 
     @property
     def T(self) -> 'Tensor':
-        # Only transpose if something has changed
-        if (self._value != self._prev_value).any():
+        # Only transpose if the value has changed (or the value of the
+        # transposed tensor was released by a backward pass)
+        if self._T_version != self._version or self._T._value is None:
             self._T = self.transpose()
-            self._prev_value = self._value
+            self._T_version = self._version
 
         return self._T
 
@@ -101,19 +226,18 @@ class Tensor(_Node):
 
     def squeeze(self, dim=-1) -> 'Tensor':
         if dim < 0:
-            num_dims = len(self._value.shape)
+            num_dims = len(self.shape)
 
             if dim < -num_dims:
                 dim = num_dims
             else:
                 dim += num_dims
 
-        return self.reshape(*self._value.shape[:dim],
-                            *self._value.shape[dim + 1:])
+        return self.reshape(*self.shape[:dim], *self.shape[dim + 1:])
 
     def unsqueeze(self, dim=-1) -> 'Tensor':
         if dim < 0:
-            num_dims = len(self._value.shape)
+            num_dims = len(self.shape)
 
             if dim < -num_dims:
                 dim = 0
@@ -122,116 +246,199 @@ class Tensor(_Node):
                     dim += 1
                 dim += num_dims
 
-        return self.reshape(*self._value.shape[:dim], 1,
-                            *self._value.shape[dim:])
+        return self.reshape(*self.shape[:dim], 1, *self.shape[dim:])
 
     # Gradient computation
 
-    def _compute_grad_from(self,
-                           poutput: 'Tensor') -> Union['Tensor', ndarray]:
+    def _compute_grad_from(self, poutput: 'Tensor',
+                           idx: int) -> Union['Tensor', ndarray]:
         ''' Computes the gradient of `self` w.r.t. the output of the computation
         graph from `poutput` (using the path of computations from `poutput`)
 
             In other words, this functions returns:
                 (dOutput / dPoutput) * (dPoutput / dSelf)
 
-        '''
+        `idx` is the index of `self` in `poutput.creator.children`.
 
-        # Find the index of the children which gradient should be computed
-        # (a.k.a. find the index of `self` in `poutput.creator.children`)
-        idx = next(i for i, v in enumerate(poutput.creator.children)
-                   if v is self)
+        '''
 
         if poutput._grad.diff:
             # Pass a diff enabled tensor to the backward call,
             # thus recording grad computations in the computation
             # graph, which enables higher-order differentiation.
-            grad = poutput.creator.backward(idx, poutput._grad)
+            accum_grad = poutput._grad
+        else:
+            # Do not leave a trace in the computation graph!
+            # Use numpy arrays! :)
+            accum_grad = poutput._grad._value
+
+        profiler = _profiling.get_profiler()
+        if profiler is not None:
+            return profiler._profile(
+                'backward',
+                lambda: poutput.creator.backward(idx, accum_grad),
+                poutput.creator)
+
+        return poutput.creator.backward(idx, accum_grad)
+
+    def _accumulate_grad_from(self, poutput: 'Tensor', idx: int) -> None:
+        ''' Adds the gradient computed from `poutput` (see
+        `_compute_grad_from`) to the gradient of `self`.
+
+        If the computations are not recorded in the computation graph, the
+        gradient is accumulated in-place into the gradient buffer of `self`
+        (see `Function.backward_into`).
+
+        '''
 
-            # Check if `self` is scalar and needs to be averaged
-            if self._value.shape != () and\
-               self._value.shape[-1] == 1:
+        if self._grad.diff:
+            # Record grad computations in the computation graph
+            self._grad += self._compute_grad_from(poutput, idx)
 
-                # Record the mean in the computation graph
-                from nujo.math.aggregate import mean
-                grad = mean(grad, dim=-1, keepdim=True)
+        elif poutput._grad.diff:
+            self._grad._value += self._compute_grad_from(poutput, idx)
+
+        elif _profiling.get_profiler() is None:
+            poutput.creator.backward_into(idx, poutput._grad._value,
+                                          self._grad._value)
 
         else:
-            # Do not leave a trace in the computation graph!
-            # Use numpy arrays! :)
-            grad = poutput.creator.backward(idx, poutput._grad._value)
+            _profiling.get_profiler()._profile(
+                'backward', lambda: poutput.creator.backward_into(
+                    idx, poutput._grad._value, self._grad._value),
+                poutput.creator)
 
-            # Check if `self` is scalar and needs to be averaged
-            if self._value.shape != () and\
-               self._value.shape[-1] == 1:
+    def compute_grad(self, _graph: Optional[Set[int]] = None) -> None:
+        ''' Computes the gradient of `self` from the gradients of the
+        outputs of the functions `self` is input to.
 
-                grad = grad.mean(axis=-1, keepdims=True)
+        Parameters:
+        -----------
+         - _graph : set of ints (optional), ids of the tensors in the
+           computation graph being differentiated; outputs outside of it
+           are ignored. If None, all outputs are used.
 
-        return grad
+        '''
 
-    def compute_grad(self) -> None:
-        if modes.DIFF_ENABLED and self.diff:
+        if self.diff and modes.is_diff_enabled():
 
             # Make sure grad is Tensor (`grad property call`) and init value
             if self._grad is None:
                 self.zero_grad(propagate=False)
 
+            parents_outputs = self.parents_outputs
+            if _graph is not None:
+                parents_outputs = [
+                    poutput for poutput in parents_outputs
+                    if poutput.id in _graph
+                ]
+
             # Top-parent grad
-            if len(self.parents_outputs) == 0:
+            if len(parents_outputs) == 0:
                 self._grad._value += 1
+                self._grad._version += 1
                 return
 
-            for poutput in self.parents_outputs:
-                curr_grad = self._compute_grad_from(poutput)
+            for poutput in parents_outputs:
+                # `self` may be passed to the same function more than once
+                for idx, child in enumerate(poutput.creator.children):
+                    if child is not self:
+                        continue
+
+                    self._accumulate_grad_from(poutput, idx)
 
-                if self._grad.diff:
-                    # Record grad computations in the computation graph
-                    self._grad += curr_grad
-                else:
-                    self._grad._value += curr_grad
+            self._grad._version += 1
 
     def zero_grad(self, propagate=True) -> None:
         self.grad._value.fill(0)
+        self._grad._version += 1
 
         if propagate:
-            for poutput in self.parents_outputs:
-                poutput.zero_grad()
-
-    def backward(self, _debug=False) -> None:
-        ''' It uses Breadth First Search to traverse the computation graph
-        and compute the gradient for each differentiable Tensor in the graph.
+            # Iterative traversal, visiting each output only once
+            visited = {self.id}
+            nodes_to_visit = list(self.parents_outputs)
+
+            while nodes_to_visit:
+                node = nodes_to_visit.pop()
+                if node.id in visited:
+                    continue
+
+                visited.add(node.id)
+                nodes_to_visit.extend(node.parents_outputs)
+
+                # Gradients not allocated yet are zeroed when allocated
+                if node._grad is not None:
+                    node._grad._value.fill(0)
+                    node._grad._version += 1
+
+    def backward(self, retain_graph=False, _debug=False) -> None:
+        ''' Computes the gradient of each differentiable Tensor in the
+        computation graph w.r.t. `self`.
+
+        The graph is sorted topologically once and then traversed in reverse
+        order, so the gradient of every tensor is complete before it is
+        propagated further, and `compute_grad` runs exactly once per tensor.
+        The whole pass is linear in the size of the graph.
+
+        Parameters:
+        -----------
+         - retain_graph : bool, if False (default), the values of the
+           intermediate tensors and the arrays the functions saved for the
+           backward pass are released as soon as the backward pass does not
+           need them anymore (the graph can be reused by running the forward
+           pass again). Set it to True to read the intermediate values after
+           the backward pass, or to differentiate the graph again (e.g. for
+           higher-order derivatives).
+
+        Raises:
+        -------
+         - RuntimeError, if a previous backward pass released the graph
 
         '''
 
-        nodes_to_visit: List['Tensor'] = [self]
-        if _debug:
-            i = 1
+        if self._pending:  # Evaluate the deferred values first
+            self._evaluate()
 
-        while nodes_to_visit:
-            node = nodes_to_visit.pop()
-            node.compute_grad()
+        ordering = _topological_order(self)
+
+        # The constants (non-differentiable) keep their values, their
+        # creators are never differentiated
+        if any(node._released for node in ordering if node.diff):
+            raise RuntimeError(
+                'The graph was released by a previous backward pass. Pass '
+                '`retain_graph=True` to the first `backward` to differentiate '
+                'the graph again, or run the forward pass again.')
+
+        graph = {node.id for node in ordering}
+
+        if not retain_graph:
+            schedule = _release_schedule(ordering)
+
+        for i, node in enumerate(reversed(ordering), 1):
+            node.compute_grad(_graph=graph)
+
+            if not retain_graph:
+                for released in schedule[len(ordering) - i]:
+                    if isinstance(released, Tensor):
+                        released._value = None
+                        released._released = True
+                    else:
+                        released._release_saved_arrays()
 
             if _debug:
                 nstr = f' [{i}]'
                 node.name += nstr if nstr not in node.name else ''
-                i += 1
-
-            if node.creator:
-                for child in node.creator.children:
-                    # Avoid visiting the same node twice
-                    if all(child is not node for node in nodes_to_visit):
-                        nodes_to_visit.insert(0, child)
 
     # Useful methods
 
     def all(self) -> ndarray:
-        return self._value.all()
+        return self.value.all()
 
     def any(self) -> ndarray:
-        return self._value.any()
+        return self.value.any()
 
     def __getitem__(self, position: Union[int, Tuple[int, ...]]):
-        return Tensor(self._value[position],
+        return Tensor(self.value[position],
                       diff=self.diff,
                       creator=self.creator,
                       name=f'{self.name}[{position}]')
@@ -240,7 +447,8 @@ class Tensor(_Node):
                     value: Union['Tensor', ndarray, List[Number], Number]):
 
         # TODO: This is a naive implementation. Fix it.
-        self._value[position] = value
+        self.value[position] = value
+        self._version += 1
 
     def __hash__(self):
         return self.id
@@ -275,7 +483,7 @@ class Tensor(_Node):
             except ValueError:  # self is not in children
                 pass
 
-        self._value = getattr(other, 'value', other)
+        self.value = getattr(other, 'value', other)
 
         # Transfer the gradient
         self._grad = getattr(other, 'grad', None)
@@ -285,22 +493,22 @@ class Tensor(_Node):
     # Comparison operations
 
     def __lt__(self, other):
-        return self._value < getattr(other, 'value', other)
+        return self.value < getattr(other, 'value', other)
 
     def __le__(self, other):
-        return self._value <= getattr(other, 'value', other)
+        return self.value <= getattr(other, 'value', other)
 
     def __eq__(self, other):
-        return self._value == getattr(other, 'value', other)
+        return self.value == getattr(other, 'value', other)
 
     def __ne__(self, other):
-        return self._value != getattr(other, 'value', other)
+        return self.value != getattr(other, 'value', other)
 
     def __gt__(self, other):
-        return self._value > getattr(other, 'value', other)
+        return self.value > getattr(other, 'value', other)
 
     def __ge__(self, other):
-        return self._value >= getattr(other, 'value', other)
+        return self.value >= getattr(other, 'value', other)
 
     # Arithmetic operations
 
@@ -358,4 +566,4 @@ class Tensor(_Node):
 
     def __str__(self):
         # TODO: Come up with a better representation
-        return self.__repr__() + '\n' + '-' * 32 + '\n' + str(self._value)
+        return self.__repr__() + '\n' + '-' * 32 + '\n' + str(self.value)
@@ -6,6 +6,7 @@ from copy import deepcopy
 from itertools import chain
 from typing import List, Union
 
+import nujo._profiling as _profiling
 from nujo.autodiff.tensor import Tensor
 
 
@@ -97,6 +98,10 @@ class Flow(metaclass=_FlowMeta):
 
     def _current_parameters(self) -> Tensor:
         ''' Generator for the current tensor parameters bounded to `self`
+
+        Including those of the flows bounded to the flows in the chain
+        (e.g. the segment wrapped by a `Checkpoint`).
+
         '''
 
         for flow in self._chain:
@@ -105,6 +110,8 @@ class Flow(metaclass=_FlowMeta):
 
                 if isinstance(prop, Tensor):
                     yield prop
+                elif isinstance(prop, Flow):
+                    yield from prop.parameters()
 
     # API methods
 
@@ -172,6 +179,9 @@ class Flow(metaclass=_FlowMeta):
     # methods implementing the flow functionality
 
     def __call__(self, *args, **kwargs) -> Tensor:
+        if _profiling.get_profiler() is not None:
+            return self._profiled_call(*args, **kwargs)
+
         output = self[0].forward(*args, **kwargs)
 
         for flow in self[1:]:
@@ -179,6 +189,23 @@ class Flow(metaclass=_FlowMeta):
 
         return output
 
+    def _profiled_call(self, *args, **kwargs) -> Tensor:
+        ''' `__call__` recording each flow of the chain in the active
+        profiler (see `nujo.utils.Profiler`)
+        '''
+
+        profiler = _profiling.get_profiler()
+
+        output = profiler._profile('flow',
+                                   lambda: self[0].forward(*args, **kwargs),
+                                   name=self[0].name)
+
+        for flow in self[1:]:
+            output = profiler._profile(
+                'flow', lambda: flow.forward(output, **kwargs), name=flow.name)
+
+        return output
+
     def __rshift__(self, other: 'Flow') -> 'Flow':
         ''' Chaining operator
 
@@ -1,6 +1,7 @@
 from numpy import empty as np_empty
 from numpy import full as np_full
 
+from nujo.autodiff.modes import get_default_dtype
 from nujo.autodiff.tensor import Tensor
 
 __all__ = [
@@ -16,20 +17,24 @@ __all__ = [
 
 
 def empty(*shape: int, diff=False, name='Tensor[empty]') -> Tensor:
-    ''' Return a new Tensor of given shape, without initializing entries.
+    ''' Return a new Tensor of given shape and the default dtype,
+    without initializing entries.
     '''
 
-    return Tensor(np_empty(shape), diff=diff, name=name)
+    return Tensor(np_empty(shape, get_default_dtype()), diff=diff, name=name)
 
 
 def full(*shape: int,
          fill_value=0,
          diff=False,
          name='Tensor[full]]') -> Tensor:
-    ''' Return a new Tensor of given shape, filled with `fill_value`.
+    ''' Return a new Tensor of given shape and the default dtype,
+    filled with `fill_value`.
     '''
 
-    return Tensor(np_full(shape, fill_value), diff=diff, name=name)
+    return Tensor(np_full(shape, fill_value, get_default_dtype()),
+                  diff=diff,
+                  name=name)
 
 
 # ====================================================================================================
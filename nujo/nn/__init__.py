@@ -5,4 +5,6 @@ Neural Network utilities are defined here.
 '''
 
 from nujo.nn.activations import *
+from nujo.nn.autotune import *
+from nujo.nn.checkpoint import *
 from nujo.nn.layers import *
@@ -0,0 +1,206 @@
+import json
+import os
+from contextvars import ContextVar
+from threading import RLock, local
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+
+from nujo.autodiff.modes import is_diff_enabled, no_diff
+from nujo.autodiff.tensor import Tensor
+
+__all__ = [
+    'ConvAutotuner',
+    'get_autotuner',
+]
+
+# ====================================================================================================
+
+
+class ConvAutotuner:
+    ''' Picks the fastest algorithm of the convolutions
+
+    The first time a convolution of a given configuration (input shape,
+    kernel shape, stride, dilation, padding and dtype) is computed with
+    `algorithm='tune'` (see `Conv2d`), every candidate algorithm is timed
+    on the actual input and the fastest one is cached and used by all the
+    subsequent calls. When differentiation is enabled (training), the
+    forward and the backward passes are timed together, otherwise
+    (inference, in `no_diff` blocks) only the forward pass: the two modes
+    are tuned separately. The winners can be persisted to a JSON file, so that
+    later processes (on the same machine) start warm:
+
+        >>> conv = nn.Conv2d(16, 32, 5, algorithm='tune')
+        >>> with nn.ConvAutotuner('conv_algorithms.json'):
+        ...     train(conv)
+
+    The blocks can be nested, the convolutions are tuned by the innermost
+    autotuner; outside of them, by a default one (kept in memory only).
+    Only the current thread (context) is affected by a block, but an
+    autotuner can be shared between threads.
+
+    Parameters:
+    -----------
+     - path : str (optional), the JSON file the winners are loaded from (if
+       it exists) and saved to, whenever a new configuration is tuned
+     - repeats : int, the number of timed calls of each candidate (after a
+       warm-up call), the best one is kept
+
+    '''
+    def __init__(self, path: Optional[str] = None, repeats=3):
+        self.path = path
+        self.repeats = repeats
+
+        self._winners: Dict[str, str] = {}
+        self._lock = RLock()
+
+        # The tokens restoring the previous autotuners, a stack per thread
+        # (the blocks of different threads can enter the same autotuner)
+        self._local = local()
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __enter__(self) -> 'ConvAutotuner':
+        self._tokens.append(_AUTOTUNER.set(self))
+        return self
+
+    def __exit__(self, type, value, traceback):
+        _AUTOTUNER.reset(self._tokens.pop())
+
+    def select(self, key: tuple,
+               candidates: Dict[str, Callable[[], Any]]) -> str:
+        ''' Returns the fastest of the `candidates` for the configuration
+        `key`, timing them if it was not tuned yet
+
+        If differentiation is enabled, the outputs of the candidates are
+        differentiated (so the candidates should compute them from their
+        own leaves, not from the graph of the caller); otherwise, the
+        candidates are called in a `no_diff` block. Their results are
+        discarded.
+
+        Parameters:
+        -----------
+         - key : tuple, the configuration of the convolution (its items
+           must have a stable `repr`, e.g. ints, tuples and strings)
+         - candidates : dict, the callables computing the convolution (with
+           no arguments), by algorithm name
+
+        Returns:
+        --------
+         - algorithm : str, the name of the fastest candidate
+
+        '''
+
+        key = repr((*key, 'train' if is_diff_enabled() else 'inference'))
+
+        # The threads tune one configuration at a time (which also keeps
+        # them from slowing down each other's timings)
+        with self._lock:
+            winner = self._winners.get(key)
+
+            if winner is None or winner not in candidates:
+                timings = {
+                    name: self._time(call)
+                    for name, call in candidates.items()
+                }
+
+                winner = self._winners[key] = min(timings, key=timings.get)
+
+                if self.path is not None:
+                    self.save()
+
+        return winner
+
+    def load(self) -> None:
+        ''' Loads the winners saved to `path`, in addition to the ones
+        tuned so far
+        '''
+
+        with open(self.path) as file, self._lock:
+            self._winners.update(json.load(file))
+
+    def save(self) -> None:
+        ''' Saves the winners to `path` (replacing it atomically, so that a
+        concurrent process never reads a partially written file)
+        '''
+
+        with self._lock:
+            winners = dict(self._winners)
+
+        temporary_path = f'{self.path}.{os.getpid()}.{id(self)}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(winners, file, indent=1, sort_keys=True)
+
+        os.replace(temporary_path, self.path)
+
+    def clear(self) -> None:
+        ''' Forgets the winners (but does not modify `path`)
+        '''
+
+        with self._lock:
+            self._winners.clear()
+
+    def __len__(self) -> int:
+        return len(self._winners)
+
+    @property
+    def _tokens(self) -> list:
+        try:
+            return self._local.tokens
+        except AttributeError:
+            tokens = self._local.tokens = []
+            return tokens
+
+    def _time(self, call: Callable[[], Any]) -> float:
+        if is_diff_enabled():
+            return self._time_calls(lambda: _backward(call()))
+
+        with no_diff():
+            # Evaluate the deferred outputs (see `nujo.lazy`)
+            return self._time_calls(lambda: getattr(call(), 'value', None))
+
+    def _time_calls(self, call: Callable[[], Any]) -> float:
+        best = float('inf')
+
+        for i in range(self.repeats + 1):
+            start = perf_counter()
+            call()
+            duration = perf_counter() - start
+
+            if i > 0:  # the first call warms up
+                best = min(best, duration)
+
+        return best
+
+
+def _backward(output: Any) -> None:
+    if isinstance(output, Tensor) and output.diff:
+        output.backward()
+
+
+_AUTOTUNER: 'ContextVar[ConvAutotuner]' = ContextVar(
+    'AUTOTUNER', default=ConvAutotuner())
+''' The active autotuner, used by the convolutions with `algorithm='tune'`
+
+It is a context variable, thus every thread (and asyncio task) has its own
+value: entering an autotuner block in one of them does not affect the
+others. Read it using `get_autotuner()` (or `autotune.AUTOTUNER`).
+
+'''
+
+
+def get_autotuner() -> ConvAutotuner:
+    ''' Returns the active autotuner of the current context
+    '''
+
+    return _AUTOTUNER.get()
+
+
+def __getattr__(name: str):
+    # `autotune.AUTOTUNER` returns the autotuner of the current context
+    if name == 'AUTOTUNER':
+        return _AUTOTUNER.get()
+
+    raise AttributeError(f'module {__name__} has no attribute {name}')
+
+# ====================================================================================================
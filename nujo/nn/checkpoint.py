@@ -0,0 +1,43 @@
+from nujo.autodiff._functions._checkpoint import _Checkpoint
+from nujo.autodiff.tensor import Tensor
+from nujo.flow import Flow
+
+__all__ = [
+    'Checkpoint',
+]
+
+# ====================================================================================================
+
+
+class Checkpoint(Flow):
+    ''' Activation checkpointing of a flow
+
+    Wraps a segment of a computation flow, so that during the forward pass
+    only the inputs of the segment are kept, and its inner activations are
+    recomputed during the backward pass. This reduces the memory used by
+    deep flows (which otherwise grows linearly with their depth and batch
+    size) at the cost of an additional forward pass of the segment.
+
+    Example:
+        >>> net = nn.Checkpoint(nn.Linear(8, 64) >> nn.ReLU()) >> \\
+        ...     nn.Checkpoint(nn.Linear(64, 64) >> nn.ReLU()) >> \\
+        ...     nn.Linear(64, 1)
+
+    Parameters:
+    -----------
+     - flow : Flow, the segment to checkpoint
+     - name : string, identifier for the current layer
+
+    '''
+    def __init__(self, flow: Flow, name='Checkpoint'):
+        super(Checkpoint, self).__init__(name=f'{name}({flow.name})')
+        self.flow = flow
+
+    def forward(self, *inputs: Tensor) -> Tensor:
+        return _Checkpoint(*inputs,
+                           *self.flow.parameters(),
+                           fn=self.flow,
+                           num_inputs=len(inputs))()
+
+
+# ====================================================================================================
@@ -1,6 +1,9 @@
-from functools import lru_cache
-from typing import Tuple, Union
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
+import nujo.nn.autotune as _autotune
+from nujo.autodiff._functions._convolution import _Conv2dFFT
+from nujo.autodiff._functions._pooling import _AvgPool2d, _MaxPool2d
 from nujo.autodiff._functions._transform import _ConstPad, _Im2col
 from nujo.autodiff.tensor import Tensor
 from nujo.flow import Flow
@@ -10,8 +13,16 @@ __all__ = [
     'Linear',
     'Conv2d',
     'ConstPad2d',
+    'MaxPool2d',
+    'AvgPool2d',
 ]
 
+FFT_KERNEL_THRESHOLD = 25
+''' The number of kernel elements (kernel_height * kernel_width) from which
+the `'auto'` algorithm of `Conv2d` computes the convolutions with stride 1
+in the frequency domain
+'''
+
 # ====================================================================================================
 
 
@@ -76,6 +87,20 @@ class Conv2d(Flow):
         Default: 0
      - bias : bool, optional, if True, adds a learnable bias to the output.
         Default: True
+     - algorithm : str, optional, how the convolution is computed:
+        - 'im2col' : as a matrix multiplication of the kernels and the
+          local regions of the input stretched out into columns
+        - 'fft' : in the frequency domain (see `_Conv2dFFT`), whose cost
+          does not grow with the kernel size
+        - 'auto' (default) : 'fft' for the kernels of at least
+          `FFT_KERNEL_THRESHOLD` elements with stride 1, 'im2col' otherwise
+        - 'tune' : the fastest of them for each input shape and dtype,
+          timed on the first call (see `ConvAutotuner`)
+     - layout : str, optional, the layout of the input and the output:
+        'NCHW' (batch, channels, height, width), the default, or 'NHWC'
+        (batch, height, width, channels), with which the im2col output is
+        contiguous and consecutive layers chain without transposes.
+        Default: 'NCHW'
      - name : string, identifier for the current layer
 
     '''
@@ -87,6 +112,8 @@ class Conv2d(Flow):
                  padding: Union[int, Tuple[int, int]] = 0,
                  dilation: Union[int, Tuple[int, int]] = 0,
                  bias=True,
+                 algorithm='auto',
+                 layout='NCHW',
                  name='Conv2d'):
 
         super(Conv2d,
@@ -106,6 +133,17 @@ class Conv2d(Flow):
 
         self.bias = bias
 
+        if algorithm not in ('im2col', 'fft', 'auto', 'tune'):
+            raise ValueError(f'Unknown convolution algorithm: {algorithm}')
+
+        if algorithm == 'auto':
+            algorithm = 'fft' if self.stride == (1, 1) and \
+                self.kernel_size[0] * self.kernel_size[1] >= \
+                FFT_KERNEL_THRESHOLD else 'im2col'
+
+        self.algorithm = algorithm
+        self.layout = _check_layout(layout)
+
         # Define trainable parameters
 
         self.kernels = randn(self.out_channels,
@@ -118,29 +156,107 @@ class Conv2d(Flow):
 
         self._padding_layer = ConstPad2d(self.padding,
                                          value=0,
+                                         layout=self.layout,
                                          name=self.name + '.padding')
 
     def forward(self, x: Tensor) -> Tensor:
-        batch_size, channels, height, width = x.shape
+        channels = x.shape[3 if self.layout == 'NHWC' else 1]
         assert channels == self.in_channels
 
+        algorithm = self.algorithm
+        if algorithm == 'tune':
+            algorithm = _autotune.get_autotuner().select(
+                (x.shape, self.kernels.shape, self.stride, self.dilation,
+                 self.padding, x.value.dtype.name, self.layout),
+                self._candidates(x))
+
+        return self._convolve(x, algorithm, self.kernels,
+                              self.b if self.bias else None)
+
+    def _candidates(self, x: Tensor) -> Dict[str, Callable[[], Tensor]]:
+        ''' The convolutions timed by the autotuner, by algorithm name
+
+        They are computed from copies of `x` and of the parameters (made
+        by the first call), so that their backward passes neither reach
+        the computation graph of `x` nor accumulate into the gradients of
+        the parameters.
+
+        '''
+
+        copies: List[Optional[Tensor]] = []
+
+        def convolve(algorithm: str) -> Tensor:
+            if not copies:
+                copies.extend([
+                    Tensor(x.value, diff=x.diff),
+                    Tensor(self.kernels.value, diff=True),
+                    Tensor(self.b.value, diff=True) if self.bias else None,
+                ])
+
+            return self._convolve(copies[0], algorithm, *copies[1:])
+
+        return {name: partial(convolve, name) for name in ('im2col', 'fft')}
+
+    def _convolve(self, x: Tensor, algorithm: str, kernels: Tensor,
+                  bias: Optional[Tensor]) -> Tensor:
+        if self.layout == 'NHWC':
+            batch_size, height, width, _ = x.shape
+        else:
+            batch_size, _, height, width = x.shape
+
         # Apply padding
         x_padded = self._padding_layer(x)
 
+        if algorithm == 'fft':
+            if self.layout == 'NHWC':
+                # The transforms are computed on channels first images
+                x_padded = x_padded.transpose(0, 3, 1, 2)
+
+            output = _Conv2dFFT(x_padded, kernels, self.stride,
+                                self.dilation)()
+
+            if bias is not None:
+                output += bias.reshape(1, self.out_channels, 1, 1)
+
+            if self.layout == 'NHWC':
+                return output.transpose(0, 2, 3, 1)
+
+            return output
+
+        _, out_height, out_width = self.get_output_shape(height, width)
+
+        if self.layout == 'NHWC':
+            # Image to row transformation, the features of the rows are
+            # ordered as (kernel_height, kernel_width, channels)
+            x_row = _Im2col(x_padded,
+                            self.kernel_size,
+                            self.stride,
+                            self.dilation,
+                            layout='NHWC')()
+            kernels_row = kernels.transpose(0, 2, 3, 1)\
+                .reshape(self.out_channels, -1)
+
+            # Apply the kernels, the output is contiguous channels last
+            out_row = x_row @ kernels_row.transpose(1, 0)
+            if bias is not None:
+                out_row += bias.reshape(1, self.out_channels)
+
+            return out_row.reshape(batch_size, out_height, out_width,
+                                   self.out_channels)
+
         # Image to column transformation
         x_col = _Im2col(x_padded, self.kernel_size, self.stride,
                         self.dilation)()
-        kernels_col = self.kernels.reshape(self.out_channels, -1)
+        kernels_col = kernels.reshape(self.out_channels, -1)
 
         # Apply the kernels
         out_col = kernels_col @ x_col
-        if self.bias:
-            out_col += self.b
+        if bias is not None:
+            out_col += bias
 
         # Reshape
-        output_shape = self.get_output_shape(height, width)
-        return out_col.reshape(*output_shape, batch_size)\
-            .transpose(3, 0, 1, 2)
+        return out_col.reshape(self.out_channels, out_height, out_width,
+                               batch_size).transpose(3, 0, 1, 2)
 
     @lru_cache(maxsize=64)
     def get_output_shape(self, height: int,
@@ -174,12 +290,14 @@ class ConstPad2d(Flow):
      - padding : int or tuple of two ints, specifying the padding
      before and after.
      - value : float, the value by which to pad
+     - layout : str, 'NCHW' (default) or 'NHWC', the layout of the input
      - name : string, identifier for the current layer
 
     '''
     def __init__(self,
                  padding: Union[int, Tuple[int, int]],
                  value: float = 0,
+                 layout='NCHW',
                  name='ConstPad2d'):
 
         super(ConstPad2d, self).__init__(name=f'{name}({padding})')
@@ -187,15 +305,169 @@ class ConstPad2d(Flow):
         self.padding = padding if isinstance(padding, tuple) else (padding,
                                                                    padding)
         self.value = value
+        self.layout = _check_layout(layout)
 
     def forward(self, x: Tensor) -> Tensor:
-        return _ConstPad(x, (
-            (0, 0),
-            (0, 0),
+        spatial_padding = (
             (self.padding[0], self.padding[0]),
             (self.padding[1], self.padding[1]),
-        ),
-                         value=self.value)()
+        )
+
+        if self.layout == 'NHWC':
+            padding = ((0, 0), *spatial_padding, (0, 0))
+        else:
+            padding = ((0, 0), (0, 0), *spatial_padding)
+
+        return _ConstPad(x, padding, value=self.value)()
+
+
+# ====================================================================================================
+
+
+class _Pool2d(Flow):
+    ''' Base class of the 2-dimensional pooling layers
+
+    Parameters:
+    -----------
+     - kernel_size : int or tuple, size of the pooling windows
+     - stride : int or tuple, optional, stride of the windows.
+        Default: kernel_size
+     - padding : int or tuple, optional, padding added to both sides of
+        the input. Default: 0
+     - dilation : int or tuple, optional - spacing between window elements.
+        Default: 0
+     - layout : str, optional, 'NCHW' (default) or 'NHWC', the layout of
+        the input and the output (see `Conv2d`)
+     - name : string, identifier for the current layer
+
+    '''
+
+    _function = None
+    ''' The pooling function '''
+
+    _padding_value = 0.
+    ''' The value by which the input is padded '''
+
+    def __init__(self,
+                 kernel_size: Union[int, Tuple[int, int]],
+                 stride: Union[int, Tuple[int, int], None] = None,
+                 padding: Union[int, Tuple[int, int]] = 0,
+                 dilation: Union[int, Tuple[int, int]] = 0,
+                 layout='NCHW',
+                 name='Pool2d'):
+
+        super(_Pool2d, self).__init__(name=f'{name}({kernel_size})')
+
+        self.kernel_size = kernel_size if isinstance(
+            kernel_size, tuple) else (kernel_size, kernel_size)
+
+        if stride is None:
+            stride = self.kernel_size
+
+        self.stride = stride if isinstance(stride, tuple) else (stride, stride)
+        self.padding = padding if isinstance(padding, tuple) else (padding,
+                                                                   padding)
+
+        self.dilation = dilation if isinstance(dilation, tuple) else (dilation,
+                                                                      dilation)
+
+        self.layout = _check_layout(layout)
+
+        self._padding_layer = ConstPad2d(self.padding,
+                                         value=self._padding_value,
+                                         layout=self.layout,
+                                         name=self.name + '.padding')
+
+    def forward(self, x: Tensor) -> Tensor:
+        x_padded = self._padding_layer(x) if any(self.padding) else x
+
+        return self._function(x_padded,
+                              self.kernel_size,
+                              self.stride,
+                              self.dilation,
+                              layout=self.layout)()
+
+
+class MaxPool2d(_Pool2d):
+    ''' A 2-dimensional max pooling layer
+
+    Takes the maximum of each window of the input, for every channel.
+    The input is padded with -inf.
+
+    Parameters:
+    -----------
+     - kernel_size : int or tuple, size of the pooling windows
+     - stride : int or tuple, optional, stride of the windows.
+        Default: kernel_size
+     - padding : int or tuple, optional, padding added to both sides of
+        the input. Default: 0
+     - dilation : int or tuple, optional - spacing between window elements.
+        Default: 0
+     - layout : str, optional, 'NCHW' (default) or 'NHWC', the layout of
+        the input and the output (see `Conv2d`)
+     - name : string, identifier for the current layer
+
+    '''
+
+    _function = _MaxPool2d
+    _padding_value = -float('inf')
+
+    def __init__(self,
+                 kernel_size: Union[int, Tuple[int, int]],
+                 stride: Union[int, Tuple[int, int], None] = None,
+                 padding: Union[int, Tuple[int, int]] = 0,
+                 dilation: Union[int, Tuple[int, int]] = 0,
+                 layout='NCHW',
+                 name='MaxPool2d'):
+
+        super(MaxPool2d, self).__init__(kernel_size, stride, padding,
+                                        dilation, layout, name)
+
+
+class AvgPool2d(_Pool2d):
+    ''' A 2-dimensional average pooling layer
+
+    Takes the mean of each window of the input, for every channel.
+    The input is padded with zeros, which are counted in the means.
+
+    Parameters:
+    -----------
+     - kernel_size : int or tuple, size of the pooling windows
+     - stride : int or tuple, optional, stride of the windows.
+        Default: kernel_size
+     - padding : int or tuple, optional, zero-padding added to both sides
+        of the input. Default: 0
+     - dilation : int or tuple, optional - spacing between window elements.
+        Default: 0
+     - layout : str, optional, 'NCHW' (default) or 'NHWC', the layout of
+        the input and the output (see `Conv2d`)
+     - name : string, identifier for the current layer
+
+    '''
+
+    _function = _AvgPool2d
+
+    def __init__(self,
+                 kernel_size: Union[int, Tuple[int, int]],
+                 stride: Union[int, Tuple[int, int], None] = None,
+                 padding: Union[int, Tuple[int, int]] = 0,
+                 dilation: Union[int, Tuple[int, int]] = 0,
+                 layout='NCHW',
+                 name='AvgPool2d'):
+
+        super(AvgPool2d, self).__init__(kernel_size, stride, padding,
+                                        dilation, layout, name)
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _check_layout(layout: str) -> str:
+    if layout not in ('NCHW', 'NHWC'):
+        raise ValueError(f'Unknown layout: {layout}')
+
+    return layout
 
 
 # ====================================================================================================
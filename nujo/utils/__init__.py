@@ -1,7 +1,9 @@
 ''' nujo utils '''
 
 from nujo.utils.computation_graph_plotter import ComputationGraphPlotter
+from nujo.utils.profiler import Profiler
 
 __all__ = [
     'ComputationGraphPlotter',
+    'Profiler',
 ]
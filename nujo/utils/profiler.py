@@ -0,0 +1,207 @@
+import json
+import os
+from collections import namedtuple
+from threading import get_ident
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from numpy import ndarray
+
+import nujo._profiling as _profiling
+
+__all__ = [
+    'Event',
+    'OpStats',
+    'Profiler',
+]
+
+Event = namedtuple('Event', [
+    'name', 'category', 'start', 'duration', 'shape', 'nbytes', 'thread'
+])
+''' A call recorded by the profiler
+
+ - name : str, the name of the function (e.g. 'MatrixMul') or the flow
+ - category : str, 'forward', 'backward' or 'flow'
+ - start : float, seconds since the profiler was started
+ - duration : float, wall time of the call, in seconds
+ - shape : tuple of ints (optional), shape of the output of the call
+ - nbytes : int, bytes allocated by the call: its output array and the
+   scratch buffers it created (see `Function._buffer`)
+ - thread : int, identifier of the calling thread
+
+'''
+
+OpStats = namedtuple('OpStats',
+                     ['name', 'category', 'calls', 'total', 'mean', 'nbytes'])
+''' Aggregated statistics of the calls of an op (see `Profiler.summary`),
+the times are in seconds
+'''
+
+# ====================================================================================================
+
+
+class Profiler:
+    ''' Per-op profiler
+
+    Records the wall time, output shape and allocated bytes of every
+    forward and backward call of the functions and of every flow called
+    within the block. The recorded calls can be exported as a Chrome trace
+    (open it in chrome://tracing or https://ui.perfetto.dev) or aggregated
+    per op.
+
+        >>> with Profiler() as profiler:
+        ...     loss = loss_fn(net(x), y)
+        ...     loss.backward()
+        >>> print(profiler.table())
+        >>> profiler.export_chrome_trace('trace.json')
+
+    The profiling hooks are only enabled within the block; outside of it
+    they cost a single check per call. The blocks can be nested, the calls
+    are recorded by the innermost profiler. Only the current thread
+    (context) is profiled: the calls of the other threads are not
+    recorded, unless they run in a copy of the context of the block (see
+    `contextvars.copy_context`).
+
+    '''
+    def __init__(self):
+        self.events: List[Event] = []
+
+        self._start: Optional[float] = None
+        self._tokens: List[Any] = []
+
+    def __enter__(self) -> 'Profiler':
+        if self._start is None:
+            self._start = perf_counter()
+
+        self._tokens.append(_profiling._PROFILER.set(self))
+
+        return self
+
+    def __exit__(self, type, value, traceback):
+        _profiling._PROFILER.reset(self._tokens.pop())
+
+    def _profile(self,
+                 category: str,
+                 call: Callable[[], Any],
+                 function: Any = None,
+                 name: Optional[str] = None) -> Any:
+        ''' Calls `call` and records it
+
+        Parameters:
+        -----------
+         - category : str, the category of the call
+         - call : callable, without arguments
+         - function : Function (optional), the function called; the growth
+           of its scratch buffers is counted as allocated bytes
+         - name : str (optional), the name of the call, defaults to the
+           type of `function` (e.g. 'MatrixMul')
+
+        Returns:
+        --------
+         - result : the result of `call`
+
+        '''
+
+        if name is None:
+            name = type(function).__name__.lstrip('_')
+
+        buffer_bytes = _buffer_bytes(function)
+
+        start = perf_counter()
+        result = call()
+        duration = perf_counter() - start
+
+        # The deferred outputs (see `nujo.lazy`) are not evaluated here
+        output = None if getattr(result, '_pending', False) else \
+            getattr(result, 'value', result)
+
+        if isinstance(output, ndarray):
+            shape, nbytes = output.shape, output.nbytes
+        else:
+            shape, nbytes = None, 0
+
+        nbytes += _buffer_bytes(function) - buffer_bytes
+
+        self.events.append(
+            Event(name, category, start - self._start, duration, shape,
+                  nbytes, get_ident()))
+
+        return result
+
+    def summary(self) -> List[OpStats]:
+        ''' Returns the statistics of each op (per category), sorted by
+        total time in decreasing order
+        '''
+
+        stats: Dict[tuple, List[float]] = {}
+        for event in self.events:
+            op = stats.setdefault((event.name, event.category), [0, 0., 0])
+
+            op[0] += 1
+            op[1] += event.duration
+            op[2] += event.nbytes
+
+        return sorted((OpStats(name, category, calls, total, total / calls,
+                               nbytes)
+                       for (name, category), (calls, total, nbytes)
+                       in stats.items()),
+                      key=lambda op: op.total,
+                      reverse=True)
+
+    def table(self, limit: Optional[int] = None) -> str:
+        ''' Returns the statistics of the ops (see `summary`) as a table
+
+        Parameters:
+        -----------
+         - limit : int (optional), the number of ops to list
+
+        '''
+
+        header = (f'{"Name":<24} {"Category":<9} {"Calls":>7} '
+                  f'{"Total (ms)":>11} {"Mean (us)":>10} {"Alloc (MiB)":>12}')
+
+        rows = [header, '-' * len(header)]
+        for op in self.summary()[:limit]:
+            rows.append(f'{op.name[:24]:<24} {op.category:<9} '
+                        f'{op.calls:>7} {op.total * 1e3:>11.3f} '
+                        f'{op.mean * 1e6:>10.1f} {op.nbytes / 2**20:>12.2f}')
+
+        return '\n'.join(rows)
+
+    def export_chrome_trace(self, path: str) -> None:
+        ''' Writes the recorded calls to `path` in the Chrome trace
+        event format (JSON)
+        '''
+
+        pid = os.getpid()
+        trace_events = [{
+            'name': event.name,
+            'cat': event.category,
+            'ph': 'X',  # complete event, with a duration
+            'ts': event.start * 1e6,
+            'dur': event.duration * 1e6,
+            'pid': pid,
+            'tid': event.thread,
+            'args': {
+                'shape': list(event.shape) if event.shape is not None else
+                None,
+                'bytes': event.nbytes,
+            },
+        } for event in self.events]
+
+        with open(path, 'w') as file:
+            json.dump({
+                'traceEvents': trace_events,
+                'displayTimeUnit': 'ms'
+            }, file)
+
+
+# ====================================================================================================
+
+
+def _buffer_bytes(function: Any) -> int:
+    buffers = getattr(function, '_buffers', None)
+    return sum(buffer.nbytes for buffer in buffers.values()) if buffers else 0
+
+
+# ====================================================================================================
@@ -87,6 +87,41 @@ def test_aggregate_by_dim(matrix_tensors):
     assert allclose(W1_nj.grad.value, W1_torch.grad.detach().numpy())
 
 
+def test_broadcast_diff():
+    X = random.rand(3, 8)
+    W = random.rand(4, 3)
+    b = random.rand(4, 1)
+    s = random.rand(8)
+
+    X_nj = nj.Tensor(X)
+    W_nj = nj.Tensor(W, diff=True)
+    b_nj = nj.Tensor(b, diff=True)
+    s_nj = nj.Tensor(s, diff=True)
+
+    X_torch = torch.tensor(X)
+    W_torch = torch.tensor(W, requires_grad=True)
+    b_torch = torch.tensor(b, requires_grad=True)
+    s_torch = torch.tensor(s, requires_grad=True)
+
+    # Test Forward
+    # The bias is broadcast over the columns, the scale over the rows
+    loss_nj = nj.mean(((W_nj @ X_nj + b_nj) * s_nj)**2)
+    loss_torch = torch.mean(((W_torch @ X_torch + b_torch) * s_torch)**2)
+
+    assert allclose(loss_nj.value, loss_torch.detach().numpy())
+
+    # Test Backward
+    loss_nj.backward()
+    loss_torch.backward()
+
+    assert b_nj.grad.shape == b_nj.shape
+    assert s_nj.grad.shape == s_nj.shape
+
+    assert allclose(W_nj.grad.value, W_torch.grad.detach().numpy())
+    assert allclose(b_nj.grad.value, b_torch.grad.detach().numpy())
+    assert allclose(s_nj.grad.value, s_torch.grad.detach().numpy())
+
+
 # ====================================================================================================
 # Unit Test fixtures - generate the same nujo and PyTorch tensors
 
@@ -0,0 +1,125 @@
+import gc
+
+import pytest
+from numpy import random
+
+import nujo as nj
+import nujo.nn as nn
+from nujo import Tensor
+from nujo.autodiff import census
+
+# ====================================================================================================
+# Test census counts
+
+
+def test_census_counts():
+    before = census()
+
+    A = Tensor(random.rand(256, 256), diff=True, name='A')
+    B = nn.Sigmoid()(A @ A)
+
+    after = census()
+    diff = after.diff(before)
+
+    assert diff.functions == {'MatrixMul': 1, 'Sigmoid': 1}
+    assert diff.tensors == {'leaf': 1, 'MatrixMul': 1, 'Sigmoid': 1}
+    assert diff.nbytes >= 3 * A.value.nbytes
+
+    # The output of the sigmoid is held by the tensor and saved by the
+    # function, it is counted once
+    assert B.creator._output is B.value
+    assert diff.nbytes < 4 * A.value.nbytes
+
+    holders = {holder.name: holder for holder in after.largest(10)}
+    assert holders['<A>'].nbytes == A.value.nbytes
+    assert holders[repr(B.creator)].type == 'Sigmoid'
+
+
+def test_census_lazy_names():
+    A = Tensor(random.rand(64, 64), diff=True, name='A')
+    B = nn.Sigmoid()(A)
+
+    snapshot = census()
+
+    # The names of the holders are only generated when read
+    assert B._name is None and B.creator._name is None
+
+    holders = {holder.id: holder for holder in snapshot.holders}
+    assert holders[B.id].name == repr(B)
+    assert isinstance(B._name, str)
+
+    # The collected nodes are named after their type and id
+    creator_id = B.creator.id
+    del B
+    gc.collect()
+
+    assert holders[creator_id].name == f'<Sigmoid#{creator_id}>'
+
+
+def test_census_training_loop():
+    net = nn.Linear(4, 8) >> nn.Sigmoid() >> nn.Linear(8, 1)
+    x, y = Tensor(random.rand(4, 16)), Tensor(random.rand(1, 16))
+
+    def step():
+        loss = nj.mean((net(x) - y)**2)
+        for param in net.parameters():
+            param.zero_grad()
+
+        loss.backward()
+
+    step()
+    before = census()
+
+    for _ in range(5):
+        step()
+
+    diff = census().diff(before)
+    assert not diff, diff
+
+
+def test_census_detects_growth():
+    net = nn.Linear(4, 8) >> nn.Sigmoid()
+
+    outputs = [net(Tensor(random.rand(4, 16)))]
+    before = census()
+
+    # Graphs kept alive by a reference
+    for _ in range(3):
+        outputs.append(net(Tensor(random.rand(4, 16))))
+
+    diff = census().diff(before)
+
+    assert diff
+    assert diff.functions['Sigmoid'] == 3
+    assert diff.tensors['leaf'] == 3
+    assert diff.nbytes > 0
+
+
+# ====================================================================================================
+# Test parents outputs pruning
+
+
+@pytest.mark.parametrize('diff', [True, False])
+def test_parents_outputs_pruned(diff):
+    A = Tensor(random.rand(3, 3), diff=diff)
+
+    # Graphs never differentiated
+    for i in range(10):
+        A * Tensor(i)
+        gc.collect()
+
+    assert len(A._parents_outputs) == 1
+
+    B, C = A * 3, A + 1
+    assert [output.id for output in A.parents_outputs] == [B.id, C.id]
+
+    # All the outputs collected and pruned
+    del B, C
+    gc.collect()
+    assert A.parents_outputs == []
+
+    D = A * 2
+    assert [output.id for output in A.parents_outputs] == [D.id]
+
+
+# ====================================================================================================
@@ -0,0 +1,257 @@
+import gc
+
+import pytest
+from numpy import allclose, array, float16, float32, ones, random
+
+import nujo as nj
+import nujo.autodiff._functions._activations as activations
+import nujo.autodiff._functions._aggregate as aggregate
+import nujo.autodiff._functions._convolution as convolution
+import nujo.autodiff._functions._elementary as elementary
+import nujo.autodiff._functions._pooling as pooling
+import nujo.autodiff._functions._transform as transform
+import nujo.autodiff._functions._trigonometric as trigonometric
+from nujo import Function, Tensor, default_dtype
+from nujo.autodiff._functions._activations import _Softmax
+from nujo.autodiff._functions._elementary import _Addition
+
+# ====================================================================================================
+# Test Function lookup cache
+
+
+def test_cache_reuse(tensors):
+    A, B = tensors
+
+    add = _Addition(A, B)
+    assert _Addition(A, B) is add
+    assert _Addition(B, A) is not add
+
+    info = Function.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+
+
+def test_cache_kwargs(tensors):
+    A, _ = tensors
+    assert _Softmax(A, dim=0) is not _Softmax(A, dim=1)
+    assert _Softmax(A, dim=1) is _Softmax(A, dim=1)
+
+
+def test_cache_unhashable_inputs(tensors):
+    A, _ = tensors
+    assert _Addition(A, array([1, 2])) is not _Addition(A, array([1, 2]))
+    assert Function.cache_info().currsize == 0
+
+
+def test_cache_drops_collected_functions():
+    A = Tensor([1, 2], diff=True)
+    B = Tensor([3, 4], diff=True)
+    C = A + B
+
+    assert Function.cache_info().currsize == 1
+    assert len(A.parents_outputs) == 1
+
+    del C
+    gc.collect()
+
+    assert Function.cache_info().currsize == 0
+    assert len(A.parents_outputs) == 0
+
+
+def test_cache_lru_eviction(tensors):
+    A, B = tensors
+    Function.set_cache_maxsize(2)
+
+    add_ab = _Addition(A, B)
+    add_ba = _Addition(B, A)
+    _Addition(A, B)  # `add_ab` becomes the most recently used
+    _Addition(A, A)  # evicts `add_ba`
+
+    info = Function.cache_info()
+    assert info.evictions == 1
+    assert info.currsize == 2
+
+    assert _Addition(A, B) is add_ab
+    assert _Addition(B, A) is not add_ba
+
+
+# ====================================================================================================
+# Test in-place gradient accumulation
+
+_FUNCTIONS = [
+    (elementary._Addition, [(3, 4), (4, )], {}),
+    (elementary._Negation, [(3, 4)], {}),
+    (elementary._Multiplication, [(3, 4), (3, 1)], {}),
+    (elementary._Reciprocal, [(3, 4)], {}),
+    (elementary._Power, [(3, 4), (1, 4)], {}),
+    (elementary._Logarithm, [(3, 4), (3, 4)], {}),
+    (elementary._MatrixMul, [(3, 4), (4, 2)], {}),
+    (activations._Sigmoid, [(3, 4)], {}),
+    (activations._TanH, [(3, 4)], {}),
+    (activations._ReLU, [(3, 4)], {}),
+    (activations._LeakyReLU, [(3, 4)], {}),
+    (activations._Softmax, [(3, 4)], {}),
+    (aggregate._InnerSum, [(3, 4)], {'dim': 1}),
+    (transform._Reshape, [(3, 4)], {'shape': (2, 6)}),
+    (transform._Transpose, [(3, 4)], {'dims': (1, 0)}),
+    (transform._ConstPad, [(3, 4)], {'padding': ((1, 0), (2, 1))}),
+    (transform._Crop, [(5, 7)], {'padding': ((1, 0), (2, 1))}),
+    (pooling._MaxPool2d, [(2, 3, 7, 6)], {
+        'kernel_size': (3, 2),
+        'stride': (2, 1),
+        'dilation': (0, 1)
+    }),
+    (pooling._AvgPool2d, [(2, 3, 7, 6)], {
+        'kernel_size': (3, 2),
+        'stride': (2, 1),
+        'dilation': (0, 1)
+    }),
+    (pooling._MaxPool2d, [(2, 7, 6, 3)], {
+        'kernel_size': (3, 2),
+        'stride': (1, 2),
+        'dilation': (1, 0),
+        'layout': 'NHWC'
+    }),
+    (transform._Col2im, [(18, 12)], {
+        'image_shape': (2, 3, 5, 6),
+        'kernel_size': (2, 3),
+        'stride': (1, 2),
+        'dilation': (1, 0)
+    }),
+    (transform._Col2im, [(12, 18)], {
+        'image_shape': (2, 5, 6, 3),
+        'kernel_size': (2, 3),
+        'stride': (1, 2),
+        'dilation': (1, 0),
+        'layout': 'NHWC'
+    }),
+    (trigonometric._Sin, [(3, 4)], {}),
+    (trigonometric._Cos, [(3, 4)], {}),
+    (trigonometric._Tan, [(3, 4)], {}),
+]
+
+
+@pytest.mark.parametrize('func_type, input_shapes, kwargs', _FUNCTIONS)
+def test_backward_into(func_type, input_shapes, kwargs):
+    func = func_type(*_random_inputs(func_type, input_shapes), **kwargs)
+    accum_grad = random.randn(*func().shape)
+
+    for idx, child in enumerate(func.children):
+        out = random.randn(*child.shape)
+        expected = out + func.backward(idx, accum_grad)
+
+        # Twice, the second time reusing the scratch buffers
+        for _ in range(2):
+            result = out.copy()
+            func.backward_into(idx, accum_grad, result)
+
+            assert allclose(result, expected)
+
+
+# ====================================================================================================
+# Test tangent rules (forward mode) against the backward pass (reverse mode)
+
+_TANGENT_FUNCTIONS = _FUNCTIONS + [
+    (activations._BinaryStep, [(3, 4)], {}),
+    (activations._Softmax, [(3, 4)], {'dim': 1}),
+    (aggregate._InnerSum, [(3, 4)], {}),
+    (aggregate._InnerProd, [(3, 4)], {'dim': 1, 'keepdim': True}),
+    (transform._Im2col, [(2, 3, 5, 6)], {
+        'kernel_size': (2, 3),
+        'stride': (1, 2),
+        'dilation': (1, 0)
+    }),
+    (transform._Im2col, [(2, 5, 6, 3)], {
+        'kernel_size': (2, 3),
+        'stride': (1, 2),
+        'dilation': (1, 0),
+        'layout': 'NHWC'
+    }),
+    (convolution._Conv2dFFT, [(2, 3, 7, 6), (4, 3, 3, 2)], {
+        'stride': (2, 1),
+        'dilation': (0, 1)
+    }),
+]
+
+
+@pytest.mark.parametrize('func_type, input_shapes, kwargs',
+                         _TANGENT_FUNCTIONS)
+def test_tangent(func_type, input_shapes, kwargs):
+    func = func_type(*_random_inputs(func_type, input_shapes), **kwargs)
+    output = func()
+
+    tangents = [random.randn(*child.shape) for child in func.children]
+    cotangent = random.randn(*output.shape)
+
+    # The partials w.r.t. the second input are not implemented backward
+    if func_type in (elementary._Power, elementary._Logarithm):
+        tangents[1] = None
+
+    tangent = func.tangent(tangents) * ones(output.shape)
+    assert tangent.shape == output.shape
+
+    # <u, J v> = <J^T u, v>
+    expected = 0
+    for idx, child_tangent in enumerate(tangents):
+        if child_tangent is not None:
+            expected += (func.backward(idx, cotangent) * child_tangent).sum()
+
+    assert allclose((cotangent * tangent).sum(), expected)
+
+
+# ====================================================================================================
+# Test dtype preservation
+
+
+@pytest.mark.parametrize('func_type, input_shapes, kwargs', _FUNCTIONS)
+@pytest.mark.parametrize('dtype', [float16, float32])
+def test_dtype_preservation(func_type, input_shapes, kwargs, dtype):
+    with default_dtype(dtype):
+        inputs = _random_inputs(func_type, input_shapes)
+        for input in inputs:
+            input.diff = True
+
+        output = func_type(*inputs, **kwargs)()
+        assert output.value.dtype == dtype
+
+        nj.sum(output).backward()
+
+        for input in inputs:
+            assert input.value.dtype == dtype
+            assert input.grad.value.dtype == dtype
+
+
+# ====================================================================================================
+# Helper functions
+
+
+def _random_inputs(func_type, input_shapes):
+    # Centered inputs for ReLU, positive for Logarithm
+    inputs = [Tensor(random.rand(*shape) + 0.5) for shape in input_shapes]
+    if func_type in (activations._ReLU, activations._LeakyReLU):
+        inputs[0].value -= 1
+
+    return inputs
+
+
+# ====================================================================================================
+# Unit Test fixtures
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    Function.cache_clear()
+    yield
+    Function.set_cache_maxsize(None)
+    Function.cache_clear()
+
+
+@pytest.fixture
+def tensors():
+    A = Tensor([[1, 2], [3, 4]], diff=True)
+    B = Tensor([[5, 6], [7, 8]], diff=True)
+
+    return A, B
+
+
+# ====================================================================================================
@@ -0,0 +1,358 @@
+from functools import partial
+
+import pytest
+import torch
+import torch.autograd.functional as torch_functional
+from numpy import allclose, eye, random, stack, zeros
+
+import nujo as nj
+import nujo.nn as nn
+from nujo import Function
+from nujo.autodiff import hvp, jvp, vjp
+from nujo.autodiff._functions._trigonometric import _Sin
+
+# ====================================================================================================
+# Test vector-Jacobian and Jacobian-vector products
+
+
+def test_vjp(weights, inputs):
+    W_nj, W_torch = weights
+    vectors = random.randn(4, 3, 2)
+
+    output, vjps = vjp(lambda x: nn.TanH()(W_nj @ x),
+                       inputs,
+                       vectors,
+                       batched=True)
+
+    expected = stack([
+        torch_functional.vjp(lambda x: torch.tanh(W_torch @ x),
+                             torch.tensor(inputs),
+                             torch.tensor(vector))[1].numpy()
+        for vector in vectors
+    ])
+
+    assert output.shape == (3, 2)
+    assert vjps.shape == (4, 4, 2)
+    assert allclose(vjps, expected)
+
+
+def test_jvp(weights, inputs):
+    W_nj, W_torch = weights
+    vectors = random.randn(4, 4, 2)
+
+    _, jvps = jvp(lambda x: nn.Sigmoid()(W_nj @ x) * (W_nj @ x),
+                  inputs,
+                  vectors,
+                  batched=True)
+
+    expected = stack([
+        torch_functional.jvp(lambda x: torch.sigmoid(W_torch @ x) *
+                             (W_torch @ x),
+                             torch.tensor(inputs),
+                             torch.tensor(vector))[1].numpy()
+        for vector in vectors
+    ])
+
+    assert jvps.shape == (4, 3, 2)
+    assert allclose(jvps, expected)
+
+
+def test_jvp_matches_reverse_mode(weights, inputs):
+    W_nj, _ = weights
+
+    def f(x):
+        hidden = _Sin(W_nj @ x)() * nn.TanH()(W_nj @ x) + (W_nj @ x)**2
+        return nj.log(nn.Softmax(dim=1)(hidden.T) + 1)
+
+    # The Jacobian, one column per forward pass (basis tangent) and
+    # one row per backward pass (basis cotangent)
+    basis_in = eye(inputs.size).reshape(-1, *inputs.shape)
+    output, forward_jacobian = jvp(f, inputs, basis_in, batched=True)
+
+    basis_out = eye(output.value.size).reshape(-1, *output.shape)
+    _, reverse_jacobian = vjp(f, inputs, basis_out, batched=True)
+
+    assert allclose(
+        forward_jacobian.reshape(inputs.size, -1),
+        reverse_jacobian.reshape(-1, inputs.size).T)
+
+
+def test_jvp_multiple_primals(weights, inputs):
+    W_nj, W_torch = weights
+    W = W_torch.numpy()
+    tangents = [random.randn(3, 4), random.randn(4, 2)]
+
+    output, single = jvp(lambda W, x: nj.prod(W @ x, dim=0), [W, inputs],
+                         tangents)
+
+    _, expected = torch_functional.jvp(
+        lambda W, x: torch.prod(W @ x, dim=0),
+        (torch.tensor(W), torch.tensor(inputs)),
+        tuple(torch.tensor(tangent) for tangent in tangents))
+
+    assert allclose(single, expected.numpy())
+
+    # A zero tangent for the weights gives the products along the inputs
+    _, along_x = jvp(lambda W, x: nj.prod(W @ x, dim=0), [W, inputs],
+                     [zeros((3, 4)), tangents[1]])
+    _, along_x_only = jvp(lambda x: nj.prod(W_nj @ x, dim=0), inputs,
+                          tangents[1])
+
+    assert allclose(along_x, along_x_only)
+
+
+def test_jvp_invalid(weights, inputs):
+    W_nj, _ = weights
+
+    with pytest.raises(ValueError):
+        jvp(lambda x: W_nj @ x, inputs, random.randn(2, 4))
+
+    with pytest.raises(ValueError):
+        jvp(lambda x, y: W_nj @ (x + y), [inputs, inputs],
+            [random.randn(3, 4, 2), random.randn(2, 4, 2)],
+            batched=True)
+
+
+# ====================================================================================================
+# Test Hessian-vector products
+
+
+def test_hvp(weights, inputs):
+    W_nj, W_torch = weights
+    vectors = random.randn(4, 4, 2)
+
+    output, hvps = hvp(lambda x: nj.sum(nn.Sigmoid()(W_nj @ x)**2),
+                       inputs,
+                       vectors,
+                       batched=True)
+
+    def f_torch(x):
+        return torch.sum(torch.sigmoid(W_torch @ x)**2)
+
+    expected = stack([
+        torch_functional.hvp(f_torch, torch.tensor(inputs),
+                             torch.tensor(vector))[1].numpy()
+        for vector in vectors
+    ])
+
+    assert allclose(output.value, f_torch(torch.tensor(inputs)).item())
+    assert allclose(hvps, expected)
+
+
+def test_hvp_multiple_inputs(weights, inputs):
+    _, W_torch = weights
+    W = W_torch.numpy()
+    vectors = [random.randn(3, 4), random.randn(4, 2)]
+
+    def f(W, x):
+        return nj.sum(_Sin(W @ x)()) / nj.sum(x * x)
+
+    def f_torch(W, x):
+        return torch.sum(torch.sin(W @ x)) / torch.sum(x * x)
+
+    _, (hvp_W, hvp_x) = hvp(f, [W, inputs], vectors)
+
+    _, (expected_W, expected_x) = torch_functional.hvp(
+        f_torch, (torch.tensor(W), torch.tensor(inputs)),
+        tuple(torch.tensor(vector) for vector in vectors))
+
+    assert hvp_W.shape == W.shape
+    assert allclose(hvp_W, expected_W.numpy())
+    assert allclose(hvp_x, expected_x.numpy())
+
+
+def test_hvp_hutchinson_trace():
+    # f(x) = sum(x^3), H = diag(6x)
+    x = random.rand(16)
+    vectors = random.choice([-1., 1.], size=(256, 16))
+
+    _, hvps = hvp(lambda x: nj.sum(x**3), x, vectors, batched=True)
+    estimates = (vectors * hvps).sum(axis=1)
+
+    # With Rademacher vectors, each estimate of a diagonal Hessian is exact
+    assert allclose(estimates, 6 * x.sum())
+
+
+def test_hvp_swish(inputs):
+    vectors = random.randn(3, 4, 2)
+
+    def f(x):
+        return nj.sum(nn.Swish(beta=2)(x * x))
+
+    def f_torch(x):
+        return torch.sum(x * x * torch.sigmoid(2 * x * x))
+
+    _, hvps = hvp(f, inputs, vectors, batched=True)
+
+    expected = stack([
+        torch_functional.hvp(f_torch, torch.tensor(inputs),
+                             torch.tensor(vector))[1].numpy()
+        for vector in vectors
+    ])
+
+    assert allclose(hvps, expected)
+
+
+def test_hvp_prod(weights, inputs):
+    W_nj, W_torch = weights
+    vectors = random.randn(3, 4, 2)
+
+    def f(x):
+        return nj.sum(nj.prod(W_nj @ x, dim=0))
+
+    def f_torch(x):
+        return torch.sum(torch.prod(W_torch @ x, dim=0))
+
+    _, hvps = hvp(f, inputs, vectors, batched=True)
+
+    expected = stack([
+        torch_functional.hvp(f_torch, torch.tensor(inputs),
+                             torch.tensor(vector))[1].numpy()
+        for vector in vectors
+    ])
+
+    assert allclose(hvps, expected)
+
+
+@pytest.mark.parametrize('algorithm', ['im2col', 'fft'])
+@pytest.mark.parametrize('layout', ['NCHW', 'NHWC'])
+def test_hvp_conv2d(algorithm, layout):
+    conv = nn.Conv2d(2,
+                     3, (3, 2),
+                     stride=(2, 1),
+                     padding=1,
+                     dilation=(0, 1),
+                     algorithm=algorithm,
+                     layout=layout)
+
+    inputs, vector = random.rand(2, 2, 7, 6), random.randn(2, 2, 7, 6)
+    if layout == 'NHWC':
+        inputs, vector = (array.transpose(0, 2, 3, 1)
+                          for array in (inputs, vector))
+
+    kernels = torch.tensor(conv[0].kernels.value)
+    bias = torch.tensor(conv[0].b.value.ravel())
+
+    def f_torch(x):
+        if layout == 'NHWC':
+            x = x.permute(0, 3, 1, 2)
+
+        output = torch.nn.functional.conv2d(x,
+                                            kernels,
+                                            bias,
+                                            stride=(2, 1),
+                                            padding=1,
+                                            dilation=(1, 2))
+        return torch.sum(output**2)
+
+    _, hvps = hvp(lambda x: nj.sum(conv(x)**2), inputs, vector)
+
+    _, expected = torch_functional.hvp(f_torch, torch.tensor(inputs),
+                                       torch.tensor(vector))
+
+    assert allclose(hvps, expected.numpy())
+
+
+@pytest.mark.parametrize('pool_type', ['max', 'avg'])
+@pytest.mark.parametrize('layout', ['NCHW', 'NHWC'])
+def test_hvp_pool2d(pool_type, layout):
+    if pool_type == 'max':
+        pool = nn.MaxPool2d(3, stride=2, padding=1, dilation=(1, 0),
+                            layout=layout)
+        pool_torch = partial(torch.nn.functional.max_pool2d,
+                             kernel_size=3,
+                             stride=2,
+                             padding=1,
+                             dilation=(2, 1))
+    else:
+        pool = nn.AvgPool2d(3, stride=2, padding=1, layout=layout)
+        pool_torch = partial(torch.nn.functional.avg_pool2d,
+                             kernel_size=3,
+                             stride=2,
+                             padding=1)
+
+    inputs, vector = random.rand(2, 3, 8, 7), random.randn(2, 3, 8, 7)
+    if layout == 'NHWC':
+        inputs, vector = (array.transpose(0, 2, 3, 1)
+                          for array in (inputs, vector))
+
+    def f_torch(x):
+        if layout == 'NHWC':
+            x = x.permute(0, 3, 1, 2)
+
+        return torch.sum(torch.sin(pool_torch(x))**2)
+
+    _, hvps = hvp(lambda x: nj.sum(_Sin(pool(x))()**2), inputs, vector)
+
+    _, expected = torch_functional.hvp(f_torch, torch.tensor(inputs),
+                                       torch.tensor(vector))
+
+    assert allclose(hvps, expected.numpy())
+
+
+def test_hvp_batch_reuses_graph(weights, inputs, monkeypatch):
+    W_nj, _ = weights
+    vectors = random.randn(3, 4, 2)
+
+    calls = {'f': 0, 'functions': 0}
+
+    def f(x):
+        calls['f'] += 1
+        return nj.sum(nn.TanH()(W_nj @ x))
+
+    function_init = Function.__init__
+
+    def counting_init(self, *children):
+        calls['functions'] += 1
+        function_init(self, *children)
+
+    monkeypatch.setattr(Function, '__init__', counting_init)
+
+    # The graph is recorded once, whatever the number of vectors
+    hvp(f, inputs, vectors[:1], batched=True)  # Fills the function cache
+    calls.update(f=0, functions=0)
+
+    hvp(f, inputs, vectors[:1], batched=True)
+    single_vector_calls = dict(calls)
+    calls.update(f=0, functions=0)
+
+    _, batched = hvp(f, inputs, vectors, batched=True)
+
+    assert calls['f'] == 1
+    assert calls == single_vector_calls
+
+    monkeypatch.undo()
+    for vector, batched_hvp in zip(vectors, batched):
+        _, single = hvp(f, inputs, vector)
+        assert allclose(single, batched_hvp)
+
+
+def test_hvp_invalid(weights, inputs):
+    W_nj, _ = weights
+
+    with pytest.raises(ValueError):
+        hvp(lambda x: W_nj @ x, inputs, random.randn(4, 2))
+
+    with pytest.raises(ValueError):
+        hvp(lambda x: nj.sum(x**2), inputs, random.randn(2, 4))
+
+    with nj.no_diff(), pytest.raises(RuntimeError):
+        hvp(lambda x: nj.sum(x**2), inputs, random.randn(4, 2))
+
+
+# ====================================================================================================
+# Unit Test fixtures
+
+
+@pytest.fixture
+def weights():
+    W = random.randn(3, 4)
+    return nj.Tensor(W), torch.tensor(W)
+
+
+@pytest.fixture
+def inputs():
+    return random.rand(4, 2) + 0.5
+
+
+# ====================================================================================================
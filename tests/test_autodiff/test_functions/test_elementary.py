@@ -31,6 +31,26 @@ def test_addition(inputs):
     assert (grad_B == 1).all()
 
 
+def test_addition_broadcast():
+    A = Tensor([[1, 2, 3]])
+    B = Tensor([[1], [2], [3]])
+    add = funcs._Addition(A, B)
+
+    # Test Forwardprop
+    C = add()
+    assert (C == [[2, 3, 4], [3, 4, 5], [4, 5, 6]]).all()
+
+    # Test Backprop - summed over the broadcast axes
+    doutput = ones(3, 3)
+    grad_A, grad_B = add.backward(0, doutput), add.backward(1, doutput)
+
+    assert grad_A.shape == A.shape
+    assert (grad_A == 3).all()
+
+    assert grad_B.shape == B.shape
+    assert (grad_B == 3).all()
+
+
 # ====================================================================================================
 # Unit Testing Negation
 
@@ -81,6 +101,26 @@ def test_multiplication(inputs):
     assert (grad_B == A).all()
 
 
+def test_multiplication_broadcast():
+    A = Tensor([[1, 2, 3]])
+    B = Tensor([[1], [2], [3]])
+    mul = funcs._Multiplication(A, B)
+
+    # Test Forwardprop
+    C = mul()
+    assert (C == [[1, 2, 3], [2, 4, 6], [3, 6, 9]]).all()
+
+    # Test Backprop - summed over the broadcast axes
+    doutput = ones(3, 3)
+    grad_A, grad_B = mul.backward(0, doutput), mul.backward(1, doutput)
+
+    assert grad_A.shape == A.shape
+    assert (grad_A == [[6, 6, 6]]).all()
+
+    assert grad_B.shape == B.shape
+    assert (grad_B == [[6], [6], [6]]).all()
+
+
 # ====================================================================================================
 # Unit Testing Reciprocal
 
@@ -0,0 +1,332 @@
+from threading import Barrier, Event, Thread
+
+import pytest
+
+from numpy import allclose, exp, float16, float32, float64, int64, random
+
+import nujo as nj
+import nujo.nn as nn
+import nujo.objective as obj
+import nujo.optim as optim
+from nujo.utils import Profiler
+from nujo.autodiff import lazy, modes, no_diff
+from nujo.autodiff.modes import (default_dtype, get_default_dtype,
+                                 set_default_dtype)
+
+# ====================================================================================================
+# Test nested no_diff blocks
+
+
+def test_no_diff_nested():
+    assert modes.is_diff_enabled()
+
+    with no_diff():
+        assert not modes.is_diff_enabled()
+
+        with no_diff():
+            assert not modes.is_diff_enabled()
+
+        # The inner block restores the outer mode, not `True`
+        assert not modes.is_diff_enabled()
+        assert not modes.DIFF_ENABLED
+
+    assert modes.is_diff_enabled()
+    assert modes.DIFF_ENABLED
+
+
+def test_no_diff_restored_on_error():
+    try:
+        with no_diff():
+            raise RuntimeError
+    except RuntimeError:
+        pass
+
+    assert modes.is_diff_enabled()
+
+
+# ====================================================================================================
+# Test no_diff isolation between threads
+
+
+def test_no_diff_thread_local():
+    entered, release = Event(), Event()
+
+    def inference():
+        with no_diff():
+            entered.set()
+            release.wait()
+
+    thread = Thread(target=inference, daemon=True)
+    thread.start()
+    entered.wait()
+
+    try:
+        # The other thread's block does not disable differentiation here
+        assert modes.is_diff_enabled()
+        A = nj.Tensor(1, diff=True)
+        assert (A * 2).creator is not None
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_concurrent_training_and_inference():
+    num_steps, num_inference_threads = 50, 4
+
+    net = nn.Linear(3, 8) >> nn.Sigmoid() >> nn.Linear(8, 1)
+    reference_net = net.copy()
+
+    x = random.rand(3, 16)
+    y = random.rand(1, 16)
+
+    def train(net, barrier=None):
+        loss_fn = obj.L2Loss()
+        optimizer = optim.SGD(net.parameters, lr=0.1)
+        X, Y = nj.Tensor(x), nj.Tensor(y)
+
+        if barrier is not None:
+            barrier.wait()
+
+        for _ in range(num_steps):
+            loss = loss_fn(net(X), Y)
+            assert loss.creator is not None
+
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+
+    errors = []
+    done = Event()
+    barrier = Barrier(num_inference_threads + 1)
+
+    def inference():
+        X = nj.Tensor(random.rand(3, 4))
+        barrier.wait()
+
+        try:
+            while not done.is_set():
+                with no_diff():
+                    output = net(X)
+
+                    with no_diff():
+                        pass
+
+                    assert output.creator is None
+                    assert not modes.is_diff_enabled()
+        except AssertionError as error:
+            errors.append(error)
+
+    threads = [
+        Thread(target=inference, daemon=True)
+        for _ in range(num_inference_threads)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        train(net, barrier)
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+
+    # Training is not affected by the concurrent inference
+    train(reference_net)
+    for param, reference in zip(net.parameters(), reference_net.parameters()):
+        assert allclose(param.value, reference.value)
+
+
+# ====================================================================================================
+# Test lazy evaluation
+
+
+def test_lazy_deferred():
+    x = nj.Tensor(random.rand(3, 4), diff=True)
+
+    with Profiler() as profiler:
+        with lazy():
+            assert modes.is_lazy_enabled()
+            y = nn.Sigmoid()(x * 2 + 1)
+            unused = nn.TanH()(y) * 3  # noqa: F841 - never evaluated
+
+        assert not modes.is_lazy_enabled()
+        assert y._pending and _forward_calls(profiler) == []
+
+        # Evaluated on access: the multiplication, addition and sigmoid
+        assert allclose(y.value, 1 / (1 + exp(-(x.value * 2 + 1))))
+        assert _forward_calls(profiler) == \
+            ['Multiplication', 'Addition', 'Sigmoid']
+
+        y.value
+        assert len(_forward_calls(profiler)) == 3
+
+
+def test_lazy_common_subexpressions():
+    x = nj.Tensor(random.rand(3, 4) + 0.5, diff=True)
+
+    def fn(x):
+        return nj.sum(nj.log(x) * nj.log(x) + nj.log(x))
+
+    def log_calls(profiler):
+        return _forward_calls(profiler).count('Logarithm')
+
+    with Profiler() as eager:
+        output_eager = fn(x).value.copy()
+
+    with Profiler() as deferred, lazy():
+        output = fn(x)
+        output.backward()
+
+    assert log_calls(eager) == 3
+    assert log_calls(deferred) == 1
+    assert allclose(output.value, output_eager)
+    assert allclose(x.grad.value, (2 * nj.log(x).value + 1) / x.value)
+
+    # Not evaluated again, unless the input changes
+    new_value = random.rand(3, 4) + 0.5
+    expected = fn(nj.Tensor(new_value)).value
+
+    with Profiler() as profiler, lazy():
+        fn(x).value
+        assert log_calls(profiler) == 1
+
+        fn(x).value
+        assert log_calls(profiler) == 1
+
+        x.value = new_value
+        assert allclose(fn(x).value, expected)
+        assert log_calls(profiler) == 2
+
+
+def test_lazy_training_step():
+    net = nn.Linear(3, 8) >> nn.Swish() >> nn.Linear(8, 1) >> nn.Sigmoid()
+    loss_fn = obj.BinaryCrossEntropy()
+
+    for _ in range(2):
+        x = nj.Tensor(random.rand(3, 16))
+        y = nj.Tensor(random.randint(0, 2, (1, 16)))
+
+        with lazy():
+            loss_lazy = loss_fn(net(x), y)
+            loss_lazy.backward()
+            grads_lazy = [
+                param.grad.value.copy() for param in net.parameters()
+            ]
+
+        for param in net.parameters():
+            param.zero_grad()
+
+        loss_eager = loss_fn(net(x), y)
+        loss_eager.backward()
+
+        assert allclose(loss_lazy.value, loss_eager.value)
+        for param, grad_lazy in zip(net.parameters(), grads_lazy):
+            assert allclose(param.grad.value, grad_lazy)
+            param.zero_grad()
+
+
+def _forward_calls(profiler):
+    return [
+        event.name for event in profiler.events
+        if event.category == 'forward'
+    ]
+
+
+def test_lazy_no_diff():
+    x = nj.Tensor(random.rand(3, 4), diff=True)
+
+    with lazy(), no_diff():
+        y = x * 2
+
+    # Not recorded in the computation graph, thus evaluated eagerly
+    assert not y._pending
+    assert allclose(y.value, x.value * 2)
+
+
+# ====================================================================================================
+# Test the default dtype policy
+
+
+def test_default_dtype_block():
+    assert get_default_dtype() == float64
+
+    with default_dtype(float32):
+        assert get_default_dtype() == float32
+        assert nj.randn(2, 2).value.dtype == float32
+        assert nj.Tensor(0.5).value.dtype == float32
+
+        with default_dtype('float16'):
+            assert nj.zeros(2).value.dtype == float16
+
+        assert get_default_dtype() == float32
+
+        # Integer values are not affected
+        assert nj.Tensor([1, 2]).value.dtype == int64
+        assert nj.Tensor([1, 2], diff=True).grad.value.dtype == float32
+
+    assert get_default_dtype() == float64
+    assert nj.randn(2, 2).value.dtype == float64
+
+
+def test_set_default_dtype():
+    try:
+        set_default_dtype(float32)
+        assert nj.Tensor(random.rand(2)).value.dtype == float32
+
+        with default_dtype(float16):
+            assert get_default_dtype() == float16
+
+        assert get_default_dtype() == float32
+    finally:
+        set_default_dtype(float64)
+
+
+def test_default_dtype_invalid():
+    with pytest.raises(TypeError):
+        set_default_dtype(int64)
+
+    with pytest.raises(TypeError):
+        default_dtype('int32')
+
+
+def test_default_dtype_thread_local():
+    dtypes = []
+
+    def run():
+        dtypes.append(get_default_dtype())
+
+    with default_dtype(float32):
+        thread = Thread(target=run)
+        thread.start()
+        thread.join()
+
+    assert dtypes == [float64]
+
+
+def test_float32_training_step():
+    with default_dtype(float32):
+        net = nn.Linear(3, 8) >> nn.Sigmoid() >> nn.Linear(8, 1)
+        loss_fn = obj.L2Loss()
+        optimizer = optim.Adam(net.parameters)
+
+        x = nj.Tensor(random.rand(3, 16))
+        y = nj.Tensor(random.rand(1, 16))
+
+        for _ in range(2):
+            loss = loss_fn(net(x), y)
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+
+        assert loss.value.dtype == float32
+        for param in net.parameters():
+            assert param.value.dtype == float32
+            assert param.grad.value.dtype == float32
+
+        for state in (optimizer._velocity, optimizer._squared):
+            assert all(v.value.dtype == float32 for v in state.values())
+
+
+# ====================================================================================================
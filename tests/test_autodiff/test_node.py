@@ -1,4 +1,5 @@
 from nujo.autodiff._node import _Node
+from nujo.autodiff.tensor import Tensor
 
 
 def test_node_equality():
@@ -16,3 +17,29 @@ def test_node_children():
     assert isinstance(A.children[0], _Node)
     assert A.children[1].children[0] == 2
     assert A.children[2] == 3
+
+
+def test_node_lazy_name():
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return 'Lazy'
+
+    A = _Node(name=generate)
+    assert len(calls) == 0
+
+    assert A.name == 'Lazy'
+    assert repr(A) == '<Lazy>'
+    assert len(calls) == 1
+
+
+def test_node_slots():
+    A = Tensor(1) + 2
+
+    assert not hasattr(A, '__dict__')
+    assert not hasattr(A.creator, '__dict__')
+
+    assert A.creator._name is None  # Not generated yet
+    assert A.name == f'Z<_Addition>#{A.creator.id}'
+    assert A.creator.children[1].name == '2'
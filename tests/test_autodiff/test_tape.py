@@ -0,0 +1,238 @@
+import pytest
+from numpy import allclose, random
+
+import nujo as nj
+import nujo.nn as nn
+import nujo.objective as obj
+from nujo.autodiff import capture
+from nujo.autodiff._functions._fused import _FusedElementwise
+from nujo.autodiff._functions._transform import _ConstPad
+from nujo.autodiff._functions._trigonometric import _Cos, _Sin, _Tan
+
+# ====================================================================================================
+# Test Tape replay against the standard (eager) computation
+
+
+def test_tape_replay(net, loss_fn, batches):
+    (x, y), *rest = batches
+    step = capture(lambda x, y: loss_fn(net(x), y), x, y)
+
+    for x_value, y_value in rest:
+        # Tape replay
+        _zero_grad(net)
+        loss_tape = step(x_value, y_value).value.copy()
+        grads_tape = [param.grad.value.copy() for param in net.parameters()]
+
+        # Eager computation
+        _zero_grad(net)
+        loss_eager = loss_fn(net(nj.Tensor(x_value)), nj.Tensor(y_value))
+        loss_eager.backward()
+        grads_eager = [param.grad.value for param in net.parameters()]
+
+        assert allclose(loss_tape, loss_eager.value)
+        for grad_tape, grad_eager in zip(grads_tape, grads_eager):
+            assert allclose(grad_tape, grad_eager)
+
+
+def test_tape_forward_only(net, batches):
+    (x, _), (x_value, _), _ = batches
+    tape = capture(net, x)
+
+    assert len(tape) > 0
+    assert allclose(tape.forward(x_value).value,
+                    net(nj.Tensor(x_value)).value)
+
+
+def test_tape_shape_check(net, batches):
+    (x, _), *_ = batches
+    tape = capture(net, x)
+
+    with pytest.raises(ValueError):
+        tape.forward(random.rand(4, 3))
+
+    with pytest.raises(ValueError):
+        tape.forward(x, x)
+
+
+# ====================================================================================================
+# Test elementwise fusion
+
+
+def test_tape_fuse(net, loss_fn, batches):
+    (x, y), *rest = batches
+    step = capture(lambda x, y: loss_fn(net(x), y), x, y)
+
+    num_steps = len(step)
+    step.fuse()
+
+    # Bias additions with the activations and the loss subtraction
+    assert len(step) < num_steps
+    assert any(
+        isinstance(function, _FusedElementwise)
+        for _, function, _ in step._forward_tape)
+
+    for x_value, y_value in rest:
+        _zero_grad(net)
+        loss_tape = step(x_value, y_value).value.copy()
+        grads_tape = [param.grad.value.copy() for param in net.parameters()]
+
+        _zero_grad(net)
+        loss_eager = loss_fn(net(nj.Tensor(x_value)), nj.Tensor(y_value))
+        loss_eager.backward()
+        grads_eager = [param.grad.value for param in net.parameters()]
+
+        assert allclose(loss_tape, loss_eager.value)
+        for grad_tape, grad_eager in zip(grads_tape, grads_eager):
+            assert allclose(grad_tape, grad_eager)
+
+
+@pytest.mark.parametrize('fn', [
+    lambda a, b: a - b,
+    lambda a, b: a / b,
+    lambda a, b: (a * b)**2 + a,
+    lambda a, b: a * a - 1 / b,
+    lambda a, b: nn.Sigmoid()(a * b + 1),
+    lambda a, b: nn.TanH()(a) * nn.ReLU()(b - 1),
+    lambda a, b: nn.LeakyReLU()(a - b) + b,
+    lambda a, b: _Sin(a)() * _Cos(b)() + _Tan(a)(),
+])
+@pytest.mark.parametrize('shape_b', [(3, 4), (4, ), (3, 1)])
+def test_tape_fuse_elementwise(fn, shape_b):
+    a = nj.Tensor(random.rand(3, 4) + 0.5, diff=True)
+    b = nj.Tensor(random.rand(*shape_b) + 0.5, diff=True)
+
+    tape = capture(lambda a, b: nj.sum(fn(a, b)), a, b).fuse()
+    assert len(tape) == 2  # the fused chain and the sum
+
+    for _ in range(2):  # reusing the scratch buffers
+        a_value = random.rand(3, 4) + 0.5
+        b_value = random.rand(*shape_b) + 0.5
+
+        a.zero_grad(propagate=False)
+        b.zero_grad(propagate=False)
+        output_tape = tape(a_value, b_value).value.copy()
+        grads_tape = a.grad.value.copy(), b.grad.value.copy()
+
+        a_eager = nj.Tensor(a_value, diff=True)
+        b_eager = nj.Tensor(b_value, diff=True)
+        output_eager = nj.sum(fn(a_eager, b_eager))
+        output_eager.backward()
+
+        assert allclose(output_tape, output_eager.value)
+        assert allclose(grads_tape[0], a_eager.grad.value)
+        assert allclose(grads_tape[1], b_eager.grad.value)
+
+
+def test_tape_fuse_shared_tensors():
+    a = nj.Tensor(random.rand(3, 4), diff=True)
+
+    def fn(a):
+        b = nn.Sigmoid()(a * 2)
+        return nj.sum(b * b) + nj.sum(b)  # `b` is used twice
+
+    tape = capture(fn, a).fuse()
+
+    a.zero_grad(propagate=False)
+    tape(a.value)
+    grad_tape = a.grad.value.copy()
+
+    a_eager = nj.Tensor(a.value, diff=True)
+    fn(a_eager).backward()
+
+    assert allclose(grad_tape, a_eager.grad.value)
+
+
+# ====================================================================================================
+# Test memory planning
+
+
+@pytest.mark.parametrize('fuse', [False, True])
+def test_tape_plan(fuse):
+    net = nn.Linear(4, 32) >> nn.ReLU() >> nn.Linear(32, 32) >> \
+        nn.TanH() >> nn.Linear(32, 32) >> nn.Sigmoid() >> \
+        nn.Linear(32, 8) >> nn.Softmax()
+
+    x = nj.Tensor(random.rand(4, 16), name='x')
+    tape = capture(lambda x: nj.log(net(x).T + 1), x)
+    if fuse:
+        tape.fuse()
+
+    intermediates = sum(node.value.nbytes
+                        for node, _, _ in tape._forward_tape
+                        if node is not tape.output)
+
+    tape.plan()
+    assert 0 < tape.pool_nbytes < intermediates
+
+    for _ in range(3):
+        x_value = random.rand(4, 16)
+
+        output_tape = tape.forward(x_value).value
+        output_eager = nj.log(net(nj.Tensor(x_value)).T + 1)
+
+        assert allclose(output_tape, output_eager.value)
+
+    # The output is not overwritten by the next replay
+    assert output_tape is not tape.forward(x_value).value
+
+
+@pytest.mark.parametrize('fn', [
+    lambda a, b: nj.log(a * b + 1, 2) - a**b,
+    lambda a, b: nj.sum(1 / a + b, dim=1) * nj.prod(b, dim=1),
+    lambda a, b: nj.sum(_Sin(a)() * _Cos(b)() + _Tan(a)()) * a,
+    lambda a, b: nn.LeakyReLU()(a - b) @ b.T,
+    lambda a, b: nj.sum(_ConstPad(a * b, ((1, 1), (0, 2)))(), dim=0),
+])
+def test_tape_plan_functions(fn):
+    a = nj.Tensor(random.rand(3, 4) + 0.5)
+    b = nj.Tensor(random.rand(3, 4) + 0.5)
+
+    tape = capture(fn, a, b).plan()
+
+    for _ in range(2):
+        a_value = random.rand(3, 4) + 0.5
+        b_value = random.rand(3, 4) + 0.5
+
+        assert allclose(
+            tape.forward(a_value, b_value).value,
+            fn(nj.Tensor(a_value), nj.Tensor(b_value)).value)
+
+
+def test_tape_plan_forward_only(net, loss_fn, batches):
+    (x, y), (x_value, y_value), _ = batches
+    tape = capture(lambda x, y: loss_fn(net(x), y), x, y).plan()
+
+    with pytest.raises(RuntimeError):
+        tape(x_value, y_value)
+
+    # Fusing discards the plan
+    tape.fuse()
+    assert tape.pool_nbytes == 0
+    tape(x_value, y_value)
+
+
+# ====================================================================================================
+# Unit Test fixtures
+
+
+def _zero_grad(net):
+    for param in net.parameters():
+        param.zero_grad(propagate=False)
+
+
+@pytest.fixture
+def net():
+    return nn.Linear(4, 8) >> nn.Sigmoid() >> nn.Linear(8, 2)
+
+
+@pytest.fixture
+def loss_fn():
+    return obj.L2Loss()
+
+
+@pytest.fixture
+def batches():
+    return [(random.rand(4, 16), random.rand(2, 16)) for _ in range(3)]
+
+
+# ====================================================================================================
@@ -1,6 +1,11 @@
+import gc
+import tracemalloc
+
 import pytest
-from numpy import expand_dims, ndarray
+from numpy import expand_dims, ndarray, random
 
+import nujo as nj
+import nujo.nn as nn
 from nujo import Tensor
 from nujo.autodiff._functions._elementary import _Addition
 
@@ -45,6 +50,173 @@ def test_tensor_backward(tensors):
     assert (B.grad == 1).all()
 
 
+def test_tensor_backward_shared_nodes():
+    A = Tensor([[1., 2.], [3., 4.]], diff=True)
+    B = A * A
+    C = B + B * A  # `B` is used twice, `A` three times
+
+    C.backward()
+
+    # dC/dA = 2A + 3A^2
+    assert (A.grad == 2 * A.value + 3 * A.value**2).all()
+    assert (B.grad == 1 + A.value).all()
+
+
+def test_tensor_parents_outputs_pruned():
+    A = Tensor([1., 2.], diff=True)
+
+    B = A * 2
+    del B
+    gc.collect()
+
+    # All the outputs collected and pruned
+    assert A.parents_outputs == []
+
+    C = A * 3
+    assert len(A.parents_outputs) == 1
+    assert A.parents_outputs[0] is C
+
+
+def test_tensor_backward_visits_once(monkeypatch):
+    calls = []
+    compute_grad = Tensor.compute_grad
+
+    def counted_compute_grad(self, *args, **kwargs):
+        calls.append(self.id)
+        return compute_grad(self, *args, **kwargs)
+
+    monkeypatch.setattr(Tensor, 'compute_grad', counted_compute_grad)
+
+    A = Tensor(2., diff=True)
+    B = A * A
+    C = (B + A) * (B + A) + B
+    C.backward()
+
+    assert len(calls) == len(set(calls))
+    assert A.grad == 2 * (4 + 2) * (2 * 2 + 1) + 2 * 2
+
+
+def test_tensor_backward_deep_chain():
+    A = Tensor(1., diff=True)
+
+    B = A
+    for _ in range(5000):  # deeper than the default recursion limit
+        B = B * 1.
+
+    B.backward()
+    assert A.grad == 1
+
+
+def test_tensor_backward_allocations():
+    net = nn.Linear(128, 128) >> nn.ReLU() >> nn.Linear(128, 128) >>\
+        nn.Sigmoid() >> nn.Linear(128, 1)
+    x = Tensor(random.rand(128, 64))
+
+    allocations = []
+    for _ in range(6):
+        loss = nj.mean(net(x))
+        for param in net.parameters():
+            param.zero_grad()
+
+        gc.disable()
+        tracemalloc.start()
+        try:
+            loss.backward()
+            allocations.append(tracemalloc.get_traced_memory())
+        finally:
+            tracemalloc.stop()
+            gc.enable()
+
+    # The first step allocates the gradient and scratch buffers
+    allocations = allocations[1:]
+
+    # Allocations stay flat across steps
+    assert len(set(allocations)) == 1
+
+    # No activation-sized temporary arrays are allocated
+    _, peak = allocations[0]
+    assert peak < x.value.nbytes / 4
+
+
+def test_tensor_backward_releases_graph():
+    A = Tensor([[1., 2.], [3., 4.]], diff=True)
+    C = Tensor([[5., 6.], [7., 8.]])
+    sigmoid = nn.Sigmoid()
+
+    B = sigmoid(A * A)
+    D = nj.sum(B * B + C)
+
+    D.backward()
+
+    # The intermediate values and the saved arrays are released,
+    # the leaves and the root are kept
+    with pytest.raises(RuntimeError, match='retain_graph=True'):
+        B.value
+
+    assert B.creator._output is None
+    assert A.value is not None and C.value is not None
+    assert D.value is not None
+
+    # The gradients are the same as when the graph is retained
+    grads = A.grad.value.copy(), B.grad.value.copy()
+
+    A, C = Tensor(A.value, diff=True), Tensor(C.value)
+    B = sigmoid(A * A)
+    D = nj.sum(B * B + C)
+
+    D.backward(retain_graph=True)
+
+    assert B.value is not None
+    assert (A.grad == grads[0]).all()
+    assert (B.grad == grads[1]).all()
+
+
+def test_tensor_backward_releases_graph_training():
+    net = nn.Linear(4, 8) >> nn.Sigmoid() >> nn.Linear(8, 1)
+    x = Tensor(random.rand(4, 16))
+
+    grads = []
+    for retain_graph in (False, True, False):
+        loss = nj.mean(net(x))
+        for param in net.parameters():
+            param.zero_grad()
+
+        loss.backward(retain_graph=retain_graph)
+        grads.append([param.grad.value.copy() for param in net.parameters()])
+
+    # The forward pass recomputes the released values
+    for first, second, third in zip(*grads):
+        assert (first == second).all()
+        assert (first == third).all()
+
+
+def test_tensor_backward_released_graph():
+    A = Tensor([[1., 2.], [3., 4.]], diff=True)
+    B = nj.exp(A)
+    C = nj.sum(B * B)
+
+    C.backward()
+
+    with pytest.raises(RuntimeError, match='retain_graph=True'):
+        B.shape
+
+    # Differentiating the released graph again
+    with pytest.raises(RuntimeError, match='retain_graph=True'):
+        C.backward()
+
+    # A single function: only its saved arrays are released
+    D = nj.sum(A)
+    D.backward()
+    with pytest.raises(RuntimeError, match='retain_graph=True'):
+        D.backward()
+
+    # The forward pass makes the graph differentiable again
+    B.value = nj.exp(A).value
+    C = nj.sum(B * B)
+    C.backward()
+    assert C.value is not None
+
+
 # ====================================================================================================
 # Test Tensor transpose and shape manipulation
 # methods: reshape, repeat, squeeze, unsqueeze
@@ -56,6 +228,33 @@ def test_tensor_transpose(tensors):
     assert (A.T.value == A.value.T).all()
 
 
+def test_tensor_transpose_cache(tensors):
+    A, _, _ = tensors
+
+    A_T = A.T
+    assert A.T is A_T  # unchanged value
+
+    A.value = A.value * 2
+    assert (A.T.value == A.value.T).all()
+
+    A[0, 0] = -1
+    assert (A.T.value == A.value.T).all()
+
+
+def test_tensor_version(tensors):
+    A, _, _ = tensors
+    version = A._version
+
+    A.value = A.value + 1
+    A[0, 1] = 5
+    A <<= A.value * 3
+    assert A._version == version + 3
+
+    grad_version = A.grad._version
+    A.zero_grad()
+    assert A.grad._version > grad_version
+
+
 def test_tensor_shape_manipulation(tensors):
     A, _, _ = tensors
     assert A.shape == A.value.shape
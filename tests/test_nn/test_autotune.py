@@ -0,0 +1,167 @@
+from contextvars import copy_context
+from threading import Barrier, Thread
+from time import sleep
+
+from numpy import allclose, random
+
+import nujo as nj
+import nujo.nn as nn
+import nujo.nn.autotune as autotune
+
+# ====================================================================================================
+# Test ConvAutotuner
+
+
+def test_autotune_select():
+    calls = {'slow': 0, 'fast': 0}
+
+    def candidate(name, duration):
+        def call():
+            calls[name] += 1
+            sleep(duration)
+
+        return call
+
+    candidates = {
+        'slow': candidate('slow', 0.01),
+        'fast': candidate('fast', 0),
+    }
+
+    tuner = nn.ConvAutotuner(repeats=2)
+    assert tuner.select(('key', ), candidates) == 'fast'
+    assert calls == {'slow': 3, 'fast': 3}  # warm-up and repeats
+
+    # The winner is cached
+    assert tuner.select(('key', ), candidates) == 'fast'
+    assert calls == {'slow': 3, 'fast': 3}
+    assert len(tuner) == 1
+
+    tuner.clear()
+    assert len(tuner) == 0
+
+
+def test_autotune_modes():
+    leaf = nj.Tensor(random.randn(3, 3), diff=True)
+    candidates = {'a': lambda: leaf * 2, 'b': lambda: leaf * 3}
+
+    tuner = nn.ConvAutotuner(repeats=1)
+
+    # With differentiation enabled, the backward passes are timed too
+    tuner.select(('key', ), candidates)
+    assert leaf._grad is not None
+    assert len(tuner) == 1
+
+    # The inference mode is tuned separately, with the forward passes only
+    grad = leaf.grad.value.copy()
+
+    with nj.no_diff():
+        tuner.select(('key', ), candidates)
+
+    assert len(tuner) == 2
+    assert allclose(leaf.grad.value, grad)
+
+
+def test_autotune_persist(tmp_path):
+    path = str(tmp_path / 'algorithms.json')
+
+    tuner = nn.ConvAutotuner(path, repeats=1)
+    assert tuner.select((1, (2, 3), 'float32'), {
+        'a': lambda: sleep(0.01),
+        'b': lambda: None
+    }) == 'b'
+
+    # A later process starts warm, without timing the candidates
+    def fail():
+        raise AssertionError('timed again')
+
+    warm_tuner = nn.ConvAutotuner(path)
+    assert len(warm_tuner) == 1
+    assert warm_tuner.select((1, (2, 3), 'float32'), {
+        'a': fail,
+        'b': fail
+    }) == 'b'
+
+
+def test_autotune_conv2d():
+    x = nj.Tensor(random.randn(2, 3, 12, 12), diff=True)
+
+    conv = nn.Conv2d(3, 4, 5, padding=1, algorithm='tune')
+    reference = nn.Conv2d(3, 4, 5, padding=1, algorithm='im2col')
+    reference[0].kernels.value = conv[0].kernels.value.copy()
+    reference[0].b.value = conv[0].b.value.copy()
+
+    with nn.ConvAutotuner() as tuner:
+        assert autotune.get_autotuner() is tuner
+
+        output = conv(x)
+        assert len(tuner) == 1
+
+        # The candidates are timed on copies of the input and parameters
+        assert x._grad is None and conv[0].kernels._grad is None
+
+        # The configuration is tuned once
+        conv(x)
+        assert len(tuner) == 1
+
+    assert autotune.get_autotuner() is not tuner
+    assert allclose(output.value, reference(x).value)
+
+    # The tuned convolution is differentiable
+    nj.sum(conv(x)).backward()
+    assert x.grad.shape == x.shape
+    assert conv[0].kernels.grad.shape == conv[0].kernels.shape
+
+
+def test_autotune_threads():
+    tuner = nn.ConvAutotuner(repeats=1)
+    active = {}
+
+    def run(name):
+        active[name] = autotune.get_autotuner()
+
+    with tuner:
+        # The other threads keep the default autotuner
+        thread = Thread(target=run, args=('other', ))
+        thread.start()
+        thread.join()
+
+        # Unless they run in a copy of the context of the block
+        thread = Thread(target=copy_context().run, args=(run, 'copy'))
+        thread.start()
+        thread.join()
+
+    assert active['other'] is not tuner
+    assert active['copy'] is tuner
+
+    # Threads can enter the same autotuner and exit it in any order
+    barrier = Barrier(2)
+
+    def enter(name, key):
+        with tuner:
+            barrier.wait()
+            tuner.select((key, ), {'a': lambda: None, 'b': lambda: None})
+            active[name] = autotune.get_autotuner()
+
+            if name == 'first':
+                barrier.wait()  # exits after the second thread
+
+        active[name + ' after'] = autotune.get_autotuner()
+
+    threads = [
+        Thread(target=enter, args=(name, key))
+        for name, key in (('first', 1), ('second', 2))
+    ]
+    for thread in threads:
+        thread.start()
+
+    threads[1].join()
+    barrier.wait()
+    threads[0].join()
+
+    assert active['first'] is tuner and active['second'] is tuner
+    assert active['first after'] is active['other']
+    assert active['second after'] is active['other']
+    assert len(tuner) == 2
+
+
+# ====================================================================================================
@@ -0,0 +1,114 @@
+import pytest
+from numpy import allclose, float32, ones, random
+
+import nujo as nj
+import nujo.nn as nn
+import nujo.objective as obj
+import nujo.optim as optim
+from nujo.autodiff._functions._activations import _Sigmoid
+from nujo.autodiff._functions._checkpoint import _Checkpoint
+from nujo.autodiff._utils import _topological_order
+
+# ====================================================================================================
+# Test Checkpoint gradients
+
+
+def test_checkpoint_gradients(segment, head):
+    plain_net = segment >> head
+    checkpointed_net = nn.Checkpoint(segment) >> head
+
+    assert len(list(checkpointed_net.parameters())) ==\
+        len(list(plain_net.parameters()))
+
+    x = nj.Tensor(random.rand(3, 8), diff=True)
+
+    grads = []
+    for net in (plain_net, checkpointed_net):
+        for param in net.parameters():
+            param.zero_grad()
+        x.zero_grad()
+
+        output = net(x)
+        nj.sum(output).backward()
+
+        grads.append([x.grad.value.copy()] +
+                     [param.grad.value.copy() for param in net.parameters()])
+
+    for plain_grad, checkpointed_grad in zip(*grads):
+        assert allclose(plain_grad, checkpointed_grad)
+
+
+def test_checkpoint_training(segment, head):
+    plain_net = segment >> head
+    checkpointed_net = nn.Checkpoint(segment.copy()) >> head.copy()
+
+    x = nj.Tensor(random.rand(3, 8))
+    y = nj.Tensor(random.rand(1, 8))
+    loss_fn = obj.L2Loss()
+
+    for net in (plain_net, checkpointed_net):
+        optimizer = optim.SGD(net.parameters, lr=0.1)
+
+        for _ in range(3):
+            loss = loss_fn(net(x), y)
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+
+    for plain_param, checkpointed_param in zip(plain_net.parameters(),
+                                               checkpointed_net.parameters()):
+        assert allclose(plain_param.value, checkpointed_param.value)
+
+
+def test_checkpoint_dtype():
+    with nj.default_dtype('float32'):
+        x = nj.Tensor(random.rand(3, 8), diff=True)
+        unused = nj.Tensor(random.rand(3, 8), diff=True)
+
+        checkpoint = _Checkpoint(x,
+                                 unused,
+                                 fn=lambda x: nj.sum(x * x),
+                                 num_inputs=1)
+        output = checkpoint()
+        accum_grad = ones(output.shape, output.value.dtype)
+
+        # Including the zero gradient of the tensor `fn` does not use
+        for idx in range(2):
+            assert checkpoint.backward(idx, accum_grad).dtype == float32
+
+
+# ====================================================================================================
+# Test Checkpoint memory
+
+
+def test_checkpoint_keeps_only_inputs(segment, head):
+    x = nj.Tensor(random.rand(3, 8))
+
+    plain_net = segment >> head
+    checkpointed_net = nn.Checkpoint(segment) >> head
+
+    plain_graph = _topological_order(plain_net(x))
+    checkpointed_graph = _topological_order(checkpointed_net(x))
+
+    # The inner activations are not part of the computation graph
+    assert len(checkpointed_graph) < len(plain_graph)
+    assert any(isinstance(node.creator, _Sigmoid) for node in plain_graph)
+    assert not any(
+        isinstance(node.creator, _Sigmoid) for node in checkpointed_graph)
+
+
+# ====================================================================================================
+# Unit Test fixtures
+
+
+@pytest.fixture
+def segment():
+    return nn.Linear(3, 16) >> nn.Sigmoid() >> nn.Linear(16, 16) >> nn.TanH()
+
+
+@pytest.fixture
+def head():
+    return nn.Linear(16, 1)
+
+
+# ====================================================================================================
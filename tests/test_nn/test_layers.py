@@ -1,5 +1,6 @@
 import pytest
 import torch
+from numpy import allclose, random
 import torch.nn as torch_nn
 
 import nujo as nj
@@ -57,6 +58,200 @@ def test_chained_conv2d(image_input):
     assert nj_params[1].shape == nj_conv[0].kernels.shape
 
 
+@pytest.mark.parametrize('algorithm', ['im2col', 'fft'])
+@pytest.mark.parametrize('stride, padding, dilation', [
+    ((1, 1), (0, 0), (0, 0)),
+    ((1, 2), (1, 2), (0, 0)),
+    ((3, 2), (2, 1), (1, 0)),
+    ((2, 1), (0, 3), (0, 2)),
+])
+def test_conv2d_matches_torch(stride, padding, dilation, algorithm):
+    nj_conv = nj_nn.Conv2d(3, 4, (3, 2),
+                           stride=stride,
+                           padding=padding,
+                           dilation=dilation,
+                           algorithm=algorithm)
+    torch_conv = torch_nn.Conv2d(3, 4, (3, 2),
+                                 stride=stride,
+                                 padding=padding,
+                                 dilation=tuple(d + 1 for d in dilation))
+
+    torch_conv.weight.data = torch.tensor(nj_conv[0].kernels.value)
+    torch_conv.bias.data = torch.tensor(nj_conv[0].b.value.ravel())
+
+    x = nj.Tensor(random.randn(2, 3, 11, 13), diff=True)
+    x_torch = torch.tensor(x.value, requires_grad=True)
+
+    nj_output = nj_conv(x)
+    torch_output = torch_conv(x_torch)
+
+    assert allclose(nj_output.value, torch_output.detach().numpy())
+
+    upstream = random.randn(*nj_output.shape)
+    nj.sum(nj_output * upstream).backward()
+    torch_output.backward(torch.tensor(upstream))
+
+    assert allclose(x.grad.value, x_torch.grad.numpy())
+    assert allclose(nj_conv[0].kernels.grad.value,
+                    torch_conv.weight.grad.numpy())
+
+
+def test_conv2d_fft_matches_im2col():
+    im2col_conv = nj_nn.Conv2d(4, 6, 7, padding=3, algorithm='im2col')
+    fft_conv = nj_nn.Conv2d(4, 6, 7, padding=3, algorithm='fft')
+
+    fft_conv[0].kernels.value = im2col_conv[0].kernels.value
+    fft_conv[0].b.value = im2col_conv[0].b.value
+
+    x = nj.Tensor(random.randn(3, 4, 20, 20), diff=True)
+    upstream = random.randn(3, 6, 20, 20)
+
+    grads = []
+    for conv in (im2col_conv, fft_conv):
+        output = conv(x)
+        output_value = output.value.copy()  # released by the backward pass
+        nj.sum(output * upstream).backward()
+
+        grads.append((output_value, x.grad.value.copy(),
+                      conv[0].kernels.grad.value, conv[0].b.grad.value))
+        x.zero_grad()
+
+    for im2col_array, fft_array in zip(*grads):
+        assert allclose(im2col_array, fft_array)
+
+
+def test_conv2d_algorithm():
+    assert nj_nn.Conv2d(3, 4, 3)[0].algorithm == 'im2col'
+    assert nj_nn.Conv2d(3, 4, 5)[0].algorithm == 'fft'
+    assert nj_nn.Conv2d(3, 4, 5, stride=2)[0].algorithm == 'im2col'
+    assert nj_nn.Conv2d(3, 4, 3, algorithm='fft')[0].algorithm == 'fft'
+
+    with pytest.raises(ValueError):
+        nj_nn.Conv2d(3, 4, 3, algorithm='winograd')
+
+
+@pytest.mark.parametrize('algorithm', ['im2col', 'fft'])
+def test_conv2d_nhwc(algorithm):
+    kwargs = {'stride': (2, 1), 'padding': (1, 2), 'dilation': (1, 0),
+              'algorithm': algorithm}
+
+    nchw_net = nj_nn.Conv2d(3, 4, (3, 2), **kwargs) >> \
+        nj_nn.Conv2d(4, 5, 3, padding=1, algorithm=algorithm)
+    nhwc_net = nj_nn.Conv2d(3, 4, (3, 2), layout='NHWC', **kwargs) >> \
+        nj_nn.Conv2d(4, 5, 3, padding=1, algorithm=algorithm, layout='NHWC')
+
+    for nchw_param, nhwc_param in zip(nchw_net.parameters(),
+                                      nhwc_net.parameters()):
+        nhwc_param.value = nchw_param.value.copy()
+
+    x = random.randn(2, 3, 11, 13)
+    nchw_x = nj.Tensor(x, diff=True)
+    nhwc_x = nj.Tensor(x.transpose(0, 2, 3, 1).copy(), diff=True)
+
+    nchw_output = nchw_net(nchw_x)
+    nhwc_output = nhwc_net(nhwc_x)
+
+    assert allclose(nhwc_output.value,
+                    nchw_output.value.transpose(0, 2, 3, 1))
+    if algorithm == 'im2col':
+        assert nhwc_output.value.flags['C_CONTIGUOUS']
+
+    upstream = random.randn(*nchw_output.shape)
+    nj.sum(nchw_output * upstream).backward()
+    nj.sum(nhwc_output * upstream.transpose(0, 2, 3, 1)).backward()
+
+    assert allclose(nhwc_x.grad.value, nchw_x.grad.value.transpose(0, 2, 3, 1))
+    for nchw_param, nhwc_param in zip(nchw_net.parameters(),
+                                      nhwc_net.parameters()):
+        assert allclose(nhwc_param.grad.value, nchw_param.grad.value)
+
+    with pytest.raises(ValueError):
+        nj_nn.Conv2d(3, 4, 3, layout='CHWN')
+
+
+def test_conv2d_input_shape_change():
+    nj_conv = nj_nn.Conv2d(3, 6, 4, stride=2, padding=1)
+
+    x = nj.randn(2, 3, 12, 12)
+    nj_conv(x)
+
+    # The function computing the columns is reused for the new shape
+    x.value = nj.randn(2, 3, 16, 16).value
+    nj_output = nj_conv(x)
+    expected = nj_conv(nj.Tensor(x.value))
+
+    assert nj_output.shape == expected.shape
+    assert (nj_output == expected).all()
+
+
+# ====================================================================================================
+
+
+@pytest.mark.parametrize('nj_pool, torch_pool', [
+    (nj_nn.MaxPool2d, torch_nn.MaxPool2d),
+    (nj_nn.AvgPool2d, torch_nn.AvgPool2d),
+])
+@pytest.mark.parametrize('kernel_size, stride, padding, dilation', [
+    (2, None, 0, 0),
+    ((3, 2), (2, 1), (1, 1), (0, 0)),
+    (3, 1, 1, 0),
+    ((3, 3), (2, 3), (1, 0), (1, 0)),
+])
+def test_pool2d_matches_torch(nj_pool, torch_pool, kernel_size, stride,
+                              padding, dilation):
+    pool = nj_pool(kernel_size, stride, padding, dilation)
+
+    if torch_pool is torch_nn.AvgPool2d and any(pool[0].dilation):
+        pytest.skip('torch does not dilate the average pooling')
+
+    torch_kwargs = {'kernel_size': kernel_size, 'stride': stride,
+                    'padding': padding}
+    if torch_pool is torch_nn.MaxPool2d:
+        torch_kwargs['dilation'] = tuple(d + 1 for d in pool[0].dilation)
+
+    x = nj.Tensor(random.randn(2, 3, 11, 12), diff=True)
+    x_torch = torch.tensor(x.value, requires_grad=True)
+
+    output = pool(x)
+    torch_output = torch_pool(**torch_kwargs)(x_torch)
+
+    assert allclose(output.value, torch_output.detach().numpy())
+
+    upstream = random.randn(*output.shape)
+    nj.sum(output * upstream).backward()
+    torch_output.backward(torch.tensor(upstream))
+
+    assert allclose(x.grad.value, x_torch.grad.numpy())
+
+
+@pytest.mark.parametrize('pool', [nj_nn.MaxPool2d, nj_nn.AvgPool2d])
+def test_pool2d_nhwc(pool):
+    x = random.randn(2, 3, 11, 12)
+    nchw_x = nj.Tensor(x, diff=True)
+    nhwc_x = nj.Tensor(x.transpose(0, 2, 3, 1).copy(), diff=True)
+
+    nchw_output = pool(3, 2, 1, (1, 0))(nchw_x)
+    nhwc_output = pool(3, 2, 1, (1, 0), layout='NHWC')(nhwc_x)
+
+    assert allclose(nhwc_output.value,
+                    nchw_output.value.transpose(0, 2, 3, 1))
+
+    upstream = random.randn(*nchw_output.shape)
+    nj.sum(nchw_output * upstream).backward()
+    nj.sum(nhwc_output * upstream.transpose(0, 2, 3, 1)).backward()
+
+    assert allclose(nhwc_x.grad.value, nchw_x.grad.value.transpose(0, 2, 3, 1))
+
+
+def test_pool2d_downsampling():
+    x = nj.Tensor(random.randn(4, 3, 16, 16))
+
+    assert nj_nn.MaxPool2d(2)(x).shape == (4, 3, 8, 8)
+    assert nj_nn.AvgPool2d(3, stride=2, padding=1)(x).shape == (4, 3, 8, 8)
+    assert nj_nn.MaxPool2d(2, stride=1, dilation=1)(x).shape == \
+        (4, 3, 14, 14)
+
+
 # ====================================================================================================
 # Unit Test fixtures
 
@@ -0,0 +1,151 @@
+import json
+from contextvars import copy_context
+from threading import Thread
+
+import pytest
+from numpy import random
+
+import nujo as nj
+import nujo._profiling as _profiling
+import nujo.nn as nn
+from nujo.autodiff import capture
+from nujo.utils import Profiler
+
+# ====================================================================================================
+# Test recorded calls
+
+
+def test_profiler_records_calls(net, inputs):
+    with Profiler() as profiler:
+        loss = nj.mean(net(inputs))
+        loss.backward()
+
+    categories = {event.category for event in profiler.events}
+    assert categories == {'forward', 'backward', 'flow'}
+
+    flows = [event for event in profiler.events if event.category == 'flow']
+    assert [event.name for event in flows] == [flow.name for flow in net]
+    assert flows[0].shape == (8, 16)
+
+    matmuls = [
+        event for event in profiler.events
+        if event.name == 'MatrixMul' and event.category == 'forward'
+    ]
+    assert [event.shape for event in matmuls] == [(8, 16), (1, 16)]
+    assert all(event.nbytes == 8 * 16 * 8 for event in matmuls[:1])
+
+    # The ops are nested in the flows
+    assert flows[0].start <= matmuls[0].start
+    assert matmuls[0].start + matmuls[0].duration <= \
+        flows[0].start + flows[0].duration
+
+
+def test_profiler_disabled(net, inputs):
+    profiler = Profiler()
+
+    with profiler:
+        with Profiler() as inner:
+            net(inputs)
+
+        assert _profiling.PROFILER is profiler
+
+    assert _profiling.PROFILER is None
+
+    # Only the innermost profiler records
+    assert len(profiler.events) == 0 and len(inner.events) > 0
+
+    # Nothing is recorded outside of the blocks
+    num_events = len(inner.events)
+    nj.mean(net(inputs)).backward()
+
+    assert len(inner.events) == num_events
+
+
+def test_profiler_threads(net, inputs):
+    def run():
+        net(inputs)
+
+    with Profiler() as profiler:
+        # The other threads are not profiled
+        thread = Thread(target=run)
+        thread.start()
+        thread.join()
+
+        assert len(profiler.events) == 0
+
+        # Unless they run in a copy of the context of the block
+        thread = Thread(target=copy_context().run, args=(run, ))
+        thread.start()
+        thread.join()
+
+    assert len(profiler.events) > 0
+    assert {event.thread for event in profiler.events} == {thread.ident}
+
+
+def test_profiler_tape(net, inputs):
+    tape = capture(lambda x: nj.mean(net(x)), inputs)
+
+    with Profiler() as profiler:
+        tape(inputs)
+
+    forward = [e for e in profiler.events if e.category == 'forward']
+    backward = [e for e in profiler.events if e.category == 'backward']
+
+    assert len(forward) == len(tape)
+    assert len(backward) > 0
+
+
+# ====================================================================================================
+# Test exports
+
+
+def test_profiler_summary(net, inputs):
+    with Profiler() as profiler:
+        for _ in range(3):
+            net(inputs)
+
+    summary = profiler.summary()
+    assert sum(op.calls for op in summary) == len(profiler.events)
+    assert all(a.total >= b.total for a, b in zip(summary, summary[1:]))
+
+    sigmoid = next(op for op in summary if op.name == 'Sigmoid')
+    assert sigmoid.calls == 3
+    assert sigmoid.mean == pytest.approx(sigmoid.total / 3)
+
+    table = profiler.table(limit=3)
+    assert len(table.splitlines()) == 2 + 3
+    assert summary[0].name in table
+
+
+def test_profiler_chrome_trace(net, inputs, tmp_path):
+    with Profiler() as profiler:
+        nj.mean(net(inputs)).backward()
+
+    path = tmp_path / 'trace.json'
+    profiler.export_chrome_trace(str(path))
+
+    with open(path) as file:
+        trace = json.load(file)
+
+    events = trace['traceEvents']
+    assert len(events) == len(profiler.events)
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+    assert {event['cat'] for event in events} == \
+        {'forward', 'backward', 'flow'}
+
+
+# ====================================================================================================
+# Unit Test fixtures
+
+
+@pytest.fixture
+def net():
+    return nn.Linear(4, 8) >> nn.Sigmoid() >> nn.Linear(8, 1)
+
+
+@pytest.fixture
+def inputs():
+    return nj.Tensor(random.rand(4, 16))
+
+
+# ====================================================================================================
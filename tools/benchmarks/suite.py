@@ -0,0 +1,901 @@
+''' Benchmark suite
+
+Times the core paths of nujo (per-op dispatch, forward and backward passes
+of deep Linear/Sigmoid chains, graph building, training steps of MLPs
+(dtypes, checkpointing, graph release, profiling), captured tapes (replays,
+fusion), lazy evaluation, Hessian-vector products and Jacobians, Conv2d and
+pooling layers, optimizer steps) and measures their peak memory. The
+results are written as JSON, and two result files (or two commits) can be
+compared to catch regressions.
+
+Each benchmark is a setup function (see `benchmark`) returning the callable
+to time. A callable is called in loops of increasing size until a loop
+takes at least `--min-time` seconds, then the loop is repeated `--repeat`
+times; the time per call of the fastest, median and slowest loops are
+reported. The peak memory is traced (`tracemalloc`) during a separate call.
+
+Usage:
+    $ python tools/benchmarks/suite.py run [-k PATTERN] [-o results.json]
+    $ python tools/benchmarks/suite.py compare base.json head.json
+    $ python tools/benchmarks/suite.py commits BASE_REF HEAD_REF [-k PATTERN]
+
+`commits` runs the benchmarks of the working tree against the nujo of
+both commits, alternately (see `run_commits`), and compares them. `compare`
+and `commits` exit with status 1 if a benchmark got slower (or used more
+memory) by more than `--threshold`.
+
+'''
+
+import argparse
+import fnmatch
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from timeit import default_timer as timer
+from typing import Callable, Dict, List, Optional
+
+import numpy
+from numpy.random import rand, randn
+
+_BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {}
+
+# ====================================================================================================
+# Registration
+
+
+def benchmark(name: str, **params: list):
+    ''' Registers the decorated setup function as a benchmark
+
+    The setup function returns the callable to time. If `params` are
+    given (lists of values, by argument name), a benchmark is registered
+    for each combination of values, named `name[arg=value,...]`.
+
+    '''
+    def decorator(setup):
+        names = list(params)
+
+        for values in itertools.product(*params.values()):
+            kwargs = dict(zip(names, values))
+            suffix = ','.join(f'{key}={value}'
+                              for key, value in kwargs.items())
+
+            full_name = f'{name}[{suffix}]' if suffix else name
+            _BENCHMARKS[full_name] = (
+                lambda kwargs=kwargs: setup(**kwargs))
+
+        return setup
+
+    return decorator
+
+
+# ====================================================================================================
+# Benchmarks
+
+
+@benchmark('dispatch.elementwise_x500', diff=[True, False])
+def dispatch(diff: bool):
+    ''' Per-op overhead: 500 ops on tiny tensors, building the graph
+    (with a new function per op) or not
+    '''
+
+    import nujo as nj
+
+    x = nj.Tensor(rand(4, 4), diff=True)
+
+    def run():
+        y = x
+        for _ in range(250):
+            y = y * 1.0001 + 0.5
+
+    if diff:
+        return run
+
+    def run_no_diff():
+        with nj.no_diff():
+            run()
+
+    return run_no_diff
+
+
+def _chain(depth: int):
+    import nujo as nj
+    import nujo.nn as nn
+
+    net = nn.Linear(64, 64)
+    for _ in range(depth - 1):
+        net = net >> nn.Sigmoid() >> nn.Linear(64, 64)
+
+    return nj, net, nj.Tensor(rand(64, 32))
+
+
+@benchmark('chain.forward', depth=[8, 32])
+def chain_forward(depth: int):
+    _, net, x = _chain(depth)
+    return lambda: net(x)
+
+
+def _training_step(flow, x):
+    ''' Returns a training step (forward and backward pass) of `flow` '''
+
+    import nujo as nj
+
+    def run():
+        loss = nj.mean(flow(x))
+        for param in flow.parameters():
+            param.zero_grad()
+
+        loss.backward()
+
+    return run
+
+
+@benchmark('chain.forward_backward', depth=[8, 32])
+def chain_forward_backward(depth: int):
+    _, net, x = _chain(depth)
+    return _training_step(net, x)
+
+
+@benchmark('chain.backward', depth=[1_000, 100_000])
+def chain_backward(depth: int):
+    ''' Backward pass of a chain of scalar multiplications, its time per
+    node should stay (roughly) constant with the depth of the graph
+    '''
+
+    import nujo as nj
+
+    x = nj.Tensor(1., diff=True)
+
+    y = x
+    for _ in range(depth):
+        y = y * 1.
+
+    return lambda: y.backward(retain_graph=True)
+
+
+@benchmark('graph.build_x10000')
+def graph_build():
+    ''' Graph node allocation: 10k functions, each with a constant and a
+    tensor input (the peak memory is the memory of the nodes)
+    '''
+
+    import nujo as nj
+
+    x = nj.Tensor(1., diff=True)
+
+    def run():
+        outputs = [x]
+        for _ in range(10_000):
+            outputs.append(outputs[-1] * 1.)
+
+    return run
+
+
+def _mlp(*sizes: int, activation='Sigmoid'):
+    import nujo.nn as nn
+
+    net = nn.Linear(sizes[0], sizes[1])
+    for inputs, outputs in zip(sizes[1:-1], sizes[2:]):
+        net = net >> getattr(nn, activation)() >> nn.Linear(inputs, outputs)
+
+    return net
+
+
+@benchmark('mlp.step', dtype=['float64', 'float32'])
+def mlp_step(dtype: str):
+    ''' Training step of an MLP with wide layers, in float64 or float32
+    (see `nujo.default_dtype`)
+    '''
+
+    import nujo as nj
+    import nujo.objective as obj
+
+    with nj.default_dtype(dtype):
+        net = _mlp(512, 1024, 1024, 1, activation='ReLU')
+        x, y = nj.Tensor(rand(512, 256)), nj.Tensor(rand(1, 256))
+
+    loss_fn = obj.L2Loss()
+
+    def run():
+        with nj.default_dtype(dtype):
+            loss = loss_fn(net(x), y)
+            for param in net.parameters():
+                param.zero_grad()
+
+            loss.backward()
+
+    return run
+
+
+@benchmark('mlp.checkpointed_step', checkpoint=[False, True])
+def mlp_checkpointed_step(checkpoint: bool):
+    ''' Training step of a deep MLP with or without checkpointing its
+    blocks (see `nujo.nn.Checkpoint`), trading compute for peak memory
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    import nujo.objective as obj
+
+    net = nn.Linear(256, 256)
+    for _ in range(8):
+        block = _mlp(256, 256, 256) >> nn.Sigmoid()
+        net = net >> (nn.Checkpoint(block) if checkpoint else block)
+    net = net >> nn.Linear(256, 1)
+
+    loss_fn = obj.L2Loss()
+    x, y = nj.Tensor(rand(256, 512)), nj.Tensor(rand(1, 512))
+
+    return lambda: loss_fn(net(x), y).backward()
+
+
+@benchmark('mlp.optim_step', retain_graph=[True, False])
+def mlp_optim_step(retain_graph: bool):
+    ''' Training step (with Adam) of the MNIST example network on random
+    data, releasing the intermediate values of the graph during the
+    backward pass or retaining them (see `nujo.Tensor.backward`)
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    import nujo.objective as obj
+    import nujo.optim as optim
+
+    net = _mlp(28 * 28, 256, 128, 10) >> nn.Softmax()
+
+    loss_fn = obj.CrossEntropy()
+    optimizer = optim.Adam(net.parameters, lr=0.01)
+
+    x = nj.Tensor(rand(28 * 28, 1024))
+    y = nj.Tensor((rand(10, 1024) > 0.9).astype(float))
+
+    def run():
+        loss_fn(net(x), y).backward(retain_graph=retain_graph)
+        optimizer.step()
+        optimizer.zero_grad()
+
+    return run
+
+
+@benchmark('mlp.profiled_step', profiler=[False, True])
+def mlp_profiled_step(profiler: bool):
+    ''' Training step of a small MLP, dominated by the per-op overhead,
+    with the profiling hooks disabled or in a `Profiler` block
+    '''
+
+    import nujo as nj
+    from nujo.utils import Profiler
+
+    run = _training_step(_mlp(8, 16, 16, 1), nj.Tensor(rand(8, 4)))
+    if not profiler:
+        return run
+
+    def run_profiled():
+        with Profiler():
+            run()
+
+    return run_profiled
+
+
+@benchmark('tape.replay_forward', plan=[False, True])
+def tape_replay_forward(plan: bool):
+    ''' Forward-only replay (inference) of a deep MLP captured into a tape,
+    with or without planning the memory of its intermediate values (see
+    `Tape.plan`)
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    from nujo.autodiff import capture
+
+    net = nn.Linear(256, 256) >> nn.TanH()
+    for _ in range(15):
+        net = net >> nn.Linear(256, 256) >> nn.TanH()
+    net = net >> nn.Linear(256, 1)
+
+    tape = capture(net, nj.Tensor(rand(256, 512)))
+    if plan:
+        tape.plan()
+
+    x = rand(256, 512)
+    return lambda: tape.forward(x)
+
+
+@benchmark('tape.step', replay=[False, True])
+def tape_step(replay: bool):
+    ''' Training step of a small MLP, computed eagerly or by replaying a
+    captured tape
+    '''
+
+    import nujo as nj
+    import nujo.objective as obj
+    from nujo.autodiff import capture
+
+    net = _mlp(8, 16, 16, 1)
+    loss_fn = obj.L2Loss()
+    x, y = rand(8, 16), rand(1, 16)
+
+    if replay:
+        step = capture(lambda x, y: loss_fn(net(x), y), x, y)
+        return lambda: step(x, y)
+
+    return lambda: loss_fn(net(nj.Tensor(x)), nj.Tensor(y)).backward()
+
+
+_ELEMENTWISE = {
+    'sub': lambda nn, x, y: x - y,
+    'div': lambda nn, x, y: x / y,
+    'sigmoid': lambda nn, x, y: nn.Sigmoid()(x * y + 1),
+    'squared_tanh': lambda nn, x, y: (nn.TanH()(x) - y)**2,
+}
+
+
+@benchmark('tape.fused_step', fn=list(_ELEMENTWISE), fuse=[False, True])
+def tape_fused_step(fn: str, fuse: bool):
+    ''' Replayed step (forward and backward pass) of elementwise
+    computations on 1024x1024 tensors (`x - y`, `x / y`,
+    `sigmoid(x * y + 1)`, `(tanh(x) - y)^2`), with or without fusing their
+    chains of elementwise functions (see `Tape.fuse`)
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    from nujo.autodiff import capture
+
+    x = nj.Tensor(rand(1024, 1024) + 0.5, diff=True)
+    y = nj.Tensor(rand(1024, 1024) + 0.5, diff=True)
+
+    step = capture(lambda x, y: nj.sum(_ELEMENTWISE[fn](nn, x, y)), x, y)
+    if fuse:
+        step.fuse()
+
+    return lambda: step(x.value, y.value)
+
+
+@benchmark('lazy.loss_backward', lazy=[False, True])
+def lazy_loss_backward(lazy: bool):
+    ''' A loss with repeated terms (binary cross-entropy with an entropy
+    penalty, both computing `log(p)` and `log(1 - p)`) and its backward
+    pass, evaluated eagerly or in lazy mode (see `nujo.lazy`), where the
+    repeated terms are evaluated once
+    '''
+
+    import nujo as nj
+
+    p = nj.Tensor(numpy.clip(rand(64, 1024), 1e-3, 1 - 1e-3), diff=True)
+    y = nj.Tensor(numpy.random.randint(0, 2, (64, 1024)))
+
+    def loss_backward():
+        cross_entropy = y * nj.log(p) + (1 - y) * nj.log(1 - p)
+        entropy = p * nj.log(p) + (1 - p) * nj.log(1 - p)
+
+        (-nj.mean(cross_entropy) + 0.1 * nj.mean(entropy)).backward()
+
+    def run():
+        if lazy:
+            with nj.lazy():
+                loss_backward()
+        else:
+            loss_backward()
+
+        p.zero_grad()
+
+    return run
+
+
+@benchmark('functional.hvp_x64', batched=[False, True])
+def functional_hvp(batched: bool):
+    ''' 64 Hessian-vector products of the loss of an MLP w.r.t. its first
+    weight matrix, in one batched `hvp` call (reusing the recorded gradient
+    graph) or in one call per vector
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    from nujo.autodiff import hvp
+
+    W1, W2 = randn(64, 128), nj.Tensor(randn(32, 64))
+    x, y = nj.Tensor(rand(128, 256)), nj.Tensor(rand(32, 256))
+    vectors = randn(64, 64, 128)
+
+    def loss(W1):
+        hidden = nn.Sigmoid()(W1 @ x)
+        return nj.mean((W2 @ hidden - y)**2)
+
+    if batched:
+        return lambda: hvp(loss, W1, vectors, batched=True)
+
+    def run():
+        for vector in vectors:
+            hvp(loss, W1, vector)
+
+    return run
+
+
+@benchmark('functional.jacobian', mode=['forward', 'reverse'])
+def functional_jacobian(mode: str):
+    ''' Jacobian of an MLP with few inputs and many outputs (8 features to
+    512 outputs, for 16 samples), column by column with forward-mode `jvp`
+    or row by row with reverse-mode `vjp`
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+    from nujo.autodiff import jvp, vjp
+
+    W1, W2 = nj.Tensor(randn(64, 8)), nj.Tensor(randn(512, 64))
+    x = rand(8, 16)
+
+    def fn(x):
+        return nn.TanH()(W2 @ nn.Sigmoid()(W1 @ x))
+
+    if mode == 'forward':
+        basis = numpy.eye(x.size).reshape(-1, *x.shape)
+        return lambda: jvp(fn, x, basis, batched=True)
+
+    basis = numpy.eye(512 * 16).reshape(-1, 512, 16)
+    return lambda: vjp(fn, x, basis, batched=True)
+
+
+def _im2col(image_size: int):
+    import nujo as nj
+    from nujo.autodiff._functions._transform import _Im2col
+
+    with nj.no_diff():
+        function = _Im2col(randn(8, 16, image_size, image_size), (3, 3),
+                           (1, 1), (0, 0))
+        columns = function().value
+
+    return function, columns
+
+
+@benchmark('im2col.forward', image_size=[16, 32, 64])
+def im2col_forward(image_size: int):
+    ''' The column matrix of 3x3 windows of 16 channels images '''
+
+    function, _ = _im2col(image_size)
+    return function.forward
+
+
+@benchmark('im2col.col2im', image_size=[16, 32, 64])
+def im2col_col2im(image_size: int):
+    ''' The backward pass of the column matrix (col2im), accumulated into
+    the gradient of the images
+    '''
+
+    function, columns = _im2col(image_size)
+    grad = numpy.zeros(function.children[0].shape)
+
+    return lambda: function.backward_into(0, columns, grad)
+
+
+@benchmark('conv2d.forward', image_size=[16, 32, 64])
+def conv2d_forward(image_size: int):
+    import nujo as nj
+    import nujo.nn as nn
+
+    conv = nn.Conv2d(3, 8, 3, padding=1)
+    x = nj.Tensor(rand(8, 3, image_size, image_size))
+
+    return lambda: conv(x)
+
+
+@benchmark('conv2d.forward_backward', image_size=[16, 32, 64])
+def conv2d_forward_backward(image_size: int):
+    import nujo as nj
+    import nujo.nn as nn
+
+    conv = nn.Conv2d(3, 8, 3, padding=1)
+    x = nj.Tensor(rand(8, 3, image_size, image_size))
+
+    def run():
+        loss = nj.mean(conv(x))
+        for param in conv.parameters():
+            param.zero_grad()
+
+        loss.backward()
+
+    return run
+
+
+@benchmark('conv2d.step',
+           algorithm=['im2col', 'fft'],
+           kernel_size=[3, 7, 11])
+def conv2d_step(algorithm: str, kernel_size: int):
+    ''' Training step of a Conv2d computed with im2col or in the frequency
+    domain (see `_Conv2dFFT`), the 'auto' algorithm switches to the FFT
+    from `FFT_KERNEL_THRESHOLD` kernel elements
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+
+    conv = nn.Conv2d(16,
+                     16,
+                     kernel_size,
+                     padding=kernel_size // 2,
+                     algorithm=algorithm)
+    x = nj.Tensor(rand(16, 16, 32, 32), diff=True)
+
+    return _training_step(conv, x)
+
+
+@benchmark('conv2d.tuned_step', algorithm=['auto', 'tune'], stride=[1, 2])
+def conv2d_tuned_step(algorithm: str, stride: int):
+    ''' Training step of a Conv2d with the heuristic 'auto' algorithm or
+    the autotuned one (see `ConvAutotuner`, tuned by the warm-up call)
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+
+    conv = nn.Conv2d(16, 16, 5, stride=stride, algorithm=algorithm)
+    x = nj.Tensor(rand(16, 16, 32, 32), diff=True)
+
+    return _training_step(conv, x)
+
+
+@benchmark('conv2d.autotune', start=['cold', 'warm'])
+def conv2d_autotune(start: str):
+    ''' First training step of a Conv2d with `algorithm='tune'`: timing the
+    candidate algorithms (cold start), or loading the persisted winners
+    (warm start)
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+
+    conv = nn.Conv2d(16, 16, 5, algorithm='tune')
+    x = nj.Tensor(rand(16, 16, 32, 32), diff=True)
+    step = _training_step(conv, x)
+
+    directory = tempfile.TemporaryDirectory()
+
+    def run():
+        path = os.path.join(directory.name, 'conv_algorithms.json')
+
+        with nn.ConvAutotuner(path if start == 'warm' else None):
+            step()
+
+    return run
+
+
+@benchmark('conv2d.layout_step', layout=['NCHW', 'NHWC'])
+def conv2d_layout_step(layout: str):
+    ''' Training step of a stack of 3 im2col convolutions (with ReLUs in
+    between) in the channels-first or channels-last layout
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+
+    flow = nn.Conv2d(32, 32, 3, padding=1, algorithm='im2col', layout=layout)
+    for _ in range(2):
+        flow = flow >> nn.ReLU() >> nn.Conv2d(
+            32, 32, 3, padding=1, algorithm='im2col', layout=layout)
+
+    shape = (32, 32, 32, 32)  # square images with as many channels
+    x = nj.Tensor(randn(*shape), diff=True)
+
+    return _training_step(flow, x)
+
+
+@benchmark('pool2d.step',
+           layer=['MaxPool2d', 'AvgPool2d', 'Conv2d'],
+           channels=[16, 64])
+def pool2d_step(layer: str, channels: int):
+    ''' Training step of a layer halving the size of the images: max or
+    average pooling (see `_MaxPool2d` and `_AvgPool2d`), or a strided
+    convolution
+    '''
+
+    import nujo as nj
+    import nujo.nn as nn
+
+    if layer == 'Conv2d':
+        flow = nn.Conv2d(channels, channels, 2, stride=2)
+    else:
+        flow = getattr(nn, layer)(2)
+
+    x = nj.Tensor(randn(32, channels, 32, 32), diff=True)
+
+    return _training_step(flow, x)
+
+
+@benchmark('optim.step', optimizer=['SGD', 'Momentum', 'RMSprop', 'Adam'])
+def optim_step(optimizer: str):
+    ''' A step over 256 parameters of 32x32 '''
+
+    import nujo as nj
+    import nujo.optim as optim
+
+    params = [nj.Tensor(randn(32, 32), diff=True) for _ in range(256)]
+    for param in params:
+        param.grad.value = randn(32, 32)
+
+    return getattr(optim, optimizer)(lambda: iter(params)).step
+
+
+# ====================================================================================================
+# Measurement
+
+
+def measure(run: Callable[[], None], repeat: int, min_time: float) -> dict:
+    ''' Returns the time per call of `run` (min, median, max, in seconds),
+    the number of calls per loop and the peak memory of a call (bytes)
+    '''
+
+    run()  # warm up (caches, scratch buffers)
+
+    number = 1
+    while True:
+        start = timer()
+        for _ in range(number):
+            run()
+
+        if timer() - start >= min_time:
+            break
+
+        number *= 2
+
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(number):
+            run()
+
+        times.append((timer() - start) / number)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'max': max(times),
+        'number': number,
+        'repeat': repeat,
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(pattern: str, repeat: int, min_time: float) -> dict:
+    results: Dict[str, dict] = {}
+
+    for name, setup in _BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+
+        try:
+            results[name] = measure(setup(), repeat, min_time)
+        except Exception as error:  # e.g. an API missing at an old commit
+            results[name] = {'error': f'{type(error).__name__}: {error}'}
+
+        _print_result(name, results[name])
+
+    return {'metadata': _metadata(), 'results': results}
+
+
+def _metadata() -> dict:
+    import nujo
+
+    nujo_dir = os.path.dirname(os.path.dirname(os.path.abspath(
+        nujo.__file__)))
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                cwd=nujo_dir,
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'nujo_version': getattr(nujo, '__version__', None),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+    }
+
+
+def _print_result(name: str, result: dict) -> None:
+    if 'error' in result:
+        print(f'{name:<48} {result["error"]}', file=sys.stderr)
+        return
+
+    print(f'{name:<48} {_format_time(result["median"]):>10} '
+          f'(min {_format_time(result["min"])}) '
+          f'peak {result["peak_bytes"] / 2**20:8.2f} MiB')
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+# ====================================================================================================
+# Comparison
+
+
+def compare(base: dict, head: dict, threshold: float) -> List[str]:
+    ''' Prints the ratios head / base of the median times and of the peak
+    memory of the benchmarks of both results; returns the names of the
+    benchmarks slower (or using more memory) by more than `threshold`
+    '''
+
+    print(f'base: {base["metadata"].get("commit")}')
+    print(f'head: {head["metadata"].get("commit")}\n')
+    print(f'{"Benchmark":<48} {"Base":>10} {"Head":>10} {"Time":>7} '
+          f'{"Memory":>7}')
+
+    regressions = []
+    for name, base_result in base['results'].items():
+        head_result = head['results'].get(name)
+        if head_result is None or 'error' in base_result or \
+                'error' in head_result:
+            continue
+
+        time_ratio = head_result['median'] / base_result['median']
+        memory_ratio = (head_result['peak_bytes'] + 1) / \
+            (base_result['peak_bytes'] + 1)
+
+        flag = ''
+        if time_ratio > 1 + threshold or memory_ratio > 1 + threshold:
+            flag = '  <- regression'
+            regressions.append(name)
+        elif time_ratio < 1 / (1 + threshold):
+            flag = '  faster'
+
+        print(f'{name:<48} {_format_time(base_result["median"]):>10} '
+              f'{_format_time(head_result["median"]):>10} '
+              f'{time_ratio:>6.2f}x {memory_ratio:>6.2f}x{flag}')
+
+    return regressions
+
+
+def run_commits(refs: List[str], args: argparse.Namespace) -> List[dict]:
+    ''' Runs this suite (the benchmarks of the working tree) against the
+    nujo of each commit, checked out in a temporary git worktree
+
+    The commits are benchmarked alternately for `args.rounds` rounds, and
+    the round with the lowest median time is kept for each benchmark, so
+    that a drift of the machine (e.g. of the CPU frequency) affects both
+    commits alike.
+
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worktrees = [os.path.join(tmp, f'worktree{i}') for i in range(2)]
+        results: List[Optional[dict]] = [None] * len(refs)
+
+        try:
+            for ref, worktree in zip(refs, worktrees):
+                subprocess.run(
+                    ['git', 'worktree', 'add', '--detach', worktree, ref],
+                    check=True)
+
+            for round in range(args.rounds):
+                for i, (ref, worktree) in enumerate(zip(refs, worktrees)):
+                    print(f'\n{ref} (round {round + 1}/{args.rounds}):')
+                    output = os.path.join(tmp, 'results.json')
+
+                    subprocess.run([
+                        sys.executable, __file__, 'run', '-k', args.pattern,
+                        '--repeat',
+                        str(args.repeat), '--min-time',
+                        str(args.min_time), '-o', output
+                    ],
+                                   env={
+                                       **os.environ, 'PYTHONPATH': worktree
+                                   },
+                                   check=True)
+
+                    with open(output) as file:
+                        results[i] = _fastest(results[i], json.load(file))
+
+        finally:
+            for worktree in worktrees:
+                if os.path.exists(worktree):
+                    subprocess.run(
+                        ['git', 'worktree', 'remove', '--force', worktree],
+                        check=True)
+
+    return results
+
+
+def _fastest(results: Optional[dict], new_results: dict) -> dict:
+    ''' Merges two runs, keeping the fastest result of each benchmark
+    '''
+
+    if results is None:
+        return new_results
+
+    for name, result in new_results['results'].items():
+        previous = results['results'].get(name)
+
+        if previous is None or 'error' in previous or (
+                'error' not in result
+                and result['median'] < previous['median']):
+            results['results'][name] = result
+
+    return results
+
+
+# ====================================================================================================
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', help='JSON file to write')
+
+    commits_parser = commands.add_parser(
+        'commits', help='run the benchmarks at two commits and compare')
+    commits_parser.add_argument('base')
+    commits_parser.add_argument('head')
+    commits_parser.add_argument('--rounds',
+                                type=int,
+                                default=3,
+                                help='alternate runs of each commit')
+
+    for command in (run_parser, commits_parser):
+        command.add_argument('-k',
+                             '--pattern',
+                             default='*',
+                             help='run the benchmarks matching the pattern')
+        command.add_argument('--repeat', type=int, default=5)
+        command.add_argument('--min-time', type=float, default=0.05)
+
+    compare_parser = commands.add_parser('compare',
+                                         help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+
+    for command in (compare_parser, commits_parser):
+        command.add_argument('--threshold',
+                             type=float,
+                             default=0.1,
+                             help='relative slowdown reported as regression')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run_suite(args.pattern, args.repeat, args.min_time)
+
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2)
+
+        return 0
+
+    if args.command == 'compare':
+        with open(args.base) as base, open(args.head) as head:
+            base, head = json.load(base), json.load(head)
+    else:
+        base, head = run_commits([args.base, args.head], args)
+        print()
+
+    return 1 if compare(base, head, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())